@@ -4,7 +4,7 @@ from google.adk.a2a.utils.agent_to_a2a import to_a2a
 from a2a.types import AgentCard
 from services.db_service import save_journal_entry, get_journal_entries
 from datetime import datetime
-from utils.gemini_client import gemini_client
+from utils.gemini_client import get_gemini_client
 import asyncio
 import logging
 import re
@@ -69,7 +69,7 @@ async def create_diary_entry(user_id: str, conversation_summary: str, photo_url:
         logger.debug(f"Prompt sent to Gemini:\n{prompt}\n")
 
         # Generate journal-style text
-        diary_text = await gemini_client.generate_text(prompt)
+        diary_text = await get_gemini_client().generate_text(prompt)
         logger.info("✅ Gemini response received successfully.")
         
         # Remove asterisks and markdown from response
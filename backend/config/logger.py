@@ -21,7 +21,10 @@ def setup_logging():
         sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level="DEBUG" if settings.debug else "INFO",
-        colorize=True
+        colorize=True,
+        # Records are written by a background thread, so a slow stdout never
+        # stalls the event loop
+        enqueue=True
     )
     
     # Add file handler for production
@@ -31,7 +34,8 @@ def setup_logging():
             rotation="1 day",
             retention="30 days",
             format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-            level="INFO"
+            level="INFO",
+            enqueue=True
         )
     
     # Configure standard library logging to use loguru
@@ -51,8 +55,13 @@ def setup_logging():
                 level, record.getMessage()
             )
     
-    # Intercept all standard library logging
-    logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
+    # Intercept all standard library logging. The level matches the console sink so
+    # disabled records are dropped before their message is ever formatted.
+    logging.basicConfig(
+        handlers=[InterceptHandler()],
+        level=logging.DEBUG if settings.debug else logging.INFO,
+        force=True
+    )
     
     # Set specific loggers
     for logger_name in ["uvicorn", "uvicorn.access", "fastapi"]:
@@ -3,13 +3,13 @@ from utils.auth_util import verify_firebase_token
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from routes import journal_routes
-from services.firebase_client import initialize_firebase  # Initialize Firebase first
 from routes import user_routes
 from routes import chat_routes
 import uvicorn
 import base64
 import asyncio
 import os
+import sys
 import json
 from datetime import datetime
 from dotenv import load_dotenv
@@ -40,6 +40,23 @@ app.include_router(chat_routes.router)
 # app.include_router(geo_router)
 # app.include_router(wiki_router)
 
+@app.on_event("startup")
+async def start_background_workers():
+    # Diary generation triggered by conversation saves runs on a single bounded worker
+    from services.db_service import start_diary_worker
+    start_diary_worker()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    from utils import geo_api_utils, geo_utils
+    await geo_api_utils.close_client()
+    await geo_utils.close_client()
+
+@app.on_event("shutdown")
+async def stop_image_workers():
+    from utils.storage_client import shutdown_image_pool
+    shutdown_image_pool()
+
 @app.get("/")
 def root():
     return {"message": "Hermes API running 🚀", "status": "healthy"}
@@ -70,16 +87,13 @@ async def process_image(
                 "status": "error",
                 "message": "Empty image file"
             }
-        
-        # Convert to base64
-        image_base64 = base64.b64encode(image_content).decode('utf-8')
 
         # Upload the image to storage (Firebase or local fallback)
         try:
-            from utils.storage_client import storage_client
+            from utils.storage_client import get_storage_client
             from urllib.parse import urlparse, urljoin
 
-            stored = await storage_client.upload_image(
+            stored = await get_storage_client().upload_image(
                 image_data=image_content,
                 user_id=user_id,
                 content_type=image_file.content_type
@@ -126,7 +140,7 @@ async def process_image(
             geo_result = {"success": True, "method": "user_location"}
         else:
             print("📍 Processing image location with API fallback...")
-            geo_result = process_image_location_with_api(image_base64, "base64")
+            geo_result = process_image_location_with_api(image_content, "bytes")
             
             if geo_result["success"]:
                 lat = geo_result["coordinates"]["lat"]
@@ -150,37 +164,36 @@ async def process_image(
         # Import agents (using standalone versions to avoid ADK issues)
         print("🤖 Starting complete agent pipeline...")
         
-        # Step 1: Perception Agent (with translation priority)
+        # Steps 1 + 2 run concurrently: Perception Agent (with translation priority)
+        # and Geo Agent (location context with Wikipedia nearby search)
         print("📸 Step 1: Analyzing image with OCR and translation...")
-        from utils.perception_utils import analyze_image_with_translation
-        perception_result = await analyze_image_with_translation(image_base64, "base64")
-        
-        # Step 2: Geo Agent - Get location context with Wikipedia nearby search
         print("🗺️ Step 2: Getting location context...")
+        from utils.perception_utils import analyze_image_with_translation
         from utils.geo_api_utils import get_geo_context_async
-        geo_context = await get_geo_context_async(lat, lng, radiusMeters=1500, lang="en")
         
         # Step 3: Context Agent - Build comprehensive context
         print("🧠 Step 3: Building context and verifying entity...")
-        from utils.context_utils import build_comprehensive_context
-        context_result = build_comprehensive_context(
+        from utils.context_utils import build_comprehensive_context_async
+        context_result = await build_comprehensive_context_async(
             lat=lat,
             lng=lng,
-            perception_clues=perception_result,
-            geo_context=geo_context,
             user_id=user_id,
-            session_id=session_id
+            session_id=session_id,
+            perception_coro=analyze_image_with_translation(image_content, "bytes"),
+            geo_coro=get_geo_context_async(lat, lng, radiusMeters=1500, lang="en")
         )
+        perception_result = context_result["perception_data"]
+        geo_context = context_result["geo"]
         
-        # Step 4: Store cultural summary in database
+        # Steps 4 + 4.5 run concurrently: store the cultural summary and create the
+        # journal entry. They write separate documents and both only need context_result
         print("💾 Step 4: Storing cultural summary in database...")
-        from utils.storage_utils import store_cultural_summary
-        db_result = await store_cultural_summary(context_result, user_id, session_id)
-        
-        # Step 4.5: Create journal entry after context agent completes
         print("📖 Step 4.5: Creating journal entry...")
-        from utils.storage_utils import create_journal_entry
-        journal_result = await create_journal_entry(context_result, user_id, session_id)
+        from utils.storage_utils import store_cultural_summary, create_journal_entry
+        db_result, journal_result = await asyncio.gather(
+            store_cultural_summary(context_result, user_id, session_id),
+            create_journal_entry(context_result, user_id, session_id)
+        )
         
         # Step 5: Response Agent - Generate cultural response
         print("💬 Step 5: Generating cultural response...")
@@ -318,7 +331,8 @@ async def transcribe_audio(
         # Use ElevenLabs STT API for real transcription
         try:
             print(f"🔍 DEBUG: Attempting to import elevenlabs_client...")
-            from utils.elevenlabs_client import elevenlabs_client
+            from utils.elevenlabs_client import get_elevenlabs_client
+            elevenlabs_client = get_elevenlabs_client()
             print(f"🔍 DEBUG: ElevenLabs client imported successfully")
             print(f"🔍 DEBUG: Client exists: {elevenlabs_client.client is not None}")
             print(f"🔍 DEBUG: API key loaded: {bool(elevenlabs_client.api_key)}")
@@ -401,7 +415,8 @@ async def text_to_speech(
 ):
     """ElevenLabs TTS endpoint - Convert text to speech and return audio"""
     try:
-        from utils.elevenlabs_client import elevenlabs_client
+        from utils.elevenlabs_client import get_elevenlabs_client
+        elevenlabs_client = get_elevenlabs_client()
         
         if not elevenlabs_client.client:
             return {
@@ -457,6 +472,10 @@ if __name__ == "__main__":
         "main:app",  # Use import string instead of app object
         host="0.0.0.0",  # Listen on all interfaces
         port=8000,
-        log_level="info",
+        log_level="warning",
+        access_log=False,  # Skip per-request access log formatting
+        # C event loop and HTTP parser from uvicorn[standard]; uvloop has no Windows build
+        loop="uvloop" if sys.platform != "win32" else "auto",
+        http="httptools",
         reload=True  # Enable auto-reload for development
     )
@@ -1,5 +1,6 @@
 # backend/routes/chat_routes.py
 from fastapi import APIRouter, Form, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from utils.auth_util import verify_firebase_token
 from datetime import datetime
 import json
@@ -15,6 +16,63 @@ router = APIRouter(prefix="/api/chat", tags=["Chat"])
 # In-memory session storage for chat conversations
 chat_sessions = {}
 
+async def _load_session_context(user_id: str, session_id: str):
+    """Get or create the in-memory chat session; returns (session_data, context for the response)."""
+    # Get or create session in memory
+    session_key = f"{user_id}_{session_id}"
+    if session_key not in chat_sessions:
+        chat_sessions[session_key] = {
+            "user_id": user_id,
+            "session_id": session_id,
+            "conversation_history": [],
+            "context_data": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "last_activity": datetime.utcnow().isoformat()
+        }
+        print(f"📝 Created new chat session: {session_key}")
+    
+    # Update last activity
+    chat_sessions[session_key]["last_activity"] = datetime.utcnow().isoformat()
+    
+    # Get previous context from session or database
+    session_data = chat_sessions[session_key]
+    previous_context = session_data.get("context_data")
+    
+    if not previous_context:
+        # Try to get context from database if not in memory
+        previous_context = await get_conversation_context(user_id, session_id)
+        if previous_context.get("success"):
+            session_data["context_data"] = previous_context
+    
+    # Add conversation history to context
+    conversation_history = session_data.get("conversation_history", [])
+    if previous_context:
+        previous_context["conversation_history"] = conversation_history
+    else:
+        previous_context = {"conversation_history": conversation_history}
+    return session_data, previous_context
+
+
+async def _record_turn(session_data: dict, user_message: str, response_text: str):
+    """Append the user/assistant turn to the session and store it."""
+    # Store conversation turn in memory
+    conversation_turn = {
+        "role": "user",
+        "message": user_message,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    session_data["conversation_history"].append(conversation_turn)
+    
+    conversation_turn = {
+        "role": "assistant", 
+        "message": response_text,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    session_data["conversation_history"].append(conversation_turn)
+    
+    # Store conversation in database as well
+    await store_conversation_turn(session_data["user_id"], session_data["session_id"], user_message, response_text)
+
 @router.post("/")
 async def chat_with_context(
     user_message: str = Form(...),
@@ -25,38 +83,7 @@ async def chat_with_context(
     try:
         print(f"💬 Chat request from {user_id}: {user_message[:50]}...")
         
-        # Get or create session in memory
-        session_key = f"{user_id}_{session_id}"
-        if session_key not in chat_sessions:
-            chat_sessions[session_key] = {
-                "user_id": user_id,
-                "session_id": session_id,
-                "conversation_history": [],
-                "context_data": None,
-                "created_at": datetime.utcnow().isoformat(),
-                "last_activity": datetime.utcnow().isoformat()
-            }
-            print(f"📝 Created new chat session: {session_key}")
-        
-        # Update last activity
-        chat_sessions[session_key]["last_activity"] = datetime.utcnow().isoformat()
-        
-        # Get previous context from session or database
-        session_data = chat_sessions[session_key]
-        previous_context = session_data.get("context_data")
-        
-        if not previous_context:
-            # Try to get context from database if not in memory
-            previous_context = await get_conversation_context(user_id, session_id)
-            if previous_context.get("success"):
-                session_data["context_data"] = previous_context
-        
-        # Add conversation history to context
-        conversation_history = session_data.get("conversation_history", [])
-        if previous_context:
-            previous_context["conversation_history"] = conversation_history
-        else:
-            previous_context = {"conversation_history": conversation_history}
+        session_data, previous_context = await _load_session_context(user_id, session_id)
         
         # Generate response using context
         from utils.response_utils import generate_cultural_response_with_context
@@ -68,23 +95,7 @@ async def chat_with_context(
             session_id=session_id
         )
         
-        # Store conversation turn in memory
-        conversation_turn = {
-            "role": "user",
-            "message": user_message,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        session_data["conversation_history"].append(conversation_turn)
-        
-        conversation_turn = {
-            "role": "assistant", 
-            "message": response_result.get("response", ""),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        session_data["conversation_history"].append(conversation_turn)
-        
-        # Store conversation in database as well
-        await store_conversation_turn(user_id, session_id, user_message, response_result.get("response", ""))
+        await _record_turn(session_data, user_message, response_result.get("response", ""))
         
         print(f"✅ Chat response generated and stored in session")
         
@@ -110,6 +121,46 @@ async def chat_with_context(
             "response": "I apologize, but I'm having trouble processing your message right now."
         }
 
+@router.post("/stream")
+async def chat_with_context_stream(
+    user_message: str = Form(...),
+    user_id: str = Depends(verify_firebase_token),
+    session_id: str = Form(default="demo_session")
+):
+    """
+    Same as POST /api/chat/, streamed as server-sent events: a {"delta": ...}
+    event per piece of the reply as it is generated, then a final event with
+    "done": true and the full response.
+    """
+    from utils.response_utils import generate_cultural_response_stream
+    
+    session_data, previous_context = await _load_session_context(user_id, session_id)
+    
+    async def events():
+        async for event in generate_cultural_response_stream(
+            user_message=user_message,
+            context_data=previous_context or {},
+            user_id=user_id,
+            session_id=session_id
+        ):
+            if event.get("done"):
+                response_result = event["result"]
+                await _record_turn(session_data, user_message, response_result.get("response", ""))
+                event = {
+                    "done": True,
+                    "status": "success" if response_result.get("success") else "error",
+                    "response": response_result.get("response", "I apologize, but I couldn't generate a response."),
+                    "metadata": response_result.get("metadata", {}),
+                    "session_info": {
+                        "session_id": session_id,
+                        "conversation_length": len(session_data["conversation_history"]),
+                        "has_context": bool(session_data.get("context_data"))
+                    }
+                }
+            yield f"data: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @router.get("/session/{user_id}/{session_id}")
 async def get_session_info(user_id: str, session_id: str):
     """Get chat session information."""
@@ -1,8 +1,10 @@
 # backend/routes/journal_routes.py
 from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
 from urllib.parse import urljoin, urlparse
 from datetime import datetime, date
-from utils.auth_util import verify_firebase_token
+from utils.auth_util import verify_firebase_token, extract_bearer_token, verify_id_token_cached
 from services.db_service import save_journal_entry, get_journal_entries
 from fastapi import Request
 from models.journal import JournalEntryRequest
@@ -10,11 +12,13 @@ from config.logger import get_logger
 from services.db_service import save_journal_entry, get_journal_entries, get_daily_conversations, save_conversation_entry, get_conversation_locations, get_journal_entries_by_date, update_journal_entry
 from models.journal import JournalEntryRequest, ConversationEntry, JournalEntryUpdate
 from services.db_service import save_journal_entry, get_journal_entries, get_daily_conversations, save_conversation_entry, get_conversation_locations, get_journal_entries_by_date
-from services.db_service import save_entry, get_entries_for_date
+from services.db_service import save_entry, get_entries_for_date, get_recent_conversation_entries
 from models.journal import JournalEntryRequest, ConversationEntry
 from config.logger import get_logger
 from firebase_admin import auth
 from typing import Optional
+import hashlib
+import json
 import uuid
 
 router = APIRouter(prefix="/journal", tags=["Journal"])
@@ -46,21 +50,32 @@ def _normalize_photo_url(photo_url: str, request: Request) -> str:
     except Exception:
         return photo_url
 
+def _cacheable_response(request: Request, payload) -> Response:
+    """
+    Return `payload` as JSON with a private Cache-Control and a content ETag. If the
+    client already holds the same representation (If-None-Match), reply 304 with no body.
+    """
+    content = jsonable_encoder(payload)
+    etag = '"' + hashlib.sha1(json.dumps(content, sort_keys=True).encode()).hexdigest() + '"'
+    headers = {"Cache-Control": "private, max-age=30", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
 def get_user_id(authorization: str = Header(None)):
     """
     Get user ID from auth token - ONLY Firebase auth, no fallbacks
     """
-    if not authorization or not authorization.startswith("Bearer "):
+    token = extract_bearer_token(authorization)
+    if token is None:
         print(f"❌ No authorization header provided")
         raise HTTPException(status_code=401, detail="No authorization token provided")
     
-    token = authorization.split("Bearer ")[1]
     print(f"🔍 Received token: {token[:20]}...{token[-10:] if len(token) > 30 else token}")
     
     # ONLY Firebase auth - no fallbacks
     try:
-        decoded_token = auth.verify_id_token(token)
-        firebase_uid = decoded_token["uid"]
+        firebase_uid = verify_id_token_cached(token)
         print(f"✅ Firebase auth successful for UID: {firebase_uid}")
         return firebase_uid
     except Exception as e:
@@ -130,7 +145,7 @@ def get_user_conversations(
         pass
 
     print(f"📋 Found conversations: {conversations}")
-    return conversations
+    return _cacheable_response(request, conversations)
 
 @router.get("/conversations/all")
 def get_all_users_conversations(
@@ -142,25 +157,14 @@ def get_all_users_conversations(
     print(f"🔍 Getting all users' conversations for social feed (requested by: {uid})")
     
     try:
-        from services.firebase_client import db
+        from services.firebase import get_db
+        db = get_db()
         from firebase_admin import auth
         
         all_conversations = []
         user_profiles = {}
-        
-        # Get all documents from the journal collection
-        journal_docs = db.collection("journal").stream()
-        
-        for doc in journal_docs:
-            user_id = doc.id
-            doc_data = doc.to_dict()
-            
-            if not doc_data:
-                print(f"⚠️ User {user_id} has no data")
-                continue
-            
-            print(f"🔍 Processing user {user_id}, doc_data keys: {list(doc_data.keys())}")
-            
+
+        def load_user_profile(user_id):
             # Get user profile information
             try:
                 user_record = auth.get_user(user_id)
@@ -176,6 +180,21 @@ def get_all_users_conversations(
                     "username": f"user_{user_id[:8]}",
                     "avatar": None
                 }
+        
+        # Get all documents from the journal collection
+        journal_docs = db.collection("journal").stream()
+        
+        for doc in journal_docs:
+            user_id = doc.id
+            doc_data = doc.to_dict()
+            
+            if not doc_data:
+                print(f"⚠️ User {user_id} has no data")
+                continue
+            
+            print(f"🔍 Processing user {user_id}, doc_data keys: {list(doc_data.keys())}")
+            
+            load_user_profile(user_id)
             
             # Check for 'conversation' key (array format) first
             if 'conversation' in doc_data and isinstance(doc_data['conversation'], list):
@@ -212,6 +231,16 @@ def get_all_users_conversations(
                             all_conversations.append(conversation_with_user)
                             print(f"  ✅ Added entry {i+1} from {key}")
         
+        # Conversations stored as documents in each user's `entries` sub-collection
+        for user_id, entry in get_recent_conversation_entries(limit):
+            if user_id not in user_profiles:
+                load_user_profile(user_id)
+            all_conversations.append({
+                **entry,
+                'user_id': user_id,
+                'user_profile': user_profiles[user_id]
+            })
+        
         print(f"\n📊 Total conversations collected: {len(all_conversations)}")
         
         # Remove duplicates based on timestamp and user_id
@@ -335,7 +364,7 @@ def get_conversation_locations(request: Request, uid: str = Depends(get_user_id)
     except Exception:
         pass
 
-    return {"locations": locations}
+    return _cacheable_response(request, {"locations": locations})
 
 
 @router.get("/daily_entries")
@@ -361,7 +390,8 @@ def get_daily_entries(request: Request, uid: str = Depends(verify_firebase_token
             return {date: result}
 
         # No date specified: try to return all dates available for this user
-        from services.firebase_client import db
+        from services.firebase import get_db
+        db = get_db()
         doc = db.collection('entries').document(uid).get()
         if not doc.exists:
             return {"daily_entries": {}}
@@ -481,9 +511,11 @@ async def generate_latest_journal(uid: str = Depends(verify_firebase_token)):
     try:
         logger.info(f"📝 [generate_latest_journal] Called for user_id={uid}")
         
-        from utils.gemini_client import gemini_client
+        from utils.gemini_client import get_gemini_client
         from datetime import datetime
         
+        gemini_client = get_gemini_client()
+        
         # Use a default session_id for now
         session_id = "default_session"
         
@@ -595,26 +627,20 @@ Conversation Summary: {conversation_summary}"""
         print("="*80 + "\n")
 
         # Find the conversation entry that we used for the summary and add diary field to it
-        conversation_entry_updated = False
+        updated_entry = None
         for entry in conversations:
             if entry.get("summary") == conversation_summary:
                 # Update the existing entry with diary field
                 entry["diary"] = diary_text
-                conversation_entry_updated = True
+                updated_entry = entry
                 print(f"✅ Updated existing conversation entry with diary field")
                 print(f"Entry now has: photoUrl, summary, timestamp, diary")
                 break
         
-        if conversation_entry_updated:
-            # Save the updated conversations back to the database
+        if updated_entry is not None:
+            # Save the diary onto that entry only, leaving the rest of the journal untouched
             try:
-                from services.firebase_client import db
-                
-                # Update the entire conversation array with the modified entry
-                doc_ref = db.collection("journal").document(uid)
-                doc_ref.set({
-                    "conversation": conversations
-                }, merge=False)  # Replace the entire array
+                update_journal_entry(uid, updated_entry["timestamp"], updated_entry["summary"], diary_text)
                 print(f"✅ Updated journal document with diary field for user {uid}")
             except Exception as e:
                 print(f"⚠️ Could not update journal document in database: {e}")
@@ -1,11 +1,11 @@
 # routes/user_routes.py
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
-from services.firebase_client import initialize_firebase  # Ensure Firebase is initialized
+from services.firebase import get_app
 from utils.auth_util import verify_firebase_token
 from firebase_admin import auth
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from utils.storage_client import storage_client
+from utils.storage_client import get_storage_client
 from services import db_service
 from config.logger import get_logger
 from urllib.parse import urlparse, urljoin
@@ -50,6 +50,7 @@ def _normalize_photo_url(photo_url: str, request: Request) -> str:
             return urljoin(base, path)
 
         # If this looks like a storage path (e.g., 'profile/uid.jpg' or 'uploads/uid/...') and we have a bucket name, construct a GCS URL
+        storage_client = get_storage_client()
         if hasattr(storage_client, 'bucket_name') and storage_client.bucket_name:
             try:
                 bucket = storage_client.bucket_name
@@ -100,7 +101,8 @@ def register_user(user_data: RegisterRequest):
         user_record = auth.create_user(
             email=user_data.email,
             password=user_data.password,
-            display_name=f"{user_data.first_name} {user_data.last_name}"
+            display_name=f"{user_data.first_name} {user_data.last_name}",
+            app=get_app()
         )
         
         return AuthResponse(
@@ -119,7 +121,7 @@ def login_user(login_data: LoginRequest):
     """Login user using Firebase Auth"""
     try:
         # Get user by email from Firebase Auth
-        user_record = auth.get_user_by_email(login_data.email)
+        user_record = auth.get_user_by_email(login_data.email, app=get_app())
         
         # Note: Firebase Admin SDK doesn't have password verification
         # In production, you'd use Firebase client SDK for authentication
@@ -207,7 +209,7 @@ async def upload_profile_photo(request: Request, file: UploadFile = File(...), u
         logger.info(f"POST /user/profile/photo received file='{file.filename}' content_type={file.content_type} size={len(data)} for uid={uid}")
 
         # Upload via storage client (will use Firebase bucket if configured or local fallback)
-        photo_url = await storage_client.upload_profile_image(image_data=data, user_id=uid, content_type=file.content_type)
+        photo_url = await get_storage_client().upload_profile_image(image_data=data, user_id=uid, content_type=file.content_type)
 
         logger.info(f"Profile image stored for uid={uid} -> {photo_url}")
 
@@ -229,7 +231,8 @@ async def upload_profile_photo(request: Request, file: UploadFile = File(...), u
 
         # Update Firestore users/{uid} doc with photo_url
         try:
-            from services.firebase_client import db
+            from services.firebase import get_db
+            db = get_db()
             db.collection('users').document(uid).set({
                 'photo_url': photo_url
             }, merge=True)
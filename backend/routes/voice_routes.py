@@ -11,7 +11,7 @@ import asyncio
 import io
 import base64
 
-from utils.elevenlabs_client import elevenlabs_client
+from utils.elevenlabs_client import get_elevenlabs_client
 from config.logger import get_logger
 
 logger = get_logger(__name__)
@@ -43,7 +43,7 @@ async def text_to_speech(
         logger.info(f"TTS request for user {user_id}: {text[:50]}...")
         
         # Generate audio bytes
-        audio_bytes = await elevenlabs_client.text_to_speech(
+        audio_bytes = await get_elevenlabs_client().text_to_speech(
             text=text,
             voice_id=voice_id,
             speed=speed
@@ -93,7 +93,7 @@ async def text_to_speech_stream(
         
         async def generate_audio():
             try:
-                async for chunk in elevenlabs_client.stream_text_to_speech(
+                async for chunk in get_elevenlabs_client().stream_text_to_speech(
                     text=text,
                     voice_id=voice_id,
                     speed=speed
@@ -143,7 +143,7 @@ async def get_available_voices():
         List of available voices with metadata
     """
     try:
-        voices = await elevenlabs_client.get_available_voices()
+        voices = await get_elevenlabs_client().get_available_voices()
         return {
             "voices": voices,
             "default_voice": "adam",
@@ -204,7 +204,8 @@ async def transcribe_audio(
         
         # Use ElevenLabs STT API for real transcription
         try:
-            from utils.elevenlabs_client import elevenlabs_client
+            from utils.elevenlabs_client import get_elevenlabs_client
+            elevenlabs_client = get_elevenlabs_client()
             
             if elevenlabs_client.client:
                 # Use ElevenLabs STT API
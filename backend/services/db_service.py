@@ -1,10 +1,74 @@
 # backend/services/db_service.py
-from services.firebase_client import db
+from services.firebase import get_db
 from google.cloud import firestore
-from datetime import datetime, date
-from typing import Optional, Dict, List
+from google.api_core.exceptions import NotFound
+from datetime import datetime
+from typing import Optional, Dict, List, Set
 import asyncio
+import contextlib
+import copy
+import hashlib
 import inspect
+import threading
+import time
+from config.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds to wait after a conversation save before generating the diary, so that
+# rapid-fire messages from one user collapse into a single LLM call.
+DIARY_DEBOUNCE_SECONDS = 10
+
+# `kind` of journal entries written to the `entries` sub-collection before they got
+# their own `journal_entries` sub-collection; readers still list any left there under
+# the `conversation` key, and the migration script moves them.
+JOURNAL_ENTRY_KIND = "journal"
+
+# Number of most recent conversation entries considered when building a diary
+RECENT_DIARY_ENTRIES = 5
+
+# Prompt for turning a conversation summary into a diary entry
+DIARY_PROMPT_TEMPLATE = """Transform this conversation summary into a personal, reflective diary entry.
+
+CRITICAL: Do NOT reference or use coordinates, GPS data, or any location metadata. Base the diary only on the textual conversation summary provided below.
+
+Write in first person, introspective and emotionally aware, in 2–3 paragraphs.
+Include insights, feelings, or reflections on what was learned or experienced.
+
+Conversation Summary: {summary}"""
+
+# Upper bound on diary generations (Gemini call + Firestore writes) running at once
+DIARY_WORKER_CONCURRENCY = 8
+
+# Per-user diary generation bookkeeping: the one task per uid, the uids whose task
+# is still waiting out the debounce (new saves merge into it), and the uids saved
+# again after their task started reading (the task runs one more pass)
+_pending_diary: Dict[str, asyncio.Task] = {}
+_diary_debouncing: Set[str] = set()
+_diary_dirty: Set[str] = set()
+
+# Background diary worker state, set up by start_diary_worker()
+_diary_queue: Optional[asyncio.Queue] = None
+_diary_loop: Optional[asyncio.AbstractEventLoop] = None
+_diary_semaphore: Optional[asyncio.Semaphore] = None
+_diary_worker_task: Optional[asyncio.Task] = None
+
+# Short-lived per-user cache of journal document reads. UI refreshes (map
+# re-center, list redraw) hit the getters repeatedly within seconds; writers
+# invalidate the entry so readers never see their own writes go missing.
+JOURNAL_CACHE_TTL = 30
+JOURNAL_CACHE_MAX_USERS = 10000
+_journal_cache: Dict[str, dict] = {}
+_journal_cache_lock = threading.Lock()
+
+
+def _get_gemini_client():
+    """
+    Return the shared Gemini client. Imported here rather than at module load so
+    that importing db_service doesn't pull in the Gemini SDK.
+    """
+    from utils.gemini_client import get_gemini_client
+    return get_gemini_client()
 
 
 def _extract_text_from_gemini_result(result) -> Optional[str]:
@@ -90,11 +154,138 @@ def _extract_text_from_gemini_result(result) -> Optional[str]:
 
     return None
 
+def _entries_col(uid: str):
+    """Sub-collection holding one document per conversation entry: journal/{uid}/entries/{timestamp}."""
+    return get_db().collection("journal").document(uid).collection("entries")
+
+
+def _journal_entries_col(uid: str):
+    """
+    Sub-collection holding one document per journal entry: journal/{uid}/journal_entries/{timestamp}.
+    Kept apart from conversation entries so their timestamp IDs can't collide and
+    conversation queries (diary, per-date reads, the feed) never pick them up.
+    """
+    return get_db().collection("journal").document(uid).collection("journal_entries")
+
+
+def _day_aggregates_col(uid: str):
+    """Per-day summary documents for the map view: journal/{uid}/day_aggregates/{date}."""
+    return get_db().collection("journal").document(uid).collection("day_aggregates")
+
+
+def _load_journal_data(uid: str) -> Optional[dict]:
+    """
+    Read the user's `journal` document and fold the `entries` sub-collection into
+    its date-keyed lists and the `journal_entries` sub-collection into the
+    `conversation` list, so callers see the same shape regardless of whether
+    entries were written before or after the sub-collection layout. Returns None
+    if the user has none of them.
+    """
+    doc = get_db().collection("journal").document(uid).get()
+    data = doc.to_dict() if doc.exists else None
+    entries = [d.to_dict() for d in _entries_col(uid).order_by("timestamp").stream()]
+    journal_entries = [d.to_dict() for d in _journal_entries_col(uid).order_by("timestamp").stream()]
+
+    if data is None and not entries and not journal_entries:
+        return None
+
+    data = data or {}
+    for entry in entries:
+        if entry.get("kind") == JOURNAL_ENTRY_KIND:
+            data.setdefault("conversation", []).append(entry)
+        else:
+            data.setdefault(entry.get("date") or entry.get("timestamp", "")[:10], []).append(entry)
+    if journal_entries:
+        data.setdefault("conversation", []).extend(journal_entries)
+    return data
+
+
+def _peek_journal_cache(uid: str) -> Optional[dict]:
+    """Return the cached journal data for a user if still fresh, without reading Firestore."""
+    with _journal_cache_lock:
+        v = _journal_cache.get(uid)
+        if v and v["val"] is not None and time.time() - v["ts"] < JOURNAL_CACHE_TTL:
+            return copy.deepcopy(v["val"])
+    return None
+
+
+def _get_journal_doc(uid: str, stale_ok: bool = True) -> Optional[dict]:
+    """
+    Return the user's journal data (see _load_journal_data), served from the TTL
+    cache when fresh and `stale_ok` is set. Callers get their own copy, so
+    mutating the result (e.g. photo URL normalization) never leaks into the cache.
+    """
+    if stale_ok:
+        with _journal_cache_lock:
+            v = _journal_cache.get(uid)
+            if v and time.time() - v["ts"] < JOURNAL_CACHE_TTL:
+                return copy.deepcopy(v["val"])
+
+    data = _load_journal_data(uid)
+
+    with _journal_cache_lock:
+        if uid not in _journal_cache and len(_journal_cache) >= JOURNAL_CACHE_MAX_USERS:
+            # Evict the oldest insertion
+            _journal_cache.pop(next(iter(_journal_cache)), None)
+        _journal_cache[uid] = {"val": data, "ts": time.time()}
+
+    return copy.deepcopy(data)
+
+
+def _load_map_extras(uid: str) -> dict:
+    """
+    Read what the map view needs beyond the journal data: the per-day aggregates
+    and the generated daily summaries from entries/{uid}.
+    """
+    aggregates = {d.id: d.to_dict() for d in _day_aggregates_col(uid).stream()}
+
+    summaries = {}
+    try:
+        entries_doc = get_db().collection('entries').document(uid).get()
+        if entries_doc.exists:
+            entries_data = entries_doc.to_dict() or {}
+            if isinstance(entries_data.get('summaries', {}), dict):
+                summaries = entries_data.get('summaries', {})
+    except Exception:
+        # If any error reading entries collection, fall back to generic text
+        pass
+
+    return {"aggregates": aggregates, "summaries": summaries}
+
+
+def _get_map_extras(uid: str, stale_ok: bool = True) -> dict:
+    """
+    Return _load_map_extras(uid), cached alongside the user's journal data: same
+    key and TTL, and dropped by the same invalidate_journal_cache() on write.
+    """
+    if stale_ok:
+        with _journal_cache_lock:
+            v = _journal_cache.get(uid)
+            if v and "map" in v and time.time() - v["ts"] < JOURNAL_CACHE_TTL:
+                return copy.deepcopy(v["map"])
+
+    extras = _load_map_extras(uid)
+
+    with _journal_cache_lock:
+        v = _journal_cache.get(uid)
+        # Only attached to a fresh journal entry, so both expire together
+        if v and time.time() - v["ts"] < JOURNAL_CACHE_TTL:
+            v["map"] = extras
+
+    return copy.deepcopy(extras)
+
+
+def invalidate_journal_cache(uid: str):
+    """Drop the cached journal data (and its map extras) for a user after a write."""
+    with _journal_cache_lock:
+        _journal_cache.pop(uid, None)
+
+
 def save_cultural_summary(user_id: str, session_id: str, cultural_data: dict):
     """
     Saves cultural summary data to Firestore for a specific user session.
     """
-    doc_ref = db.collection("cultural_summaries").document(f"{user_id}_{session_id}")
+    doc_ref = get_db().collection("cultural_summaries").document(f"{user_id}_{session_id}")
     
     # Set the document with the cultural data
     doc_ref.set(cultural_data, merge=True)
@@ -104,121 +295,252 @@ def get_cultural_summary(user_id: str, session_id: str):
     """
     Retrieves cultural summary data for a specific user session.
     """
-    doc_ref = db.collection("cultural_summaries").document(f"{user_id}_{session_id}")
+    doc_ref = get_db().collection("cultural_summaries").document(f"{user_id}_{session_id}")
     doc = doc_ref.get()
     return doc.to_dict() if doc.exists else None
 
 
 def save_journal_entry(uid: str, entry: dict):
     """
-    Adds a chat summary (photo + summary + timestamp) to the user's Firestore document.
+    Adds a chat summary (photo + summary + timestamp) to the user's journal as a
+    document in the `journal_entries` sub-collection, which readers list under
+    the `conversation` key alongside legacy journal entries.
     """
-    doc_ref = db.collection("journal").document(uid)
-
-    # If the doc doesn't exist yet, create it with the first entry
-    doc = doc_ref.get()
-    if not doc.exists:
-        doc_ref.set({"conversation": [entry]})
-    else:
-        # Append entry to conversation array
-        doc_ref.update({
-            "conversation": firestore.ArrayUnion([entry])
-        })
+    has_location = _entry_has_location(entry)
+    batch = get_db().batch()
+    batch.set(
+        _journal_entries_col(uid).document(entry["timestamp"]),
+        {**entry, "date": entry["timestamp"][:10], "has_location": has_location},
+    )
+    if has_location:
+        batch.set(get_db().collection("journal").document(uid), {"has_any_location": True}, merge=True)
+    batch.commit()
+    invalidate_journal_cache(uid)
+
+@firestore.transactional
+def _save_conversation_entry_txn(transaction, entry_ref, agg_ref, entry: dict):
+    """
+    Write a conversation entry and fold it into its day's aggregate document,
+    which keeps the message count plus the first location and photo seen that day.
+    Located entries also mark the parent journal document with `has_any_location`.
+    """
+    snapshot = agg_ref.get(transaction=transaction)
+    agg = snapshot.to_dict() if snapshot.exists else {"date": entry["date"], "count": 0}
+
+    _fold_into_day_aggregate(agg, entry)
+
+    transaction.set(entry_ref, entry)
+    transaction.set(agg_ref, agg)
+    if entry.get("has_location"):
+        transaction.set(agg_ref.parent.parent, {"has_any_location": True}, merge=True)
+
+def _fold_into_day_aggregate(agg: dict, entry: dict):
+    """Count a conversation entry in its day's aggregate, keeping the first location and photo."""
+    agg["count"] = agg.get("count", 0) + 1
+    if not agg.get("latitude") and entry.get("latitude") and entry.get("longitude"):
+        agg["latitude"] = entry["latitude"]
+        agg["longitude"] = entry["longitude"]
+        agg["location_name"] = entry.get("location_name", "Unknown Location")
+        agg["location_timestamp"] = entry["timestamp"]
+    if not agg.get("photo_url") and entry.get("photo_url"):
+        agg["photo_url"] = entry["photo_url"]
+
+def _entry_has_location(entry: dict) -> bool:
+    """Whether an entry carries top-level latitude/longitude or nested coordinates.lat/lng."""
+    if entry.get("latitude") and entry.get("longitude"):
+        return True
+    coords = entry.get("coordinates")
+    return bool(coords and coords.get("lat") and coords.get("lng"))
 
 def save_conversation_entry(uid: str, entry: dict):
     """
     Save a conversation entry organized by date.
-    Creates a new document for each unique user ID.
+    Creates a new document in the user's `entries` sub-collection for each entry.
     """
-    print(f"💾 Saving conversation for user: {uid}")
-    print(f"📝 Entry data: {entry}")
+    logger.debug("Saving conversation for user %s: %s", uid, entry)
     
-    # Get current date for organization
-    entry_date = datetime.fromisoformat(entry["timestamp"]).date().isoformat()
-    print(f"📅 Entry date: {entry_date}")
-    
-    # Store conversations inside the `journal` collection to consolidate chat + journal data
-    doc_ref = db.collection("journal").document(uid)
-    
-    # Get existing document
-    doc = doc_ref.get()
+    # Get current date for organization. Timestamps are ISO-8601, so the date is
+    # the first 10 characters.
+    entry_date = entry["timestamp"][:10]
     
-    if not doc.exists:
-        # Create new document with first entry
-        print(f"🆕 Creating new conversation document for user: {uid}")
-        doc_ref.set({
-            entry_date: [entry]
-        })
-        print(f"✅ Created new document with first entry for {entry_date}")
-    else:
-        print(f"📋 Document exists for user: {uid}")
-        doc_data = doc.to_dict()
-        if entry_date in doc_data:
-            # Update existing date's entries
-            print(f"📝 Adding to existing date {entry_date}")
-            doc_ref.update({
-                entry_date: firestore.ArrayUnion([entry])
-            })
-        else:
-            # Add new date
-            print(f"🆕 Adding new date {entry_date}")
-            doc_ref.update({
-                entry_date: [entry]
-            })
+    # Each conversation is its own document under journal/{uid}/entries, keyed by
+    # timestamp, so a save is a single point write with no array growth. The day's
+    # aggregate is updated in the same transaction.
+    transaction = get_db().transaction()
+    _save_conversation_entry_txn(
+        transaction,
+        _entries_col(uid).document(entry["timestamp"]),
+        _day_aggregates_col(uid).document(entry_date),
+        {**entry, "date": entry_date, "has_location": _entry_has_location(entry)},
+    )
     
-    print(f"✅ Successfully saved conversation entry for user {uid} on {entry_date}")
+    invalidate_journal_cache(uid)
+    logger.debug("Saved conversation entry for user %s on %s", uid, entry_date)
 
     # After saving a conversation entry, asynchronously attempt to generate a diary
     # entry for the user's journal. This runs in the background so the request
     # that triggered the save does not block on LLM generation.
+    _schedule_diary_generation(uid)
+
+
+def start_diary_worker():
+    """
+    Start the background diary worker on the running event loop. Called once at
+    app startup; until then (e.g. in scripts) diary tasks are scheduled directly.
+    """
+    global _diary_queue, _diary_loop, _diary_semaphore, _diary_worker_task
+    if _diary_queue is not None:
+        return
+    _diary_loop = asyncio.get_running_loop()
+    _diary_queue = asyncio.Queue()
+    _diary_semaphore = asyncio.Semaphore(DIARY_WORKER_CONCURRENCY)
+    _diary_worker_task = _diary_loop.create_task(_diary_worker())
+
+
+async def _diary_worker():
+    """Consume uids queued by conversation saves and start their diary generation."""
+    while True:
+        uid = await _diary_queue.get()
+        _start_diary_task(uid)
+
+
+def _schedule_diary_generation(uid: str):
+    """
+    Request a diary generation for the user. With the worker running the uid is
+    queued, including from sync routes running in the threadpool; otherwise the
+    task is started on the current loop.
+    """
+    if _diary_queue is not None:
+        try:
+            on_worker_loop = asyncio.get_running_loop() is _diary_loop
+        except RuntimeError:
+            on_worker_loop = False
+        if on_worker_loop:
+            _diary_queue.put_nowait(uid)
+        else:
+            _diary_loop.call_soon_threadsafe(_diary_queue.put_nowait, uid)
+        return
+
+    _start_diary_task(uid)
+
+
+def _start_diary_task(uid: str):
+    """
+    Start a debounced diary generation for the user. A request made while this
+    uid's task is still debouncing is coalesced into it; one made after the task
+    started generating marks the uid dirty so the task runs another pass.
+    """
+    pending = _pending_diary.get(uid)
+    if pending is not None and not pending.done():
+        if uid not in _diary_debouncing:
+            _diary_dirty.add(uid)
+        return
+
     try:
         loop = asyncio.get_running_loop()
-        loop.create_task(generate_and_save_diary_for_user(uid))
+        _pending_diary[uid] = loop.create_task(_debounced_diary_generation(uid))
     except RuntimeError:
         # No running loop (e.g., invoked outside async context) - schedule via asyncio
         try:
-            asyncio.create_task(generate_and_save_diary_for_user(uid))
+            _pending_diary[uid] = asyncio.create_task(_debounced_diary_generation(uid))
         except Exception as e:
-            print(f"⚠️ Could not schedule diary generation task: {e}")
+            logger.warning("Could not schedule diary generation task: %s", e)
+            return
+    _diary_debouncing.add(uid)
+
 
-def get_daily_conversations(uid: str, date_filter: Optional[str] = None) -> Dict:
+async def _debounced_diary_generation(uid: str):
+    """
+    Wait out a burst of saves, then generate a single diary for the user. Repeats
+    (debounce included) while saves arrived during the previous generation.
+    """
+    try:
+        while True:
+            await asyncio.sleep(DIARY_DEBOUNCE_SECONDS)
+            async with _diary_semaphore or contextlib.nullcontext():
+                _diary_debouncing.discard(uid)
+                await generate_and_save_diary_for_user(uid)
+            if uid not in _diary_dirty:
+                break
+            _diary_dirty.discard(uid)
+            _diary_debouncing.add(uid)
+    finally:
+        _pending_diary.pop(uid, None)
+        _diary_debouncing.discard(uid)
+        _diary_dirty.discard(uid)
+
+def get_daily_conversations(uid: str, date_filter: Optional[str] = None, stale_ok: bool = True) -> Dict:
     """
     Get conversations organized by date. Reads from the `journal` collection where
     conversations are now stored (date-keyed). Returns the same structure as before.
+
+    With `stale_ok` (the default for UI reads) a cached snapshot up to
+    JOURNAL_CACHE_TTL seconds old may be returned instead of reading Firestore.
     """
-    doc_ref = db.collection("journal").document(uid)
-    doc = doc_ref.get()
-    
-    if not doc.exists:
-        return {"conversations": {}}
-    
-    doc_data = doc.to_dict()
-    
+    cached = _peek_journal_cache(uid) if stale_ok and date_filter else None
+    if cached is not None:
+        return {
+            "conversations": {
+                date_filter: cached.get(date_filter, [])
+            }
+        }
+
     if date_filter:
-        # Return only conversations for specific date
+        # Return only conversations for specific date: read just that date's legacy
+        # array from the parent document plus the matching sub-collection entries.
+        doc = get_db().collection("journal").document(uid).get(
+            field_paths=[firestore.FieldPath(date_filter).to_api_repr()]
+        )
+        conversations = list((doc.to_dict() or {}).get(date_filter, [])) if doc.exists else []
+        conversations.extend(
+            e for e in (d.to_dict() for d in _entries_col(uid).where("date", "==", date_filter).stream())
+            if e.get("kind") != JOURNAL_ENTRY_KIND
+        )
         return {
             "conversations": {
-                date_filter: doc_data.get(date_filter, [])
+                date_filter: conversations
             }
         }
     
+    doc_data = _get_journal_doc(uid, stale_ok)
+    
+    if doc_data is None:
+        return {"conversations": {}}
+    doc_data.pop("has_any_location", None)
+    
     # Return all conversations organized by date
     return {"conversations": doc_data}
 
-def get_conversation_locations(uid: str) -> List[Dict]:
+def _has_legacy_entries(doc_data: dict) -> bool:
+    """
+    Whether the journal data holds entries written to the parent document's arrays
+    before the sub-collection layout. Those predate the `date` field and the
+    has_any_location marker. Legacy entries precede folded ones within a date list,
+    so looking at the first element of each list is enough.
+    """
+    return any(
+        isinstance(v, list) and v and isinstance(v[0], dict) and "date" not in v[0]
+        for v in doc_data.values()
+    )
+
+def get_conversation_locations(uid: str, stale_ok: bool = True) -> List[Dict]:
     """
     Get daily conversation locations for map display.
     Returns one location per day with all conversations for that day grouped together.
+    With `stale_ok`, the journal data may come from the short-lived cache.
     """
     # Conversation locations are derived from the date-keyed conversation structure
     # stored under the `journal` collection for each user.
-    doc_ref = db.collection("journal").document(uid)
-    doc = doc_ref.get()
+    doc_data = _get_journal_doc(uid, stale_ok)
     
-    if not doc.exists:
+    if doc_data is None:
+        return []
+
+    # Users whose entries all live in the sub-collection get the has_any_location
+    # marker once they save a located conversation; without it there is nothing to pin.
+    if not doc_data.get("has_any_location") and not _has_legacy_entries(doc_data):
         return []
     
-    doc_data = doc.to_dict()
     locations = []
 
     # Normalize different storage shapes into a date -> [conversations] map
@@ -240,68 +562,71 @@ def get_conversation_locations(uid: str) -> List[Dict]:
             # New date-keyed list format: key is the date
             date_map.setdefault(k, []).extend(v)
 
+    # Per-day aggregates maintained on write by save_conversation_entry, and the
+    # generated daily summaries from the `entries` collection, cached with the journal data
+    extras = _get_map_extras(uid, stale_ok)
+    aggregates = extras["aggregates"]
+    summaries = extras["summaries"]
+
     # Process each date to create one location per day
     for date_key, conversations in date_map.items():
-        # Find conversations with location data for this date
-        conversations_with_location = []
-        for conv in conversations:
-            # Check top-level latitude/longitude
-            if conv.get("latitude") and conv.get("longitude"):
-                conversations_with_location.append(conv)
-            # Check nested coordinates.lat/lng
-            elif conv.get("coordinates") and conv["coordinates"].get("lat") and conv["coordinates"].get("lng"):
-                conversations_with_location.append(conv)
-
-        if not conversations_with_location:
-            # No location-bearing conversations for this date -> skip
+        if not any(conv.get("has_location", True) for conv in conversations):
+            # Every entry for this date is flagged on write as having no location
             continue
-
-        # Use the first conversation's location as the day's location
-        first_conv = conversations_with_location[0]
-
-        # Extract latitude and longitude (support both formats)
-        if first_conv.get("latitude") and first_conv.get("longitude"):
-            latitude = first_conv["latitude"]
-            longitude = first_conv["longitude"]
+        agg = aggregates.get(date_key)
+        if agg and agg.get("count") == len(conversations):
+            # Every conversation for this date is covered by the aggregate, so the
+            # day's location and photo are already known without scanning.
+            if not agg.get("latitude") or not agg.get("longitude"):
+                continue
+            latitude = agg["latitude"]
+            longitude = agg["longitude"]
+            location_name = agg.get("location_name", "Unknown Location")
+            timestamp = agg.get("location_timestamp", "")
+            photo_url = agg.get("photo_url")
         else:
-            # Nested coordinates format
-            latitude = first_conv["coordinates"]["lat"]
-            longitude = first_conv["coordinates"]["lng"]
+            # Find conversations with location data for this date
+            first_conv = next((conv for conv in conversations if _entry_has_location(conv)), None)
+
+            if first_conv is None:
+                # No location-bearing conversations for this date -> skip
+                continue
+
+            # Use the first conversation's location as the day's location
+            # (support both formats)
+            if first_conv.get("latitude") and first_conv.get("longitude"):
+                latitude = first_conv["latitude"]
+                longitude = first_conv["longitude"]
+            else:
+                # Nested coordinates format
+                latitude = first_conv["coordinates"]["lat"]
+                longitude = first_conv["coordinates"]["lng"]
+            location_name = first_conv.get("location_name", "Unknown Location")
+            timestamp = first_conv.get("timestamp", "")
+
+            # Check if any conversation has a photo (support multiple keys)
+            photo_url = None
+            for conv in conversations:
+                if conv.get("photo_url"):
+                    photo_url = conv.get("photo_url")
+                    break
+                if conv.get("photoUrl"):
+                    photo_url = conv.get("photoUrl")
+                    break
+                # permissive: any key containing 'photo'
+                for key in conv.keys():
+                    if 'photo' in key.lower() and conv.get(key):
+                        photo_url = conv.get(key)
+                        break
+                if photo_url:
+                    break
 
         # Combine all messages from the day
         all_messages = [conv.get("message", "") for conv in conversations]
         all_responses = [conv.get("response", "") for conv in conversations]
 
-        # Check if any conversation has a photo (support multiple keys)
-        photo_url = None
-        for conv in conversations:
-            if conv.get("photo_url"):
-                photo_url = conv.get("photo_url")
-                break
-            if conv.get("photoUrl"):
-                photo_url = conv.get("photoUrl")
-                break
-            # permissive: any key containing 'photo'
-            for key in conv.keys():
-                if 'photo' in key.lower() and conv.get(key):
-                    photo_url = conv.get(key)
-                    break
-            if photo_url:
-                break
-
         # Prefer a generated daily summary from the `entries` collection, if available.
-        response_text = f"Multiple conversations from {date_key}"
-        try:
-            entries_doc = db.collection('entries').document(uid).get()
-            if entries_doc.exists:
-                entries_data = entries_doc.to_dict() or {}
-                summaries = entries_data.get('summaries', {}) if isinstance(entries_data.get('summaries', {}), dict) else {}
-                daily_summary = summaries.get(date_key)
-                if daily_summary:
-                    response_text = daily_summary
-        except Exception:
-            # If any error reading entries collection, fall back to generic text
-            pass
+        response_text = summaries.get(date_key) or f"Multiple conversations from {date_key}"
 
         # Only include a location if we have some meaningful metadata: either a photo
         # or a non-generic daily summary or at least one non-empty response/summary
@@ -314,11 +639,11 @@ def get_conversation_locations(uid: str) -> List[Dict]:
             "id": f"daily_{date_key}",
             "latitude": latitude,
             "longitude": longitude,
-            "location_name": first_conv.get("location_name", "Unknown Location"),
+            "location_name": location_name,
             "message": f"Day's conversations ({len(conversations)} messages)",
             "response": response_text,
             "photo_url": photo_url,
-            "timestamp": first_conv.get("timestamp", ""),
+            "timestamp": timestamp,
             "date": date_key,
             "total_conversations": len(conversations),
             "all_messages": all_messages,
@@ -330,25 +655,58 @@ def get_conversation_locations(uid: str) -> List[Dict]:
     locations.sort(key=lambda x: x["date"], reverse=True)
     return locations
 
+def _recent_group_entries(group: str, limit: int) -> List[tuple]:
+    """
+    The `limit` newest documents across all users' journal/{uid}/{group}
+    sub-collections, as (uid, entry) pairs. Documents elsewhere that share the
+    collection ID (e.g. the top-level `entries` collection) have no journal user
+    as parent; they are skipped and the next page is read, so they never use up
+    the limit.
+    """
+    query = get_db().collection_group(group).order_by("timestamp", direction=firestore.Query.DESCENDING)
+    results = []
+    last = None
+    while len(results) < limit:
+        page = list((query.start_after(last) if last is not None else query).limit(limit).stream())
+        for d in page:
+            parent = d.reference.parent.parent
+            if parent is None or parent.parent.id != "journal":
+                continue
+            results.append((parent.id, d.to_dict()))
+            if len(results) == limit:
+                break
+        if len(page) < limit:
+            break
+        last = page[-1]
+    return results
+
+def get_recent_conversation_entries(limit: int = 50) -> List[tuple]:
+    """
+    Get the most recent conversation and journal entries across all users from
+    their `entries` and `journal_entries` sub-collections, as (uid, entry) pairs,
+    newest first. The collection-group queries run on the COLLECTION_GROUP
+    timestamp indexes declared in firestore.indexes.json.
+    """
+    results = _recent_group_entries("entries", limit) + _recent_group_entries("journal_entries", limit)
+    results.sort(key=lambda pair: pair[1].get("timestamp", ""), reverse=True)
+    return results[:limit]
+
 def get_journal_entries(uid: str):
     """
     Retrieves all conversation summaries for a user.
     """
-    doc_ref = db.collection("journal").document(uid)
-    doc = doc_ref.get()
-    return doc.to_dict() if doc.exists else {"conversation": []}
+    doc_data = _get_journal_doc(uid)
+    return doc_data if doc_data is not None else {"conversation": []}
 
 def get_journal_entries_by_date(uid: str) -> Dict:
     """
     Get journal entries organized by date from the journal collection.
     """
-    doc_ref = db.collection("journal").document(uid)
-    doc = doc_ref.get()
+    doc_data = _get_journal_doc(uid)
     
-    if not doc.exists:
+    if doc_data is None:
         return {"journal_entries": {}}
     
-    doc_data = doc.to_dict()
     journal_entries = doc_data.get("conversation", [])
     
     # Group by date
@@ -371,36 +729,53 @@ def get_journal_entries_by_date(uid: str) -> Dict:
     
     return {"journal_entries": entries_by_date}
 
-def update_journal_entry(uid: str, timestamp: str, summary: str, diary: Optional[str] = None) -> bool:
+@firestore.transactional
+def _update_journal_entry_txn(transaction, doc_ref, timestamp: str, summary: str, diary: Optional[str]) -> bool:
     """
-    Update a journal entry by timestamp.
+    Read and rewrite the `conversation` array inside a single transaction so that
+    concurrent updates to the same journal document cannot overwrite each other.
     """
-    doc_ref = db.collection("journal").document(uid)
-    doc = doc_ref.get()
-    
-    if not doc.exists:
+    snapshot = doc_ref.get(transaction=transaction)
+    if not snapshot.exists:
         return False
-    
-    doc_data = doc.to_dict()
-    journal_entries = doc_data.get("conversation", [])
-    
+
+    journal_entries = (snapshot.to_dict() or {}).get("conversation", [])
+
     # Find the entry with matching timestamp
-    updated = False
     for entry in journal_entries:
         if entry.get("timestamp") == timestamp:
             entry["summary"] = summary
             if diary is not None:
                 entry["diary"] = diary
-            updated = True
-            break
-    
-    if updated:
-        # Update the entire conversation array
-        doc_ref.update({"conversation": journal_entries})
-        return True
-    
+            transaction.update(doc_ref, {"conversation": journal_entries})
+            return True
+
     return False
 
+def update_journal_entry(uid: str, timestamp: str, summary: str, diary: Optional[str] = None) -> bool:
+    """
+    Update a journal entry by timestamp.
+    """
+    # Entries in the sub-collections are a single-document write with no read
+    fields = {"summary": summary}
+    if diary is not None:
+        fields["diary"] = diary
+    for col in (_journal_entries_col(uid), _entries_col(uid)):
+        try:
+            col.document(timestamp).update(fields)
+            invalidate_journal_cache(uid)
+            return True
+        except NotFound:
+            pass
+
+    # Legacy entries still live in the parent document's `conversation` array
+    doc_ref = get_db().collection("journal").document(uid)
+    transaction = get_db().transaction()
+    updated = _update_journal_entry_txn(transaction, doc_ref, timestamp, summary, diary)
+    if updated:
+        invalidate_journal_cache(uid)
+    return updated
+
 
 def save_entry(uid: str, entry: dict):
     """
@@ -415,14 +790,12 @@ def save_entry(uid: str, entry: dict):
     This function schedules an asynchronous summary regeneration for the affected date.
     """
     try:
-        from services.firebase_client import db
-
         ts = entry.get('timestamp') or datetime.utcnow().isoformat()
         date_key = ts.split('T')[0]
         # Use a safe map key for timestamp (replace ':' with '_') so it can be used as a field name
         ts_key = ts.replace(':', '_')
 
-        doc_ref = db.collection('entries').document(uid)
+        doc_ref = get_db().collection('entries').document(uid)
 
         # Try to update using dot-path. If doc doesn't exist, set with merge.
         try:
@@ -453,10 +826,9 @@ async def generate_and_update_summary(uid: str, date_key: str):
     for the date and stores one central diary string.
     """
     try:
-        from utils.gemini_client import gemini_client
-        from services.firebase_client import db
+        gemini_client = _get_gemini_client()
 
-        doc_ref = db.collection('entries').document(uid)
+        doc_ref = get_db().collection('entries').document(uid)
         doc = doc_ref.get()
         if not doc.exists:
             print(f"ℹ️ No entries document for user {uid}, skipping summary generation for {date_key}")
@@ -509,11 +881,13 @@ Conversation pieces:\n\n{chr(10).join(entry_texts)}"""
         # Save diary under summaries map
         try:
             doc_ref.update({f"summaries.{date_key}": diary_text})
+            invalidate_journal_cache(uid)
             print(f"✅ Saved daily summary for user {uid} date {date_key}")
         except Exception as save_err:
             try:
                 # If update failed because summaries doesn't exist yet, merge set
                 doc_ref.set({"summaries": {date_key: diary_text}}, merge=True)
+                invalidate_journal_cache(uid)
                 print(f"✅ Created summaries map and saved daily summary for user {uid} date {date_key}")
             except Exception as e:
                 print(f"⚠️ Failed to save daily summary for user {uid} date {date_key}: {e}")
@@ -528,9 +902,7 @@ def get_entries_for_date(uid: str, date_key: str) -> dict:
     Returns a dict: { 'entries': [ ... ], 'summary': str|None, 'images': [ ... ] }
     """
     try:
-        from services.firebase_client import db
-
-        doc_ref = db.collection('entries').document(uid)
+        doc_ref = get_db().collection('entries').document(uid)
         doc = doc_ref.get()
         if not doc.exists:
             return {"entries": [], "summary": None, "images": []}
@@ -570,110 +942,121 @@ async def generate_and_save_diary_for_user(uid: str):
     `journal` document.
 
     This function is resilient to different conversation storage shapes:
+    - one document per entry in the `journal/{uid}/entries` sub-collection
     - date-keyed lists (e.g., { '2025-10-26': [entries] })
     - a top-level 'conversation' array
     """
     try:
-        from utils.gemini_client import gemini_client
-        from services.firebase_client import db
-
-        doc_ref = db.collection('journal').document(uid)
-        doc = doc_ref.get()
-        if not doc.exists:
-            print(f"ℹ️ No journal document for user {uid}, skipping diary generation")
-            return
-
-        doc_data = doc.to_dict()
-
-        # Flatten conversation entries from possible layouts
-        conversations = []
-        # If there's a 'conversation' array, use it
-        if isinstance(doc_data.get('conversation'), list):
-            conversations = doc_data.get('conversation', [])
-        else:
-            # Otherwise, gather all list-typed values (date-keyed)
-            for k, v in doc_data.items():
-                if isinstance(v, list):
-                    conversations.extend(v)
+        gemini_client = _get_gemini_client()
+
+        doc_ref = get_db().collection('journal').document(uid)
+
+        # Only the most recent entries are candidates for a diary, so fetch just
+        # those from the `entries` sub-collection instead of the whole history.
+        # Firestore calls are blocking, so they run in a worker thread to keep the
+        # event loop free while many diary generations overlap.
+        recent_query = (
+            _entries_col(uid)
+            .order_by('timestamp', direction=firestore.Query.DESCENDING)
+            .limit(RECENT_DIARY_ENTRIES)
+        )
+        entry_docs = [d.to_dict() for d in await asyncio.to_thread(recent_query.get)]
+        # Journal entries written here before they had their own sub-collection
+        entry_docs = [e for e in entry_docs if e.get('kind') != JOURNAL_ENTRY_KIND]
+        entry_docs.reverse()
+
+        # Flatten conversation entries from possible layouts into (key, entry)
+        # pairs, where key names the legacy document array holding the entry
+        # (None for sub-collection documents). The pair found below is then
+        # updated directly, without searching the document a second time.
+        conversations = [(None, e) for e in entry_docs]
+        doc_data = {}
+        if not entry_docs:
+            # Users without sub-collection entries still keep everything in the
+            # legacy journal document.
+            doc = await asyncio.to_thread(doc_ref.get)
+            doc_data = doc.to_dict() if doc.exists else {}
+            # If there's a 'conversation' array, use it
+            if isinstance(doc_data.get('conversation'), list):
+                conversations = [('conversation', e) for e in doc_data['conversation']]
+            else:
+                # Otherwise, gather all list-typed values (date-keyed)
+                for k, v in doc_data.items():
+                    if isinstance(v, list):
+                        conversations.extend((k, e) for e in v)
 
         if not conversations:
-            print(f"ℹ️ No conversations to summarize for user {uid}")
+            logger.debug("No conversations to summarize for user %s", uid)
             return
 
         # Try to find an existing summary that doesn't yet have a diary
         conversation_summary = None
-        target_timestamp = None
-        for entry in reversed(conversations):
+        target_key, target_entry = None, None
+        for key, entry in reversed(conversations):
             if entry.get('summary') and not entry.get('diary'):
                 conversation_summary = entry.get('summary')
-                target_timestamp = entry.get('timestamp')
+                target_key, target_entry = key, entry
                 break
 
         # If none found, create one from recent responses/summaries
         if not conversation_summary:
-            recent_entries = conversations[-5:] if len(conversations) >= 5 else conversations
+            recent_entries = conversations[-RECENT_DIARY_ENTRIES:]
             entry_summaries = []
-            for entry in recent_entries:
+            for _, entry in recent_entries:
                 if entry.get('summary') and not entry.get('diary'):
                     entry_summaries.append(entry.get('summary'))
 
             if entry_summaries:
                 conversation_summary = ' | '.join(entry_summaries)
-                target_timestamp = recent_entries[-1].get('timestamp')
+                target_key, target_entry = recent_entries[-1]
 
         if not conversation_summary:
-            print(f"ℹ️ Could not build a conversation summary for user {uid}")
+            logger.debug("Could not build a conversation summary for user %s", uid)
             return
 
-        # Build prompt for LLM
-        prompt = f"""Transform this conversation summary into a personal, reflective diary entry.\n\nCRITICAL: Do NOT reference or use coordinates, GPS data, or any location metadata. Base the diary only on the textual conversation summary provided below.\n\nWrite in first person, introspective and emotionally aware, in 2–3 paragraphs.\nInclude insights, feelings, or reflections on what was learned or experienced.\n\nConversation Summary: {conversation_summary}"""
+        target_timestamp = target_entry.get('timestamp')
+
+        # Skip the LLM call when this exact summary already produced the entry's diary
+        summary_hash = hashlib.blake2b(conversation_summary.encode(), digest_size=8).hexdigest()
+        if target_entry.get('diary_hash') == summary_hash:
+            logger.debug("Diary for user %s is already up to date (timestamp=%s)", uid, target_timestamp)
+            return
+
+        prompt = DIARY_PROMPT_TEMPLATE.format(summary=conversation_summary)
 
         # Call gemini_client.generate_text() - support sync or async implementations
         try:
             if inspect.iscoroutinefunction(gemini_client.generate_text):
                 gen_result = await gemini_client.generate_text(prompt)
             else:
-                gen_result = gemini_client.generate_text(prompt)
+                gen_result = await asyncio.to_thread(gemini_client.generate_text, prompt)
 
             diary_text = _extract_text_from_gemini_result(gen_result)
 
             if not diary_text:
-                print(f"⚠️ Gemini returned empty diary for user {uid}")
+                logger.warning("Gemini returned empty diary for user %s", uid)
                 return
         except Exception as gen_err:
-            print(f"⚠️ Diary generation failed for user {uid}: {gen_err}")
+            logger.warning("Diary generation failed for user %s: %s", uid, gen_err)
             return
 
-        # Find the matching conversation entry and set diary field
-        updated = False
-        # If doc_data has 'conversation' array, update in-place
-        if isinstance(doc_data.get('conversation'), list):
-            for entry in doc_data['conversation']:
-                if entry.get('timestamp') == target_timestamp:
-                    entry['diary'] = diary_text
-                    updated = True
-                    break
-        else:
-            # Search date-keyed lists
-            for date_key, convs in list(doc_data.items()):
-                if isinstance(convs, list):
-                    for idx, entry in enumerate(convs):
-                        if entry.get('timestamp') == target_timestamp:
-                            doc_data[date_key][idx]['diary'] = diary_text
-                            updated = True
-                            break
-                    if updated:
-                        break
-
-        if updated:
-            try:
-                # Overwrite the document with the updated structure
-                doc_ref.set(doc_data, merge=False)
-                print(f"✅ Diary saved for user {uid} (timestamp={target_timestamp})")
-            except Exception as save_err:
-                print(f"⚠️ Failed to save diary for user {uid}: {save_err}")
-        else:
-            print(f"⚠️ Could not find matching conversation entry to attach diary for user {uid}")
+        try:
+            if target_key is None:
+                # Entries in the sub-collection are a single-document update
+                await asyncio.to_thread(
+                    _entries_col(uid).document(target_timestamp).update,
+                    {'diary': diary_text, 'diary_hash': summary_hash},
+                )
+            else:
+                # target_entry lives inside doc_data[target_key], so only that
+                # array is written back, leaving the rest of the document alone.
+                target_entry['diary'] = diary_text
+                target_entry['diary_hash'] = summary_hash
+                await asyncio.to_thread(doc_ref.update, {target_key: doc_data[target_key]})
+            invalidate_journal_cache(uid)
+            logger.info("Diary saved for user %s (timestamp=%s)", uid, target_timestamp)
+        except Exception as save_err:
+            logger.warning("Failed to save diary for user %s: %s", uid, save_err)
 
     except Exception as e:
-        print(f"⚠️ Unexpected error in generate_and_save_diary_for_user for {uid}: {e}")
+        logger.warning("Unexpected error in generate_and_save_diary_for_user for %s: %s", uid, e)
@@ -0,0 +1,37 @@
+import threading
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+# Created on first use rather than at import, so importing a module that touches
+# Firestore doesn't parse the service-account key or build a client
+_db = None
+_init_lock = threading.Lock()
+
+def initialize_firebase():
+    """Initialize Firebase Admin SDK"""
+    if not firebase_admin._apps:
+        cred = credentials.Certificate("firebase_key.json")
+        firebase_admin.initialize_app(cred)
+        print("Firebase initialized successfully")
+    else:
+        print("Firebase already initialized")
+
+def get_app():
+    """Return the default Firebase app, initializing it on first call."""
+    if not firebase_admin._apps:
+        with _init_lock:
+            if not firebase_admin._apps:
+                initialize_firebase()
+    return firebase_admin.get_app()
+
+def get_db():
+    """Return the shared Firestore client, creating it on first call."""
+    global _db
+    if _db is None:
+        with _init_lock:
+            if _db is None:
+                if not firebase_admin._apps:
+                    initialize_firebase()
+                _db = firestore.client()
+    return _db
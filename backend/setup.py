@@ -0,0 +1,27 @@
+# backend/setup.py
+"""
+Optional native build of hot pure-Python modules.
+
+Compiles the listed modules in place with Cython. The resulting extension
+(e.g. utils/bus.cpython-*.so) sits next to its .py source and is picked up by
+the regular `from utils.bus import ...` imports; without it the pure-Python
+module is used unchanged.
+
+Usage: python setup.py build_ext --inplace
+"""
+
+from setuptools import Extension, setup
+
+# Interpreter-bound modules worth compiling (dotted name -> source)
+CYTHON_MODULES = [Extension("utils.bus", ["utils/bus.py"])]
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
+    print("⚠️ Cython not installed; skipping native build (pure-Python modules are used)")
+
+setup(
+    name="hermes-backend-native",
+    ext_modules=cythonize(CYTHON_MODULES, language_level=3) if cythonize else [],
+)
@@ -6,6 +6,11 @@ Test the chat routes functionality.
 import requests
 import json
 
+# One pooled session for every request, so the tests reuse a keep-alive
+# connection instead of opening a new one per call
+SESSION = requests.Session()
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
 def test_chat_routes():
     """Test the chat routes endpoints."""
     print("🧪 TESTING CHAT ROUTES")
@@ -24,7 +29,7 @@ def test_chat_routes():
             'session_id': session_id
         }
         
-        response = requests.post(
+        response = SESSION.post(
             "http://localhost:8000/api/chat/",
             data=data,
             timeout=30
@@ -54,7 +59,7 @@ def test_session_endpoint():
         user_id = "test_user"
         session_id = "test_session"
         
-        response = requests.get(f"http://localhost:8000/api/chat/session/{user_id}/{session_id}")
+        response = SESSION.get(f"http://localhost:8000/api/chat/session/{user_id}/{session_id}")
         
         if response.status_code == 200:
             result = response.json()
@@ -80,7 +85,7 @@ def test_api_endpoints():
     
     try:
         # Test health endpoint
-        response = requests.get("http://localhost:8000/", timeout=5)
+        response = SESSION.get("http://localhost:8000/", timeout=5)
         if response.status_code == 200:
             print("✅ API server is running")
         else:
@@ -7,30 +7,38 @@ Usage: python tests/quick_test.py <image_path> <lat> <lng> [entity_name]
 import asyncio
 import sys
 import os
-import base64
 from pathlib import Path
 
 # Add parent directory to path for imports
-sys.path.append(str(Path(__file__).parent.parent))
+_parent = str(Path(__file__).parent.parent)
+if _parent not in sys.path:
+    sys.path.append(_parent)
+
+from utils.helpers import encode_file_base64
+from utils.gps_extractor import GPS_IFD_TAG, convert_to_decimal, read_exif_gps_file
+from utils.location_api_standalone import get_user_location_from_api, process_image_location_with_api
+from utils.standalone_gps import process_image_location
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
 def extract_coordinates_from_image(image_path: str):
     """Extract GPS coordinates from image EXIF data."""
     try:
-        from PIL import Image
-        from PIL.ExifTags import TAGS, GPSTAGS
-        
-        image = Image.open(image_path)
-        exif_data = image._getexif()
-        
-        if exif_data is None:
-            return None
-        
-        exif = {}
-        for tag_id, value in exif_data.items():
-            tag = TAGS.get(tag_id, tag_id)
-            exif[tag] = value
+        # Read just the GPS tags from the EXIF segment; fall back to PIL otherwise
+        gps_info = read_exif_gps_file(image_path)
+        if gps_info is None and Image is not None:
+            image = Image.open(image_path)
+            # getexif() parses IFD0 only; get_ifd() then reads just the GPS IFD
+            exif_data = image.getexif()
+            
+            if not exif_data:
+                return None
+            
+            gps_info = exif_data.get_ifd(GPS_IFD_TAG)
         
-        gps_info = exif.get('GPSInfo')
         if not gps_info:
             return None
         
@@ -42,15 +50,6 @@ def extract_coordinates_from_image(image_path: str):
         
         if lat and lng:
             # Convert to decimal degrees
-            def convert_to_decimal(coord, ref):
-                degrees = float(coord[0])
-                minutes = float(coord[1])
-                seconds = float(coord[2])
-                decimal = degrees + (minutes / 60.0) + (seconds / 3600.0)
-                if ref in ['S', 'W']:
-                    decimal = -decimal
-                return decimal
-            
             lat_decimal = convert_to_decimal(lat, lat_ref)
             lng_decimal = convert_to_decimal(lng, lng_ref)
             
@@ -66,8 +65,7 @@ def extract_coordinates_from_image(image_path: str):
 def encode_image_to_base64(image_path: str) -> str:
     """Convert image file to base64 string."""
     try:
-        with open(image_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
+        encoded_string = encode_file_base64(image_path)
         print(f"✅ Image encoded: {len(encoded_string)} characters")
         return encoded_string
     except Exception as e:
@@ -146,8 +144,6 @@ async def test_with_image(image_path: str, lat: float, lng: float, entity_name:
         print(f"\n📋 LOCATION API TEST")
         print("-" * 30)
         
-        from utils.location_api_standalone import get_user_location_from_api
-        
         # Test location API directly
         location_result = get_user_location_from_api()
         
@@ -165,8 +161,6 @@ async def test_with_image(image_path: str, lat: float, lng: float, entity_name:
         print(f"\n📋 GPS EXTRACTION TEST")
         print("-" * 30)
         
-        from utils.standalone_gps import process_image_location
-        
         gps_result = process_image_location(image_data, "base64")
         
         if gps_result["success"]:
@@ -182,8 +176,6 @@ async def test_with_image(image_path: str, lat: float, lng: float, entity_name:
         print(f"\n📋 COMBINED FUNCTIONALITY TEST")
         print("-" * 30)
         
-        from utils.location_api_standalone import process_image_location_with_api
-        
         combined_result = process_image_location_with_api(image_data, "base64")
         
         if combined_result["success"]:
@@ -243,8 +235,6 @@ async def main():
     
     # Try to extract coordinates from image with location API fallback
     try:
-        from utils.location_api_standalone import process_image_location_with_api
-        
         print("📍 Processing image location with API fallback...")
         geo_result = process_image_location_with_api(image_data, "base64")
         
@@ -4,64 +4,90 @@ Test the image processing API endpoint.
 This demonstrates how to upload images and get cultural analysis.
 """
 
-import requests
+import asyncio
+import json
+import mimetypes
 import os
 import sys
 from pathlib import Path
 
-def test_api_upload(image_path: str, server_url: str = "http://localhost:8000"):
-    """Test image upload via API with automatic GPS extraction."""
+import aiofiles
+import aiohttp
+
+# Images are streamed to the server in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def _read_chunks(image_path: str):
+    """Yield the image file in UPLOAD_CHUNK_SIZE pieces without reading it whole."""
+    async with aiofiles.open(image_path, 'rb') as f:
+        while True:
+            chunk = await f.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+def _report_result(status: int, body: str):
+    """Print the processing results for one upload and return the parsed result."""
+    if status == 200:
+        result = json.loads(body)
+        
+        if result.get('status') == 'success':
+            print(f"✅ Image processed successfully!")
+            
+            data = result.get('data', {})
+            
+            print(f"\n📊 RESULTS:")
+            print(f"📍 Coordinates: {data.get('coordinates', {})}")
+            print(f"📸 Scene: {data.get('perception', {}).get('scene_summary', 'N/A')}")
+            print(f"🏛️ Entity: {data.get('context', {}).get('entity_name', 'N/A')}")
+            print(f"✅ Verified: {data.get('context', {}).get('entity_verified', False)}")
+            print(f"📚 Cultural Facts: {data.get('wiki', {}).get('facts_found', 0)}")
+            print(f"💬 Response: {data.get('response', {}).get('text', 'N/A')[:100]}...")
+            
+            return result
+        else:
+            print(f"❌ Processing failed: {result.get('message', 'Unknown error')}")
+            if result.get('error_type') == 'no_gps_data':
+                print(f"💡 Suggestion: {result.get('suggestion', '')}")
+            return None
+    else:
+        print(f"❌ API error: {status} - {body}")
+        return None
+
+async def _upload_one(session: aiohttp.ClientSession, image_path: str, server_url: str):
+    """Upload one image as a streamed multipart request."""
     print(f"🚀 Testing API upload with: {image_path}")
     
     if not os.path.exists(image_path):
         print(f"❌ Image not found: {image_path}")
-        return
+        return None
     
     # Test with automatic GPS extraction only
     print(f"\n📸 Testing with automatic GPS extraction...")
     
     try:
-        with open(image_path, 'rb') as f:
-            files = {'image_file': f}
-            data = {
-                'user_id': 'test_user',
-                'session_id': 'test_session'
-            }
+        with aiohttp.MultipartWriter('form-data') as form:
+            for name, value in (('user_id', 'test_user'), ('session_id', 'test_session')):
+                part = form.append(value)
+                part.set_content_disposition('form-data', name=name)
             
-            response = requests.post(
-                f"{server_url}/api/image/process",
-                files=files,
-                data=data,
-                timeout=60
+            content_type = mimetypes.guess_type(image_path)[0] or 'application/octet-stream'
+            part = form.append_payload(
+                aiohttp.AsyncIterablePayload(_read_chunks(image_path), content_type=content_type)
             )
+            part.set_content_disposition('form-data', name='image_file', filename=os.path.basename(image_path))
         
-        if response.status_code == 200:
-            result = response.json()
-            
-            if result.get('status') == 'success':
-                print(f"✅ Image processed successfully!")
-                
-                data = result.get('data', {})
-                
-                print(f"\n📊 RESULTS:")
-                print(f"📍 Coordinates: {data.get('coordinates', {})}")
-                print(f"📸 Scene: {data.get('perception', {}).get('scene_summary', 'N/A')}")
-                print(f"🏛️ Entity: {data.get('context', {}).get('entity_name', 'N/A')}")
-                print(f"✅ Verified: {data.get('context', {}).get('entity_verified', False)}")
-                print(f"📚 Cultural Facts: {data.get('wiki', {}).get('facts_found', 0)}")
-                print(f"💬 Response: {data.get('response', {}).get('text', 'N/A')[:100]}...")
-                
-                return result
-            else:
-                print(f"❌ Processing failed: {result.get('message', 'Unknown error')}")
-                if result.get('error_type') == 'no_gps_data':
-                    print(f"💡 Suggestion: {result.get('suggestion', '')}")
-                return None
-        else:
-            print(f"❌ API error: {response.status_code} - {response.text}")
-            return None
+        async with session.post(
+            f"{server_url}/api/image/process",
+            data=form,
+            timeout=aiohttp.ClientTimeout(total=60)
+        ) as response:
+            status = response.status
+            body = await response.text()
+        
+        return _report_result(status, body)
             
-    except requests.exceptions.ConnectionError:
+    except aiohttp.ClientConnectorError:
         print(f"❌ Could not connect to server at {server_url}")
         print(f"   Make sure the server is running: python main.py")
         return None
@@ -69,6 +95,16 @@ def test_api_upload(image_path: str, server_url: str = "http://localhost:8000"):
         print(f"❌ Request failed: {e}")
         return None
 
+async def upload_many(image_paths: list, server_url: str = "http://localhost:8000", concurrency: int = 16):
+    """Upload many images concurrently over a shared connection pool."""
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(*[_upload_one(session, path, server_url) for path in image_paths])
+
+def test_api_upload(image_path: str, server_url: str = "http://localhost:8000"):
+    """Test image upload via API with automatic GPS extraction."""
+    return asyncio.run(upload_many([image_path], server_url))[0]
+
 def main():
     """Main test function."""
     if len(sys.argv) < 2:
@@ -3,46 +3,68 @@
 Test the geo agent functions without ADK dependencies.
 """
 
+import os
 import sys
-import base64
+import time
+import atexit
+import asyncio
+from collections import OrderedDict
 from pathlib import Path
+from typing import Tuple
+
+import httpx
+
+# orjson parses JSON bytes directly and faster; fall back to the stdlib parser
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+from io import BytesIO
+from utils.helpers import decode_base64, encode_file_base64
+from utils.gps_extractor import GPS_IFD_TAG, convert_to_decimal, read_exif_gps, read_exif_gps_head
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
 def extract_gps_from_image(image_data: str, image_format: str = "base64"):
     """Extract GPS coordinates from image EXIF data."""
     try:
-        from PIL import Image
-        from PIL.ExifTags import TAGS
-        from io import BytesIO
-        
-        # Handle different image formats
+        # Read just the GPS tags from the EXIF segment (for base64 input, from
+        # the decoded head of the image); fall back to a full PIL parse for
+        # non-JPEG or unusual files
         if image_format == "base64":
-            image_bytes = base64.b64decode(image_data)
+            gps_info = read_exif_gps_head(image_data)
+            if gps_info is None:
+                image_bytes = decode_base64(image_data)
+                gps_info = read_exif_gps(image_bytes)
         else:
             # Assume it's raw bytes
             image_bytes = image_data
-        
-        # Open image and extract EXIF
-        image = Image.open(BytesIO(image_bytes))
-        exif_data = image._getexif()
-        
-        if exif_data is None:
-            return {
-                "success": False,
-                "error": "No EXIF data found in image",
-                "coordinates": None
-            }
-        
-        # Parse EXIF data
-        exif = {}
-        for tag_id, value in exif_data.items():
-            tag = TAGS.get(tag_id, tag_id)
-            exif[tag] = value
+            gps_info = read_exif_gps(image_bytes)
+        if gps_info is None and Image is not None:
+            # Open image and extract EXIF
+            image = Image.open(BytesIO(image_bytes))
+            # getexif() parses IFD0 only; get_ifd() then reads just the GPS IFD
+            exif_data = image.getexif()
+            
+            if not exif_data:
+                return {
+                    "success": False,
+                    "error": "No EXIF data found in image",
+                    "coordinates": None
+                }
+            
+            gps_info = exif_data.get_ifd(GPS_IFD_TAG)
         
         # Extract GPS information
-        gps_info = exif.get('GPSInfo')
         if not gps_info:
             return {
                 "success": False,
@@ -58,15 +80,6 @@ def extract_gps_from_image(image_data: str, image_format: str = "base64"):
         
         if lat and lng:
             # Convert to decimal degrees
-            def convert_to_decimal(coord, ref):
-                degrees = float(coord[0])
-                minutes = float(coord[1])
-                seconds = float(coord[2])
-                decimal = degrees + (minutes / 60.0) + (seconds / 3600.0)
-                if ref in ['S', 'W']:
-                    decimal = -decimal
-                return decimal
-            
             lat_decimal = convert_to_decimal(lat, lat_ref)
             lng_decimal = convert_to_decimal(lng, lng_ref)
             
@@ -131,10 +144,7 @@ def test_with_real_image(image_path: str):
             return None
         
         # Read and encode image
-        with open(image_path, "rb") as f:
-            image_bytes = f.read()
-        
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+        image_base64 = encode_file_base64(image_path)
         
         result = extract_gps_from_image(image_base64, "base64")
         
@@ -155,36 +165,117 @@ def test_with_real_image(image_path: str):
         print(f"❌ Real Image Test Error: {e}")
         return None
 
+# Reverse-geocode cache: ~11 m coordinate buckets -> (fetched_at, response),
+# kept in LRU order and bounded to GEO_CACHE_MAX entries
+GEO_TTL = 600
+GEO_CACHE_MAX = 4096
+_geo_cache: "OrderedDict[Tuple[int, int], Tuple[float, dict]]" = OrderedDict()
+
+# Shared AsyncClient so repeated lookups reuse the pooled connection (multiplexed
+# over HTTP/2 when the h2 package is installed); bound to the event loop it was
+# created on
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+_geo_client = None
+_geo_client_loop = None
+
+
+def _get_geo_client():
+    """Return the shared AsyncClient for the running event loop."""
+    global _geo_client, _geo_client_loop
+    loop = asyncio.get_running_loop()
+    if _geo_client is None or _geo_client_loop is not loop:
+        _geo_client = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            timeout=10.0,
+            headers={"User-Agent": "Hermes/1.0 (edu)"},
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+        )
+        _geo_client_loop = loop
+    return _geo_client
+
+
+async def _reverse(lat, lng):
+    """Reverse-geocode a coordinate via Nominatim, served from the cache when fresh."""
+    key = (round(lat * 1e4), round(lng * 1e4))
+    hit = _geo_cache.get(key)
+    if hit and time.monotonic() - hit[0] < GEO_TTL:
+        _geo_cache.move_to_end(key)
+        return hit[1]
+    
+    url = "https://nominatim.openstreetmap.org/reverse"
+    params = {"format": "jsonv2", "lat": lat, "lon": lng, "zoom": 14, "addressdetails": 1}
+    try:
+        r = await _get_geo_client().get(url, params=params)
+        r.raise_for_status()
+        data = _json_loads(r.content)
+    except Exception as e:
+        print(f"⚠️ Reverse geocoding error: {e}")
+        return {"display_name": "Unknown location", "error": str(e)}
+    
+    _geo_cache[key] = (time.monotonic(), data)
+    _geo_cache.move_to_end(key)
+    if len(_geo_cache) > GEO_CACHE_MAX:
+        _geo_cache.popitem(last=False)
+    return data
+
+
+async def _close_geo_client():
+    """Close the shared geo client, if one was created."""
+    global _geo_client
+    if _geo_client is not None:
+        await _geo_client.aclose()
+        _geo_client = None
+
+
+async def _run_and_close(coro):
+    """Await a coroutine, then close the shared client before its loop ends."""
+    try:
+        return await coro
+    finally:
+        await _close_geo_client()
+
+
+# One event loop for every async call in this script (Python 3.11+), so the
+# shared geo client and its connections survive between calls
+_runner = None
+
+
+def _close_runner():
+    """Close the shared client and event loop at interpreter exit."""
+    global _runner
+    if _runner is not None:
+        _runner.run(_close_geo_client())
+        _runner.close()
+        _runner = None
+
+
+def _run(coro):
+    """Run a coroutine on the shared event loop, or asyncio.run before 3.11."""
+    global _runner
+    if not hasattr(asyncio, "Runner"):
+        return asyncio.run(_run_and_close(coro))
+    if _runner is None:
+        _runner = asyncio.Runner()
+        atexit.register(_close_runner)
+    return _runner.run(coro)
+
 def test_geo_context():
     """Test geo context functionality."""
     print(f"\n🗺️ TESTING GEO CONTEXT")
     print("=" * 50)
     
     try:
-        import httpx
-        import math
-        import asyncio
-        
-        async def _reverse(lat, lng):
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {"format": "jsonv2", "lat": lat, "lon": lng, "zoom": 14, "addressdetails": 1}
-            headers = {"User-Agent": "Hermes/1.0 (edu)"}
-            try:
-                async with httpx.AsyncClient(timeout=10) as c:
-                    r = await c.get(url, params=params, headers=headers)
-                    r.raise_for_status()
-                    data = r.json()
-                return data
-            except Exception as e:
-                print(f"⚠️ Reverse geocoding error: {e}")
-                return {"display_name": "Unknown location", "error": str(e)}
-        
         # Test with Eiffel Tower coordinates
         lat, lng = 48.8584, 2.2945
         
         print(f"📍 Testing reverse geocoding for: {lat}, {lng}")
         
-        result = asyncio.run(_reverse(lat, lng))
+        result = _run(_reverse(lat, lng))
         
         print(f"✅ Reverse Geocoding Test:")
         print(f"   Address: {result.get('display_name', 'N/A')[:100]}...")
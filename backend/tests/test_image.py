@@ -10,7 +10,12 @@ import os
 from pathlib import Path
 
 # Add parent directory to path for imports
-sys.path.append(str(Path(__file__).parent.parent))
+_parent = str(Path(__file__).parent.parent)
+if _parent not in sys.path:
+    sys.path.append(_parent)
+
+import quick_test
+from utils.location_api_standalone import process_image_location_with_api
 
 async def test_image(image_path: str):
     """Test the complete agent pipeline with an image."""
@@ -24,18 +29,13 @@ async def test_image(image_path: str):
     print(f"📸 Testing with image: {image_path}")
     
     try:
-        # Import the quick test function
-        from quick_test import test_with_image, encode_image_to_base64, extract_coordinates_from_image
-        
         # Encode image
-        image_data = encode_image_to_base64(image_path)
+        image_data = quick_test.encode_image_to_base64(image_path)
         if not image_data:
             return
         
         # Try to extract coordinates from image with location API fallback
         try:
-            from utils.location_api_standalone import process_image_location_with_api
-            
             print("📍 Processing image location with API fallback...")
             geo_result = process_image_location_with_api(image_data, "base64")
             
@@ -60,7 +60,7 @@ async def test_image(image_path: str):
             return
         
         # Run the complete test
-        await test_with_image(image_path, lat, lng, None)
+        await quick_test.test_with_image(image_path, lat, lng, None)
         
     except Exception as e:
         print(f"❌ Test failed: {e}")
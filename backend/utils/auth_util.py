@@ -1,18 +1,61 @@
 from fastapi import HTTPException, Header
-from services.firebase_client import initialize_firebase  # Ensure Firebase is initialized
+from services.firebase import get_app
 from firebase_admin import auth
+from collections import OrderedDict
+from typing import Optional, Tuple
+import hashlib
+import threading
+import time
+
+BEARER_PREFIX = "Bearer "
+BEARER_PREFIX_LEN = len(BEARER_PREFIX)
+
+def extract_bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Return the token from an `Authorization: Bearer <token>` header, or None if malformed."""
+    if not authorization or not authorization.startswith(BEARER_PREFIX):
+        return None
+    token = authorization[BEARER_PREFIX_LEN:].rstrip()
+    return token or None
+
+# Verified ID tokens: blake2b digest of the token -> (exp, uid), in LRU order.
+# Hits skip the signature check until shortly before the token expires.
+TOKEN_CACHE_MAX = 8192
+TOKEN_EXPIRY_MARGIN_SECONDS = 30
+_token_cache: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+def verify_id_token_cached(token: str) -> str:
+    """
+    Verify a Firebase ID token and return its uid, reusing earlier verifications
+    of the same token while it is still valid. Raises like auth.verify_id_token.
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    with _token_cache_lock:
+        hit = _token_cache.get(key)
+        if hit and hit[0] > now + TOKEN_EXPIRY_MARGIN_SECONDS:
+            _token_cache.move_to_end(key)
+            return hit[1]
+
+    decoded_token = auth.verify_id_token(token, app=get_app())
+    uid = decoded_token["uid"]
+    with _token_cache_lock:
+        _token_cache[key] = (decoded_token["exp"], uid)
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
+    return uid
 
 def verify_firebase_token(authorization: str = Header(...)):
     """
     Expect header: Authorization: Bearer <Firebase_ID_Token>
     """
-    if not authorization.startswith("Bearer "):
+    token = extract_bearer_token(authorization)
+    if token is None:
         raise HTTPException(status_code=401, detail="Invalid auth header format")
 
-    token = authorization.split("Bearer ")[1]
     try:
-        decoded_token = auth.verify_id_token(token)
-        uid = decoded_token["uid"]
+        uid = verify_id_token_cached(token)
         return uid
     except auth.InvalidIdTokenError:
         raise HTTPException(status_code=401, detail="Invalid ID token")
@@ -4,18 +4,79 @@ Handles event routing between different agents in the system.
 """
 
 import asyncio
-from typing import Dict, List, Callable, Any
-from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple, Awaitable, Callable, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
+class _EventBatcher:
+    """Coalesces emitted events into lists for one batched subscriber."""
+    
+    def __init__(self, handler: Callable, max_batch: int, max_wait: float):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        async def put(data: Any):
+            loop = asyncio.get_running_loop()
+            if self._task is None or self._task.done() or self._loop is not loop:
+                # Start (or restart) the collector on the emitting loop
+                self._queue = asyncio.Queue()
+                self._loop = loop
+                self._task = loop.create_task(self._process_loop())
+            self._queue.put_nowait(data)
+        
+        # Registered with the bus in place of the handler
+        put.__name__ = getattr(handler, "__name__", repr(handler))
+        self.put = put
+    
+    async def _process_loop(self):
+        """Wait for an event, gather more until max_batch or max_wait, then deliver."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                if asyncio.iscoroutinefunction(self.handler):
+                    await self.handler(batch)
+                else:
+                    await loop.run_in_executor(None, self.handler, batch)
+            except Exception as e:
+                logger.error("Error in batched event handler %s: %s", self.put.__name__, e)
+    
+    def stop(self):
+        """Stop collecting; events not yet delivered are dropped."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
 class EventBus:
     """Lightweight event bus for agent communication."""
     
     def __init__(self):
-        self._subscribers: Dict[str, List[Callable]] = defaultdict(list)
+        # Handler tuples are replaced, never mutated, on (un)subscribe; emit is
+        # the hot path and just iterates them
+        self._subscribers: Dict[str, Tuple[Callable, ...]] = {}
+        # Coroutine-function handlers, classified at subscribe time so emit
+        # needs no per-call introspection
+        self._async_handlers: Set[Callable] = set()
         self._middleware: List[Callable] = []
+        # All middleware composed into one coroutine function by add_middleware
+        self._fused_middleware: Optional[Callable[[str, Any], Awaitable[Any]]] = None
+        # Batchers registered by subscribe_batched, keyed by (event_type, handler)
+        self._batchers: Dict[Tuple[str, Callable], _EventBatcher] = {}
     
     def subscribe(self, event_type: str, handler: Callable):
         """
@@ -25,8 +86,29 @@ class EventBus:
             event_type: Type of event to subscribe to
             handler: Function to call when event is emitted
         """
-        self._subscribers[event_type].append(handler)
-        logger.debug(f"Subscribed {handler.__name__} to {event_type}")
+        self._subscribers[event_type] = self._subscribers.get(event_type, ()) + (handler,)
+        if asyncio.iscoroutinefunction(handler):
+            self._async_handlers.add(handler)
+        logger.debug("Subscribed %s to %s", handler.__name__, event_type)
+    
+    def subscribe_batched(self, event_type: str, handler: Callable, max_batch: int = 32, max_wait: float = 0.05):
+        """
+        Subscribe to an event type, receiving events in batches.
+        
+        Emitted data is queued and the handler is called with a list of up to
+        `max_batch` items, at most `max_wait` seconds after the first one arrived.
+        Suited to handlers that persist events, where one write per batch beats
+        one write per event.
+        
+        Args:
+            event_type: Type of event to subscribe to
+            handler: Function (sync or async) to call with a list of event data
+            max_batch: Largest number of events delivered in one call
+            max_wait: Seconds to wait for more events before delivering a batch
+        """
+        batcher = _EventBatcher(handler, max_batch, max_wait)
+        self._batchers[(event_type, handler)] = batcher
+        self.subscribe(event_type, batcher.put)
     
     def unsubscribe(self, event_type: str, handler: Callable):
         """
@@ -36,9 +118,24 @@ class EventBus:
             event_type: Type of event to unsubscribe from
             handler: Function to remove from subscribers
         """
-        if handler in self._subscribers[event_type]:
-            self._subscribers[event_type].remove(handler)
-            logger.debug(f"Unsubscribed {handler.__name__} from {event_type}")
+        batcher = self._batchers.pop((event_type, handler), None)
+        if batcher is not None:
+            batcher.stop()
+            handler = batcher.put
+        handlers = self._subscribers.get(event_type, ())
+        if handler in handlers:
+            i = handlers.index(handler)
+            remaining = handlers[:i] + handlers[i + 1:]
+            if remaining:
+                self._subscribers[event_type] = remaining
+            else:
+                del self._subscribers[event_type]
+            # Still subscribed to another event type: keep its classification
+            if handler in self._async_handlers and not any(
+                handler in hs for hs in self._subscribers.values()
+            ):
+                self._async_handlers.discard(handler)
+            logger.debug("Unsubscribed %s from %s", handler.__name__, event_type)
     
     async def emit(self, event_type: str, data: Any = None):
         """
@@ -48,30 +145,34 @@ class EventBus:
             event_type: Type of event to emit
             data: Data to pass to event handlers
         """
-        logger.debug(f"Emitting event {event_type} with data: {data}")
+        handlers = self._subscribers.get(event_type, ())
+        if not handlers and not self._fused_middleware:
+            logger.debug("No subscribers for event %s", event_type)
+            return
+        
+        # data may be large; only render it when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Emitting event %s with data: %s", event_type, data)
         
         # Apply middleware
-        for middleware in self._middleware:
-            data = await middleware(event_type, data)
+        if self._fused_middleware:
+            data = await self._fused_middleware(event_type, data)
         
         # Notify all subscribers
-        handlers = self._subscribers.get(event_type, [])
         if handlers:
-            tasks = []
-            for handler in handlers:
-                try:
-                    if asyncio.iscoroutinefunction(handler):
-                        tasks.append(handler(data))
-                    else:
-                        # Run sync handlers in thread pool
-                        tasks.append(asyncio.get_event_loop().run_in_executor(None, handler, data))
-                except Exception as e:
-                    logger.error(f"Error in event handler {handler.__name__}: {e}")
-            
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
+            run_in_executor = asyncio.get_running_loop().run_in_executor
+            # Sync handlers run in the thread pool
+            tasks = [
+                handler(data) if handler in self._async_handlers
+                else run_in_executor(None, handler, data)
+                for handler in handlers
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for handler, result in zip(handlers, results):
+                if isinstance(result, BaseException):
+                    logger.error("Error in event handler %s: %s", handler.__name__, result)
         else:
-            logger.debug(f"No subscribers for event {event_type}")
+            logger.debug("No subscribers for event %s", event_type)
     
     def add_middleware(self, middleware: Callable):
         """
@@ -81,10 +182,18 @@ class EventBus:
             middleware: Function that takes (event_type, data) and returns processed data
         """
         self._middleware.append(middleware)
+        
+        prev = self._fused_middleware
+        if prev is None:
+            self._fused_middleware = middleware
+        else:
+            async def fused(event_type, data, prev=prev, middleware=middleware):
+                return await middleware(event_type, await prev(event_type, data))
+            self._fused_middleware = fused
     
     def get_subscriber_count(self, event_type: str) -> int:
         """Get number of subscribers for an event type."""
-        return len(self._subscribers.get(event_type, []))
+        return len(self._subscribers.get(event_type, ()))
     
     def list_events(self) -> List[str]:
         """Get list of all event types with subscribers."""
@@ -93,7 +202,12 @@ class EventBus:
     def clear(self):
         """Clear all subscribers and middleware."""
         self._subscribers.clear()
+        self._async_handlers.clear()
         self._middleware.clear()
+        self._fused_middleware = None
+        for batcher in self._batchers.values():
+            batcher.stop()
+        self._batchers.clear()
         logger.info("Event bus cleared")
 
 # Global event bus instance
@@ -2,17 +2,23 @@
 Context Agent Utilities
 Standalone functions for building comprehensive context
 """
+import asyncio
+import logging
 from datetime import datetime
 
+from config.logger import get_logger
+
+logger = get_logger(__name__)
+
 
 def build_comprehensive_context(lat: float, lng: float, perception_clues: dict, geo_context: dict, user_id: str, session_id: str) -> dict:
     """Build comprehensive context from all data sources."""
     try:
-        print("🧠 Building comprehensive context...")
+        logger.debug("🧠 Building comprehensive context...")
         
         # Check if geo_context has error
         if geo_context.get("error"):
-            print(f"⚠️ Geo context has error: {geo_context.get('error')}")
+            logger.debug("⚠️ Geo context has error: %s", geo_context.get("error"))
         
         # Extract key information
         scene_summary = perception_clues.get("scene_summary", "")
@@ -26,22 +32,27 @@ def build_comprehensive_context(lat: float, lng: float, perception_clues: dict,
         elif translated_text:
             entity = translated_text[0].get("translation", "Unknown Entity")
         
-        # Build cultural summary
-        cultural_summary = f"Scene: {scene_summary}"
+        # Build cultural summary from pieces joined once at the end
+        summary_parts = [f"Scene: {scene_summary}"]
         if translated_text:
-            cultural_summary += f"\n\nTranslated Text:\n"
-            for text in translated_text:
-                cultural_summary += f"- {text.get('original', '')} → {text.get('translation', '')} ({text.get('language', 'unknown')})\n"
+            summary_parts.append("\n\nTranslated Text:\n")
+            summary_parts.extend(
+                f"- {text.get('original', '')} → {text.get('translation', '')} ({text.get('language', 'unknown')})\n"
+                for text in translated_text
+            )
         
         if cultural_landmarks:
-            cultural_summary += f"\n\nCultural Landmarks: {', '.join(cultural_landmarks)}"
+            summary_parts.append(f"\n\nCultural Landmarks: {', '.join(cultural_landmarks)}")
+        cultural_summary = "".join(summary_parts)
         
         # Log landmarks for debugging
         landmarks = geo_context.get("landmarks", [])
-        if landmarks:
-            print(f"📍 Found {len(landmarks)} nearby landmarks: {[lm.get('title', lm.get('name', 'Unknown')) for lm in landmarks[:3]]}")
-        else:
-            print("⚠️ No nearby landmarks found")
+        if logger.isEnabledFor(logging.DEBUG):
+            if landmarks:
+                logger.debug("📍 Found %d nearby landmarks: %s", len(landmarks),
+                             [lm.get('title') or lm.get('name') or 'Unknown' for lm in landmarks[:3]])
+            else:
+                logger.debug("⚠️ No nearby landmarks found")
         
         # Include geo_context data directly accessible
         return {
@@ -52,15 +63,14 @@ def build_comprehensive_context(lat: float, lng: float, perception_clues: dict,
             "certainty": 0.8,
             "cultural_summary": cultural_summary,
             "coordinates": {"lat": lat, "lng": lng},
-            "geo": geo_context,  # Make it accessible via .get('geo')
-            "geo_context": geo_context,  # Keep for compatibility
-            "location_api": geo_context,  # Also available here
+            "geo": geo_context,
             "perception_data": perception_clues,
             "timestamp": datetime.utcnow().isoformat()
         }
         
-    except Exception as e:
-        print(f"❌ Context building error: {e}")
+    except (KeyError, TypeError, AttributeError) as e:
+        # Malformed perception/geo input; anything else is a real bug and propagates
+        logger.error("❌ Context building error: %s", e)
         return {
             "success": False,
             "error": str(e),
@@ -70,9 +80,16 @@ def build_comprehensive_context(lat: float, lng: float, perception_clues: dict,
             "certainty": 0.0,
             "cultural_summary": "Unable to build context",
             "coordinates": {"lat": lat, "lng": lng},
-            "geo": geo_context,  # Make it accessible
-            "geo_context": geo_context,
-            "location_api": geo_context,
+            "geo": geo_context,
             "perception_data": perception_clues
         }
 
+
+async def build_comprehensive_context_async(lat: float, lng: float, user_id: str, session_id: str,
+                                            perception_coro, geo_coro) -> dict:
+    """
+    Await the perception and geo lookups concurrently, then build the context.
+    The two are independent, so their latencies overlap instead of adding up.
+    """
+    perception_clues, geo_context = await asyncio.gather(perception_coro, geo_coro)
+    return build_comprehensive_context(lat, lng, perception_clues, geo_context, user_id, session_id)
@@ -3,16 +3,34 @@ ElevenLabs TTS API client for voice synthesis.
 Handles text-to-speech conversion using ElevenLabs API.
 """
 
+import functools
 import os
 import io
+import logging
 import asyncio
+from types import MappingProxyType
 from typing import Optional, AsyncGenerator
 from elevenlabs import Voice, VoiceSettings
 from elevenlabs.client import ElevenLabs
 import httpx
 from config.settings import get_settings
+from config.logger import get_logger
 
 settings = get_settings()
+logger = get_logger(__name__)
+
+# Common voice mappings for Hermes (read-only)
+VOICE_IDS_BY_NAME = MappingProxyType({
+    "adam": "pNInz6obpgDQGcFmaJgB",
+    "antoni": "ErXwobaYiN019PkySvjV",
+    "arnold": "VR6AewLTigWG4xSOukaG",
+    "bella": "EXAVITQu4vr4xnSDxMaL",
+    "domi": "AZnzlk1XvdvUeBnXmlld",
+    "elli": "MF3mGyEYCl7XYWbV9V6O",
+    "josh": "TxGEqnHWrfWFTfGW9XjX",
+    "rachel": "21m00Tcm4TlvDq8ikWAM",
+    "sam": "yoZ06aMxZJJ28mfd3POQ"
+})
 
 class ElevenLabsClient:
     """Client for ElevenLabs Text-to-Speech API."""
@@ -71,12 +89,12 @@ class ElevenLabsClient:
                 voice_settings=voice_settings
             )
             
-            # Collect all audio chunks into bytes
-            audio_bytes = b""
+            # Collect all audio chunks into one buffer (extend in place, no re-copying)
+            buf = bytearray()
             for chunk in audio_generator:
-                audio_bytes += chunk
+                buf.extend(chunk)
             
-            return audio_bytes
+            return bytes(buf)
             
         except Exception as e:
             raise Exception(f"TTS generation failed: {str(e)}")
@@ -152,19 +170,7 @@ class ElevenLabsClient:
     
     def get_voice_by_name(self, name: str) -> Optional[str]:
         """Get voice ID by name."""
-        # Common voice mappings for Hermes
-        voice_mapping = {
-            "adam": "pNInz6obpgDQGcFmaJgB",
-            "antoni": "ErXwobaYiN019PkySvjV",
-            "arnold": "VR6AewLTigWG4xSOukaG",
-            "bella": "EXAVITQu4vr4xnSDxMaL",
-            "domi": "AZnzlk1XvdvUeBnXmlld",
-            "elli": "MF3mGyEYCl7XYWbV9V6O",
-            "josh": "TxGEqnHWrfWFTfGW9XjX",
-            "rachel": "21m00Tcm4TlvDq8ikWAM",
-            "sam": "yoZ06aMxZJJ28mfd3POQ"
-        }
-        return voice_mapping.get(name.lower())
+        return VOICE_IDS_BY_NAME.get(name.lower())
     
     async def speech_to_text(self, audio_content: bytes) -> dict:
         """
@@ -180,13 +186,10 @@ class ElevenLabsClient:
             if not self.client:
                 raise Exception("ElevenLabs client not initialized - check API key")
             
-            import io
-            import tempfile
-            import os
-            
-            print(f"🔍 Audio content size: {len(audio_content)} bytes")
-            print(f"🔍 First 20 bytes: {audio_content[:20]}")
-            print(f"🔍 Last 20 bytes: {audio_content[-20:]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 Audio content size: %d bytes", len(audio_content))
+                logger.debug("🔍 First 20 bytes: %r", audio_content[:20])
+                logger.debug("🔍 Last 20 bytes: %r", audio_content[-20:])
             
             # Check if file is empty
             if len(audio_content) == 0:
@@ -199,73 +202,53 @@ class ElevenLabsClient:
             # Check for valid audio headers
             # WAV files should start with "RIFF" and contain "WAVE"
             if audio_content[:4] != b'RIFF':
-                print(f"⚠️ Warning: File doesn't start with RIFF header. First 4 bytes: {audio_content[:4]}")
+                logger.debug("⚠️ File doesn't start with RIFF header. First 4 bytes: %r", audio_content[:4])
                 # Try to detect format
                 if audio_content[:3] == b'ID3':
-                    print("🔍 Detected MP3 format")
+                    logger.debug("🔍 Detected MP3 format")
                 elif b'ftyp' in audio_content[:20]:
-                    print("🔍 Detected MP4/M4A format")
+                    logger.debug("🔍 Detected MP4/M4A format")
                 elif audio_content[:2] == b'\xff\xfb' or audio_content[:2] == b'\xff\xfa':
-                    print("🔍 Detected MP3 format (MPEG header)")
+                    logger.debug("🔍 Detected MP3 format (MPEG header)")
                 else:
-                    print(f"🔍 Unknown format. First 10 bytes: {audio_content[:10]}")
+                    logger.debug("🔍 Unknown format. First 10 bytes: %r", audio_content[:10])
             else:
-                print("🔍 Detected WAV format")
-            
-            # Create a temporary file for the audio content
-            # Use .wav format as it's most compatible with ElevenLabs STT
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-                temp_file.write(audio_content)
-                temp_file_path = temp_file.name
+                logger.debug("🔍 Detected WAV format")
             
-            print(f"🔍 Created temp file: {temp_file_path}")
-            print(f"🔍 Temp file size: {os.path.getsize(temp_file_path)} bytes")
-            
-            # Try to validate the file is readable
-            try:
-                with open(temp_file_path, 'rb') as test_file:
-                    test_content = test_file.read(100)
-                    print(f"🔍 Temp file first 20 bytes: {test_content[:20]}")
-            except Exception as e:
-                print(f"❌ Error reading temp file: {e}")
-                raise Exception(f"Temp file is not readable: {e}")
+            # Hand the SDK an in-memory file; the name gives it the format hint
+            audio_file = io.BytesIO(audio_content)
+            audio_file.name = "audio.wav"
             
+            # Try different API methods to find the correct one
             try:
-                # Try using the correct ElevenLabs STT API method
-                with open(temp_file_path, 'rb') as audio_file:
-                    # Try different API methods to find the correct one
-                    try:
-                        # Method 1: Direct convert
-                        result = self.client.speech_to_text.convert(
-                            file=audio_file,
-                            model_id="scribe_v1"
-                        )
-                    except AttributeError:
-                        # Method 2: Alternative API call
-                        audio_file.seek(0)  # Reset file pointer
-                        result = self.client.speech_to_text.convert(
-                            audio_file,
-                            model_id="scribe_v1"
-                        )
-                
-                print(f"✅ STT Success: {result.text}")
-                
-                return {
-                    "text": result.text,
-                    "language_code": getattr(result, 'language_code', 'en'),
-                    "language_probability": getattr(result, 'language_probability', 1.0),
-                    "words": getattr(result, 'words', []),
-                    "confidence": 0.9  # ElevenLabs doesn't provide confidence, so we estimate
-                }
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-                    print(f"🗑️ Cleaned up temp file: {temp_file_path}")
+                # Method 1: Direct convert
+                result = self.client.speech_to_text.convert(
+                    file=audio_file,
+                    model_id="scribe_v1"
+                )
+            except AttributeError:
+                # Method 2: Alternative API call
+                audio_file.seek(0)  # Reset file pointer
+                result = self.client.speech_to_text.convert(
+                    audio_file,
+                    model_id="scribe_v1"
+                )
+            
+            logger.debug("✅ STT Success: %s", result.text)
+            
+            return {
+                "text": result.text,
+                "language_code": getattr(result, 'language_code', 'en'),
+                "language_probability": getattr(result, 'language_probability', 1.0),
+                "words": getattr(result, 'words', []),
+                "confidence": 0.9  # ElevenLabs doesn't provide confidence, so we estimate
+            }
             
         except Exception as e:
-            print(f"❌ STT Error: {str(e)}")
+            logger.error("❌ STT Error: %s", e)
             raise Exception(f"STT conversion failed: {str(e)}")
 
-# Global instance
-elevenlabs_client = ElevenLabsClient()
+@functools.lru_cache(maxsize=None)
+def get_elevenlabs_client() -> ElevenLabsClient:
+    """Return the shared ElevenLabsClient, creating it on first call."""
+    return ElevenLabsClient()
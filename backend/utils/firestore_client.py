@@ -0,0 +1,2 @@
+# Firebase app / Firestore client accessors; initialization lives in services/firebase.py
+from services.firebase import get_app, get_db  # noqa: F401
@@ -1,8 +1,11 @@
 # Gemini Vision/Text wrappers
 import google.generativeai as genai  # pyright: ignore[reportMissingImports]
+import logging
 import os
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 class GeminiClient:
     def __init__(self):
         self.api_key = os.getenv('GEMINI_API_KEY')
@@ -41,9 +44,21 @@ class GeminiClient:
             return False
 
 
-# Create singleton instance
-try:
-    gemini_client = GeminiClient()
-except ValueError as e:
-    print(f"Warning: {str(e)}")
-    gemini_client = None
\ No newline at end of file
+_gemini_client: Optional[GeminiClient] = None
+
+
+def get_gemini_client() -> Optional[GeminiClient]:
+    """
+    Return the shared GeminiClient, creating it on first call. The client reads
+    GEMINI_API_KEY when it is constructed, so building it at import would run
+    before main.py has loaded the .env file. None if the key is missing; only a
+    built client is kept, so a key provisioned later is picked up.
+    """
+    global _gemini_client
+    if _gemini_client is None:
+        try:
+            _gemini_client = GeminiClient()
+        except ValueError as e:
+            logger.warning("⚠️ %s", e)
+            return None
+    return _gemini_client
\ No newline at end of file
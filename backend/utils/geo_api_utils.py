@@ -2,16 +2,77 @@
 Standalone geo utilities using Wikipedia and OpenStreetMap.
 No ADK dependencies - can be imported without a2a issues.
 """
+import asyncio
+import heapq
 import httpx
+import json
 import math
 import time
-import anyio
+from collections import OrderedDict
 
-_cache = {}
+# orjson parses the response bytes directly and faster; its JSONDecodeError
+# subclasses json.JSONDecodeError, so the error handling is the same either way
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
-def _get_cache(k, ttl=600):
+# Response cache: key -> {"val", "ts"}, in LRU order and bounded to CACHE_MAX_ENTRIES
+CACHE_TTL = 600
+CACHE_MAX_ENTRIES = 2048
+_cache = OrderedDict()
+
+# Wikipedia geosearch is cached per grid tile of GEO_TILE_DEG degrees (~550 m).
+# Tile queries search GEO_TILE_MARGIN_M further than asked, covering the
+# requested radius from anywhere in the tile (half-diagonal ≈ 390 m)
+GEO_TILE_DEG = 0.005
+GEO_TILE_MARGIN_M = 400
+
+# Nearest landmarks returned per lookup; callers surface at most a handful
+LANDMARK_LIMIT = 5
+
+# Assembled geo contexts are cached on coordinates rounded to this many decimals
+# (4 ≈ 11 m), so GPS jitter around one spot reuses the same result
+CONTEXT_CACHE_PRECISION = 4
+
+# Shared HTTP client: pooled keep-alive connections (HTTP/2 when the h2 package
+# is installed) instead of a handshake per request. Bound to the event loop it
+# was created on, so a new loop (e.g. the sync wrapper's) gets its own.
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+_client = None
+_client_loop = None
+
+def _get_client() -> httpx.AsyncClient:
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            headers={"User-Agent": "Hermes/1.0 (edu)"},
+            timeout=10,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        )
+        _client_loop = loop
+    return _client
+
+async def close_client():
+    """Close the shared HTTP client (app shutdown, or end of a sync call)."""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
+
+def _get_cache(k, ttl=CACHE_TTL):
     v = _cache.get(k)
     if v and time.time() - v["ts"] < ttl:
+        _cache.move_to_end(k)
         return v["val"]
     if v:
         _cache.pop(k, None)
@@ -19,6 +80,17 @@ def _get_cache(k, ttl=600):
 
 def _set_cache(k, val):
     _cache[k] = {"val": val, "ts": time.time()}
+    _cache.move_to_end(k)
+    if len(_cache) > CACHE_MAX_ENTRIES:
+        # Oldest entry first; expired entries age out here even if never read again
+        _cache.popitem(last=False)
+
+def _valid_coords(lat, lng) -> bool:
+    """False for out-of-range or NaN coordinates, and for the (0, 0) "no fix" placeholder."""
+    # NaN fails every comparison, so the range checks reject it too
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return False
+    return abs(lat) >= 1e-6 or abs(lng) >= 1e-6
 
 def _haversine(lat1, lon1, lat2, lon2):
     """Return distance (m) between two coordinates."""
@@ -28,50 +100,90 @@ def _haversine(lat1, lon1, lat2, lon2):
     a = math.sin(dφ/2)**2 + math.cos(φ1)*math.cos(φ2)*math.sin(dλ/2)**2
     return 2 * R * math.asin(math.sqrt(a))
 
+def _add_distances(lat, lng, results):
+    """Set distance_m on each geosearch result."""
+    for d in results:
+        d["distance_m"] = _haversine(lat, lng, d["lat"], d["lon"])
+
 async def _reverse(lat, lng):
     key = f"rev:{lat:.5f},{lng:.5f}"
     if (v := _get_cache(key)): return v
     url = "https://nominatim.openstreetmap.org/reverse"
     params = {"format": "jsonv2", "lat": lat, "lon": lng, "zoom": 14, "addressdetails": 1}
-    headers = {"User-Agent": "Hermes/1.0 (edu)"}
     try:
-        async with httpx.AsyncClient(timeout=10) as c:
-            r = await c.get(url, params=params, headers=headers)
-            r.raise_for_status()
-            data = r.json()
+        r = await _get_client().get(url, params=params)
+        r.raise_for_status()
+        data = _json_loads(r.content)
         _set_cache(key, data)
         return data
-    except Exception as e:
+    except (httpx.HTTPError, json.JSONDecodeError) as e:
         print(f"⚠️ Reverse geocoding error: {e}")
         return {"display_name": "Unknown location", "error": str(e)}
 
-async def _wiki_geo(lat, lng, radius, lang="en"):
-    key = f"geo:{lang}:{lat:.5f},{lng:.5f}:{radius}"
-    if (v := _get_cache(key)): return v
-    url = f"https://{lang}.wikipedia.org/w/api.php"
-    params = {
-        "action": "query", "list": "geosearch",
-        "gscoord": f"{lat}|{lng}", "gsradius": min(radius, 10000),
-        "gslimit": 15, "format": "json"
-    }
-    try:
-        async with httpx.AsyncClient(timeout=10) as c:
-            r = await c.get(url, params=params)
+async def _wiki_geo(lat, lng, radius, lang="en", limit=LANDMARK_LIMIT):
+    # Geosearch results are cached per grid tile, so nearby users share one request;
+    # distances are then computed from the caller's actual position
+    tile_lat = round(lat / GEO_TILE_DEG) * GEO_TILE_DEG
+    tile_lng = round(lng / GEO_TILE_DEG) * GEO_TILE_DEG
+    key = f"geo:{lang}:{tile_lat:.3f},{tile_lng:.3f}:{radius}"
+    tile = _get_cache(key)
+    if tile is None:
+        url = f"https://{lang}.wikipedia.org/w/api.php"
+        params = {
+            "action": "query", "list": "geosearch",
+            # Widen the search so it covers the radius around any point in the tile
+            "gscoord": f"{tile_lat:.3f}|{tile_lng:.3f}", "gsradius": min(radius + GEO_TILE_MARGIN_M, 10000),
+            "gslimit": 15, "format": "json"
+        }
+        try:
+            r = await _get_client().get(url, params=params)
             r.raise_for_status()
-            data = r.json().get("query", {}).get("geosearch", [])
-        for d in data:
-            d["distance_m"] = _haversine(lat, lng, d["lat"], d["lon"])
-        _set_cache(key, data)
-        return data
-    except Exception as e:
-        print(f"⚠️ Wikipedia geosearch error: {e}")
-        return []
+            tile = _json_loads(r.content).get("query", {}).get("geosearch", [])
+            _set_cache(key, tile)
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            print(f"⚠️ Wikipedia geosearch error: {e}")
+            return []
+    # Rank by a cheap planar distance (longitude scaled to latitude) and run the
+    # exact haversine only on the nearest few. Copies, since the cached tile is
+    # shared between callers at different positions
+    lng_scale = math.cos(math.radians(lat))
+    candidates = heapq.nsmallest(
+        limit, tile,
+        key=lambda d: (d["lat"] - lat)**2 + ((d["lon"] - lng) * lng_scale)**2,
+    )
+    data = [dict(d) for d in candidates]
+    _add_distances(lat, lng, data)
+    data = [d for d in data if d["distance_m"] <= radius]
+    data.sort(key=lambda d: d["distance_m"])
+    return data
 
 async def get_geo_context_async(lat: float, lng: float, radiusMeters: int = 1500, lang: str = "en") -> dict:
     """Async version - Return address + nearby landmarks with distance (m)."""
+    if not _valid_coords(lat, lng):
+        # Degenerate input: don't spend two remote lookups (and rate limit) on it
+        return {
+            "address": "Unknown location",
+            "city": "Unknown City",
+            "country": "Unknown Country",
+            "coords": {"lat": lat, "lng": lng},
+            "landmarks": [],
+            "error": "invalid_coords"
+        }
+    key = (f"ctx:{round(lat, CONTEXT_CACHE_PRECISION)},{round(lng, CONTEXT_CACHE_PRECISION)}"
+           f":{radiusMeters}:{lang}")
+    if (v := _get_cache(key)):
+        return {**v, "coords": {"lat": lat, "lng": lng}}
     try:
-        place = await _reverse(lat, lng)
-        landmarks = await _wiki_geo(lat, lng, radiusMeters, lang)
+        # Both lookups are independent network round-trips, so run them concurrently
+        place, landmarks = await asyncio.gather(
+            _reverse(lat, lng), _wiki_geo(lat, lng, radiusMeters, lang), return_exceptions=True
+        )
+        if isinstance(place, BaseException):
+            print(f"⚠️ Reverse geocoding error: {place}")
+            place = {"display_name": "Unknown location", "error": str(place)}
+        if isinstance(landmarks, BaseException):
+            print(f"⚠️ Wikipedia geosearch error: {landmarks}")
+            landmarks = []
         address = place.get("display_name", "Unknown location")
         
         # Extract city from address components if available
@@ -79,7 +191,7 @@ async def get_geo_context_async(lat: float, lng: float, radiusMeters: int = 1500
         if "address" in place:
             city = place["address"].get("city", place["address"].get("town", "Unknown City"))
         
-        return {
+        context = {
             "address": address,
             "city": city,
             "country": place.get("address", {}).get("country", "Unknown Country"),
@@ -90,6 +202,9 @@ async def get_geo_context_async(lat: float, lng: float, radiusMeters: int = 1500
             ],
             "error": place.get("error")  # Include any errors
         }
+        if not context["error"]:
+            _set_cache(key, context)
+        return context
     except Exception as e:
         print(f"⚠️ Geo context error: {e}")
         return {
@@ -101,7 +216,18 @@ async def get_geo_context_async(lat: float, lng: float, radiusMeters: int = 1500
             "error": str(e)
         }
 
+async def _get_geo_context_and_close(lat, lng, radiusMeters, lang):
+    # The loop started by the sync wrapper ends with this call, so its client goes too
+    try:
+        return await get_geo_context_async(lat, lng, radiusMeters, lang)
+    finally:
+        await close_client()
+
 def get_geo_context(lat: float, lng: float, radiusMeters: int = 1500, lang: str = "en") -> dict:
     """Sync wrapper that calls async version. Returns address + nearby landmarks with distance (m)."""
-    return anyio.run(get_geo_context_async, lat, lng, radiusMeters, lang)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_get_geo_context_and_close(lat, lng, radiusMeters, lang))
+    raise RuntimeError("get_geo_context() cannot run inside an event loop; await get_geo_context_async() instead")
 
@@ -2,87 +2,195 @@
 Geo Utilities
 Standalone functions for location context (no ADK dependency)
 """
+import asyncio
 import httpx
+import logging
 import math
+import os
 import time
+from collections import OrderedDict
 
+logger = logging.getLogger(__name__)
 
-def get_location_context(lat: float, lng: float) -> dict:
-    """Get location context including city, address, and nearby attractions."""
+# Shared HTTP client: keep-alive connections are reused across lookups instead of
+# a DNS + TCP + TLS handshake per call. Bound to the event loop it was created on,
+# so a new loop (e.g. the sync wrapper's) gets its own.
+_client = None
+_client_loop = None
+
+def _get_client() -> httpx.AsyncClient:
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=10,
+            headers={"User-Agent": "Hermes/1.0 (edu)"},
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        )
+        _client_loop = loop
+    return _client
+
+async def close_client():
+    """Close the shared HTTP client (app shutdown, or end of a sync call)."""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
+
+# Resolved locations keyed by coordinates rounded to 5 decimals (~1 m): key ->
+# (timestamp, context), in LRU order. Clients re-send the same GPS fix often and
+# addresses don't change, so entries live a day. Fallback results aren't cached.
+LOCATION_CACHE_TTL = 86400
+LOCATION_CACHE_MAX = 4096
+_location_cache = OrderedDict()
+
+def _location_key(lat, lng):
+    return (round(lat, 5), round(lng, 5))
+
+def _get_cached_location(key):
+    hit = _location_cache.get(key)
+    if hit is None:
+        return None
+    if time.time() - hit[0] >= LOCATION_CACHE_TTL:
+        _location_cache.pop(key, None)
+        return None
+    _location_cache.move_to_end(key)
+    return hit[1]
+
+def _cache_location(key, context):
+    _location_cache[key] = (time.time(), context)
+    _location_cache.move_to_end(key)
+    if len(_location_cache) > LOCATION_CACHE_MAX:
+        _location_cache.popitem(last=False)
+
+
+async def _google_location(lat: float, lng: float, api_key: str):
+    """Reverse geocode with the Google Maps API. None if it has no result."""
     try:
-        print(f"🗺️ Getting location context for {lat}, {lng}...")
-        
-        import httpx
-        import os
-        
-        # Try to get location from reverse geocoding API
-        api_key = os.getenv("GOOGLE_MAPS_API_KEY") or os.getenv("MAPS_API_KEY")
-        
-        if api_key:
-            try:
-                # Use Google Maps Reverse Geocoding API
-                url = f"https://maps.googleapis.com/maps/api/geocode/json?latlng={lat},{lng}&key={api_key}"
-                response = httpx.get(url, timeout=10)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("results"):
-                        # Extract formatted address
-                        result = data["results"][0]
-                        address = result.get("formatted_address", f"Location at {lat}, {lng}")
-                        
-                        # Extract city and country
-                        city = "Unknown City"
-                        country = "Unknown Country"
-                        for component in result.get("address_components", []):
-                            types = component.get("types", [])
-                            if "locality" in types:
-                                city = component.get("long_name", city)
-                            elif "administrative_area_level_1" in types:
-                                state = component.get("short_name", "")
-                            elif "country" in types:
-                                country = component.get("long_name", country)
-                        
-                        location_name = f"{city}, {country}"
-                        print(f"✅ Location determined: {location_name}")
-                        
-                        return {
-                            "success": True,
-                            "address": address,
-                            "city": city,
-                            "country": country,
-                            "location": location_name,
-                            "landmarks": [],  # Will be populated by nearby search
-                            "coordinates": {"lat": lat, "lng": lng}
-                        }
-            except Exception as api_error:
-                print(f"⚠️ Maps API error: {api_error}")
-        
-        # Fallback: Use a basic reverse geocoding service
-        try:
-            response = httpx.get(f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lng}&format=json", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                address = data.get("display_name", f"Location at {lat}, {lng}")
-                city = data.get("address", {}).get("city", data.get("address", {}).get("town", "Unknown City"))
-                country = data.get("address", {}).get("country", "Unknown Country")
-                
-                print(f"✅ Location determined from OpenStreetMap: {city}, {country}")
-                
+        # Use Google Maps Reverse Geocoding API
+        url = f"https://maps.googleapis.com/maps/api/geocode/json?latlng={lat},{lng}&key={api_key}"
+        response = await _get_client().get(url)
+
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("results"):
+                # Extract formatted address
+                result = data["results"][0]
+                address = result.get("formatted_address", f"Location at {lat}, {lng}")
+
+                # Extract city and country
+                city = "Unknown City"
+                country = "Unknown Country"
+                for component in result.get("address_components", []):
+                    types = component.get("types", [])
+                    if "locality" in types:
+                        city = component.get("long_name", city)
+                    elif "administrative_area_level_1" in types:
+                        state = component.get("short_name", "")
+                    elif "country" in types:
+                        country = component.get("long_name", country)
+
+                location_name = f"{city}, {country}"
+                logger.info("✅ Location determined: %s", location_name)
+
                 return {
                     "success": True,
                     "address": address,
                     "city": city,
                     "country": country,
-                    "location": f"{city}, {country}",
-                    "landmarks": [],
+                    "location": location_name,
+                    "landmarks": [],  # Will be populated by nearby search
                     "coordinates": {"lat": lat, "lng": lng}
                 }
-        except Exception as osm_error:
-            print(f"⚠️ OpenStreetMap error: {osm_error}")
-        
+    except Exception as api_error:
+        logger.warning("⚠️ Maps API error: %s", api_error)
+    return None
+
+
+async def _osm_location(lat: float, lng: float):
+    """Reverse geocode with OpenStreetMap Nominatim. None if the lookup fails."""
+    try:
+        response = await _get_client().get(f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lng}&format=json")
+        if response.status_code == 200:
+            data = response.json()
+            address = data.get("display_name", f"Location at {lat}, {lng}")
+            city = data.get("address", {}).get("city", data.get("address", {}).get("town", "Unknown City"))
+            country = data.get("address", {}).get("country", "Unknown Country")
+
+            logger.info("✅ Location determined from OpenStreetMap: %s, %s", city, country)
+
+            return {
+                "success": True,
+                "address": address,
+                "city": city,
+                "country": country,
+                "location": f"{city}, {country}",
+                "landmarks": [],
+                "coordinates": {"lat": lat, "lng": lng}
+            }
+    except Exception as osm_error:
+        logger.warning("⚠️ OpenStreetMap error: %s", osm_error)
+    return None
+
+
+# Lookups in progress, by location key: concurrent requests for the same spot
+# await the one pending lookup instead of each calling the APIs ("singleflight")
+_inflight = {}
+
+
+async def get_location_context_async(lat: float, lng: float) -> dict:
+    """Get location context including city, address, and nearby attractions."""
+    key = _location_key(lat, lng)
+    cached = _get_cached_location(key)
+    if cached is not None:
+        return cached
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_lookup_location(lat, lng, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one caller going away doesn't cancel the lookup for the others
+    return await asyncio.shield(task)
+
+
+# Overall budget for the provider lookups; past it the caller gets the fallback
+# (uncached, so the next request tries again) rather than waiting on 10 s timeouts
+LOCATION_DEADLINE = 3.0
+
+
+async def _query_providers(lat: float, lng: float, api_key):
+    # Query Google Maps and OpenStreetMap at once; Google's result is preferred,
+    # so OSM only costs extra latency when Google fails (max, not sum, of the two)
+    osm_task = asyncio.create_task(_osm_location(lat, lng))
+    try:
+        context = await _google_location(lat, lng, api_key) if api_key else None
+        if context is None:
+            context = await osm_task
+    finally:
+        osm_task.cancel()
+    return context
+
+
+async def _lookup_location(lat: float, lng: float, key) -> dict:
+    try:
+        logger.debug("🗺️ Getting location context for %s, %s...", lat, lng)
+
+        # Try to get location from reverse geocoding API
+        api_key = os.getenv("GOOGLE_MAPS_API_KEY") or os.getenv("MAPS_API_KEY")
+
+        try:
+            context = await asyncio.wait_for(_query_providers(lat, lng, api_key), LOCATION_DEADLINE)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Location lookup exceeded %ss", LOCATION_DEADLINE)
+            context = None
+
+        if context is not None:
+            _cache_location(key, context)
+            return context
+
         # Final fallback: return basic location info
-        print(f"⚠️ Using fallback location data")
+        logger.warning("⚠️ Using fallback location data")
         return {
             "success": True,
             "address": f"Location at {lat}, {lng}",
@@ -92,9 +200,9 @@ def get_location_context(lat: float, lng: float) -> dict:
             "landmarks": [],
             "coordinates": {"lat": lat, "lng": lng}
         }
-        
+
     except Exception as e:
-        print(f"❌ Location context error: {e}")
+        logger.error("❌ Location context error: %s", e)
         return {
             "success": False,
             "error": str(e),
@@ -104,3 +212,19 @@ def get_location_context(lat: float, lng: float) -> dict:
             "country": "Unknown"
         }
 
+
+async def _get_location_context_and_close(lat, lng):
+    # The loop started by the sync wrapper ends with this call, so its client goes too
+    try:
+        return await get_location_context_async(lat, lng)
+    finally:
+        await close_client()
+
+
+def get_location_context(lat: float, lng: float) -> dict:
+    """Sync wrapper that calls async version. Get location context including city, address, and nearby attractions."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_get_location_context_and_close(lat, lng))
+    raise RuntimeError("get_location_context() cannot run inside an event loop; await get_location_context_async() instead")
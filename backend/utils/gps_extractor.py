@@ -5,49 +5,246 @@ This module doesn't depend on ADK and can be used independently.
 """
 
 import base64
+import logging
+import math
+import mmap
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-from PIL.ExifTags import TAGS
 from io import BytesIO
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# numpy is only needed for extract_gps_batch
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# EXIF tag of the GPS IFD pointer in IFD0, and the GPS tags we read from it:
+# 1 GPSLatitudeRef, 2 GPSLatitude, 3 GPSLongitudeRef, 4 GPSLongitude
+GPS_IFD_TAG = 0x8825
+GPS_COORDINATE_TAGS = (1, 2, 3, 4)
+
+_MARKER_LENGTH = struct.Struct(">H")
+# (u16, u32, 12-byte IFD entry: tag, type, count, value/offset) per TIFF byte order
+_TIFF_STRUCTS = {
+    b"II": (struct.Struct("<H"), struct.Struct("<I"), struct.Struct("<HHI4s"), "<"),
+    b"MM": (struct.Struct(">H"), struct.Struct(">I"), struct.Struct(">HHI4s"), ">"),
+}
+# Byte size of the TIFF field types that can hold GPS coordinates
+_TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+
+def _read_ifd_value(data, tiff: int, structs, field_type: int, count: int, raw: bytes):
+    """Decode an IFD entry value: ASCII strings and (signed) rationals, else None."""
+    size = _TIFF_TYPE_SIZES.get(field_type, 0) * count
+    if size <= 4:
+        buf = raw[:size]
+    else:
+        offset = tiff + structs[1].unpack(raw)[0]
+        buf = data[offset:offset + size]
+
+    if field_type == 2:
+        return bytes(buf).split(b"\x00", 1)[0].decode("ascii", "replace")
+    if field_type in (5, 10):
+        code = "i" if field_type == 10 else "I"
+        parts = struct.unpack(f"{structs[3]}{2 * count}{code}", buf)
+        # A zero denominator decodes to NaN, as PIL's IFDRational does
+        return tuple(num / den if den else math.nan for num, den in zip(parts[::2], parts[1::2]))
+    return None
+
+
+def read_exif_gps(data) -> Optional[Dict[int, Any]]:
+    """
+    Read the GPS coordinate tags straight from a JPEG's EXIF segment, without
+    decoding the image or any other EXIF tags.
+    
+    Args:
+        data: JPEG contents as bytes or an mmap
+        
+    Returns:
+        Dict of GPS tag -> value shaped like PIL's GPSInfo (empty when the EXIF
+        has no GPS IFD), or None when the data is not a JPEG with a readable
+        EXIF segment, in which case callers should fall back to PIL
+    """
+    try:
+        if data[:2] != b"\xff\xd8":
+            return None
+
+        # Walk the JPEG markers up to the APP1 "Exif" segment
+        pos = 2
+        while True:
+            if data[pos] != 0xFF:
+                return None
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            if marker in (0xD9, 0xDA):
+                # End of image or start of scan: no EXIF segment
+                return None
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+                pos += 2
+                continue
+            length = _MARKER_LENGTH.unpack_from(data, pos + 2)[0]
+            if marker == 0xE1 and data[pos + 4:pos + 10] == b"Exif\x00\x00":
+                break
+            pos += 2 + length
+
+        tiff = pos + 10
+        structs = _TIFF_STRUCTS.get(bytes(data[tiff:tiff + 2]))
+        if structs is None:
+            return None
+        u16, u32, entry, _ = structs
+        if u16.unpack_from(data, tiff + 2)[0] != 42:
+            return None
+
+        # IFD0: only the GPS IFD pointer is of interest
+        ifd0 = tiff + u32.unpack_from(data, tiff + 4)[0]
+        gps_ifd = None
+        for i in range(u16.unpack_from(data, ifd0)[0]):
+            tag, _, _, raw = entry.unpack_from(data, ifd0 + 2 + 12 * i)
+            if tag == GPS_IFD_TAG:
+                gps_ifd = tiff + u32.unpack(raw)[0]
+                break
+        if gps_ifd is None:
+            return {}
+
+        gps_info = {}
+        for i in range(u16.unpack_from(data, gps_ifd)[0]):
+            tag, field_type, count, raw = entry.unpack_from(data, gps_ifd + 2 + 12 * i)
+            if tag in GPS_COORDINATE_TAGS:
+                gps_info[tag] = _read_ifd_value(data, tiff, structs, field_type, count, raw)
+        return gps_info
+    except (struct.error, IndexError, ValueError):
+        return None
+
+
+# Leading bytes decoded from base64 input before trying the EXIF scan: room for
+# a maximal (64 KB) APP1 segment plus the small segments that may precede it
+EXIF_HEAD_BYTES = 96 * 1024
+_EXIF_HEAD_B64_CHARS = EXIF_HEAD_BYTES // 3 * 4
+
+
+def read_exif_gps_head(image_base64: str) -> Optional[Dict[int, Any]]:
+    """
+    Like read_exif_gps, but decodes only the first EXIF_HEAD_BYTES of a base64
+    image, so a large JPEG's GPS tags are read without decoding the whole file.
+    None when the data isn't a JPEG or its EXIF doesn't fit in the head.
+    """
+    try:
+        head = base64.b64decode(image_base64[:_EXIF_HEAD_B64_CHARS])
+    except ValueError:
+        return None
+    return read_exif_gps(head)
+
+
+def read_exif_gps_file(image_path: str) -> Optional[Dict[int, Any]]:
+    """Like read_exif_gps, but maps the file instead of reading it into memory."""
+    try:
+        with open(image_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return read_exif_gps(data)
+    except (OSError, ValueError):
+        return None
+
+
+# Hemisphere reference -> sign of the decimal coordinate (some EXIF readers
+# return the reference as bytes)
+_SIGN = {'N': 1.0, 'E': 1.0, 'S': -1.0, 'W': -1.0, b'N': 1.0, b'E': 1.0, b'S': -1.0, b'W': -1.0}
+_INV_60 = 1.0 / 60.0
+_INV_3600 = 1.0 / 3600.0
+
+
+def convert_to_decimal(coord, ref) -> float:
+    """Convert an EXIF (degrees, minutes, seconds) triple and N/S/E/W ref to decimal degrees."""
+    return _SIGN.get(ref, 1.0) * (float(coord[0]) + float(coord[1]) * _INV_60 + float(coord[2]) * _INV_3600)
+
+
+def _dms_quadruples(gps_infos):
+    """Yield (degrees, minutes, seconds, sign) for latitude then longitude of each image."""
+    missing = (float("nan"),) * 8
+    for gps_info in gps_infos:
+        gps_info = gps_info or {}
+        lat, lng = gps_info.get(2), gps_info.get(4)
+        if not (isinstance(lat, tuple) and len(lat) == 3 and isinstance(lng, tuple) and len(lng) == 3):
+            yield from missing
+            continue
+        yield from lat
+        yield _SIGN.get(gps_info.get(1), 1.0)
+        yield from lng
+        yield _SIGN.get(gps_info.get(3), 1.0)
+
+
+def extract_gps_batch(image_paths: List[str], max_workers: Optional[int] = None):
+    """
+    Extract GPS coordinates for many image files at once.
+    
+    Args:
+        image_paths: Paths of the image files
+        max_workers: Threads reading EXIF concurrently (ThreadPoolExecutor default if None)
+        
+    Returns:
+        numpy array of shape (N, 2) with decimal (lat, lng) per image; rows are
+        NaN for images without readable GPS EXIF data
+    """
+    if np is None:
+        raise ImportError("extract_gps_batch requires numpy")
+
+    # The per-file work is mostly waiting on page-ins, so read files on a thread pool
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        gps_infos = pool.map(read_exif_gps_file, image_paths)
+        dms = np.fromiter(
+            _dms_quadruples(gps_infos), dtype=np.float64, count=8 * len(image_paths)
+        ).reshape(len(image_paths), 2, 4)
+    return (dms[..., 0] + dms[..., 1] * _INV_60 + dms[..., 2] * _INV_3600) * dms[..., 3]
+
 
 def extract_gps_from_image(image_data: str, image_format: str = "base64") -> Dict[str, Any]:
     """
     Extract GPS coordinates from image EXIF data.
     
     Args:
-        image_data: Image data as base64 string or raw bytes
-        image_format: Format of image_data ("base64" or "bytes")
+        image_data: Image data as base64 string, raw bytes or a BytesIO
+        image_format: Format of image_data ("base64", "bytes" or "bytesio")
         
     Returns:
         Dictionary with success status, coordinates, and error info
     """
     try:
-        # Handle different image formats
+        # Read just the GPS tags from the EXIF segment (for base64 input, from
+        # the decoded head of the image); fall back to a full PIL parse for
+        # non-JPEG or unusual files
         if image_format == "base64":
-            image_bytes = base64.b64decode(image_data)
+            gps_info = read_exif_gps_head(image_data)
+            if gps_info is None:
+                image_bytes = base64.b64decode(image_data)
+                gps_info = read_exif_gps(image_bytes)
+        elif image_format == "bytesio":
+            # Scan the buffer in place instead of copying it out with getvalue()
+            image_bytes = image_data.getbuffer()
+            gps_info = read_exif_gps(image_bytes)
         else:
             # Assume it's raw bytes
             image_bytes = image_data
-        
-        # Open image and extract EXIF
-        image = Image.open(BytesIO(image_bytes))
-        exif_data = image._getexif()
-        
-        if exif_data is None:
-            return {
-                "success": False,
-                "error": "No EXIF data found in image",
-                "coordinates": None
-            }
-        
-        # Parse EXIF data
-        exif = {}
-        for tag_id, value in exif_data.items():
-            tag = TAGS.get(tag_id, tag_id)
-            exif[tag] = value
+            gps_info = read_exif_gps(image_bytes)
+        if gps_info is None:
+            # Open image and extract EXIF
+            image = Image.open(BytesIO(image_bytes))
+            # getexif() parses IFD0 only; get_ifd() then reads just the GPS IFD
+            exif_data = image.getexif()
+            
+            if not exif_data:
+                return {
+                    "success": False,
+                    "error": "No EXIF data found in image",
+                    "coordinates": None
+                }
+            
+            gps_info = exif_data.get_ifd(GPS_IFD_TAG)
         
         # Extract GPS information
-        gps_info = exif.get('GPSInfo')
         if not gps_info:
             return {
                 "success": False,
@@ -63,18 +260,17 @@ def extract_gps_from_image(image_data: str, image_format: str = "base64") -> Dic
         
         if lat and lng:
             # Convert to decimal degrees
-            def convert_to_decimal(coord, ref):
-                degrees = float(coord[0])
-                minutes = float(coord[1])
-                seconds = float(coord[2])
-                decimal = degrees + (minutes / 60.0) + (seconds / 3600.0)
-                if ref in ['S', 'W']:
-                    decimal = -decimal
-                return decimal
-            
             lat_decimal = convert_to_decimal(lat, lat_ref)
             lng_decimal = convert_to_decimal(lng, lng_ref)
             
+            # A rational with a zero denominator converts to NaN (in both EXIF parsers)
+            if not (math.isfinite(lat_decimal) and math.isfinite(lng_decimal)):
+                return {
+                    "success": False,
+                    "error": "Invalid GPS coordinates in EXIF data",
+                    "coordinates": None
+                }
+            
             return {
                 "success": True,
                 "coordinates": {
@@ -103,14 +299,14 @@ def process_image_location(image_data: str, image_format: str = "base64") -> Dic
     This is a standalone version that doesn't depend on ADK.
     
     Args:
-        image_data: Image data as base64 string or raw bytes
-        image_format: Format of image_data ("base64" or "bytes")
+        image_data: Image data as base64 string, raw bytes or a BytesIO
+        image_format: Format of image_data ("base64", "bytes" or "bytesio")
         
     Returns:
         Dictionary with success status, coordinates, and error info
     """
     try:
-        print("📍 Extracting GPS coordinates from image...")
+        logger.debug("📍 Extracting GPS coordinates from image...")
         
         # Extract GPS coordinates from image
         gps_result = extract_gps_from_image(image_data, image_format)
@@ -126,7 +322,7 @@ def process_image_location(image_data: str, image_format: str = "base64") -> Dic
         lat = coordinates["lat"]
         lng = coordinates["lng"]
         
-        print(f"✅ GPS coordinates extracted: {lat}, {lng}")
+        logger.info("✅ GPS coordinates extracted: %s, %s", lat, lng)
         
         return {
             "success": True,
@@ -135,7 +331,7 @@ def process_image_location(image_data: str, image_format: str = "base64") -> Dic
         }
         
     except Exception as e:
-        print(f"❌ GPS extraction error: {e}")
+        logger.error("❌ GPS extraction error: %s", e)
         return {
             "success": False,
             "error": f"GPS extraction failed: {str(e)}",
@@ -153,14 +349,14 @@ def test_gps_extraction(image_path: str) -> Dict[str, Any]:
         Dictionary with extraction results
     """
     try:
-        # Read image file and encode to base64
+        # A JPEG's EXIF sits at the start of the file, so read just the head and
+        # pass the raw bytes (no base64 round trip); other formats may keep EXIF
+        # further in, so retry with the whole file if the head has none
         with open(image_path, "rb") as f:
-            image_bytes = f.read()
-        
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        
-        # Extract GPS coordinates
-        result = extract_gps_from_image(image_base64, "base64")
+            image_bytes = f.read(EXIF_HEAD_BYTES)
+            result = extract_gps_from_image(image_bytes, "bytes")
+            if not result["success"] and len(image_bytes) == EXIF_HEAD_BYTES:
+                result = extract_gps_from_image(image_bytes + f.read(), "bytes")
         
         print(f"🧪 GPS Extraction Test Results:")
         print(f"   Success: {result['success']}")
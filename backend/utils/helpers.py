@@ -1 +1,46 @@
-# TODO: Common helper functions
+# utils/helpers.py
+"""
+Common helper functions.
+"""
+
+import base64
+import mmap
+import os
+
+# pybase64 uses SIMD base64 codecs; fall back to the stdlib when it isn't installed
+try:
+    import pybase64
+except ImportError:
+    pybase64 = None
+
+_b64encode = getattr(pybase64, "b64encode", base64.b64encode)
+
+# Read size for streamed base64 encoding; a multiple of 3 so only the final chunk is padded
+B64_CHUNK_SIZE = 3 * 1024 * 1024
+# Files smaller than this are read directly; mapping them costs more than it saves
+MMAP_MIN_SIZE = 64 * 1024
+
+
+def encode_file_base64(path: str) -> str:
+    """Base64-encode a file chunk by chunk into one preallocated buffer."""
+    size = os.path.getsize(path)
+    if size < MMAP_MIN_SIZE:
+        with open(path, "rb") as f:
+            return _b64encode(f.read()).decode("ascii")
+
+    # Encode straight from the page cache through an mmap of the file
+    out = bytearray(((size + 2) // 3) * 4)
+    pos = 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as data:
+        for start in range(0, len(data), B64_CHUNK_SIZE):
+            encoded = _b64encode(data[start:start + B64_CHUNK_SIZE])
+            out[pos:pos + len(encoded)] = encoded
+            pos += len(encoded)
+    return str(memoryview(out)[:pos], "ascii")
+
+
+def decode_base64(data) -> bytes:
+    """Decode base64, using pybase64 when it is available."""
+    if pybase64 is not None:
+        return pybase64.b64decode(data, validate=False)
+    return base64.b64decode(data)
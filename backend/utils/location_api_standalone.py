@@ -4,18 +4,48 @@ Standalone location API functions that don't require ADK.
 This provides location API functionality without ADK dependency.
 """
 
+import atexit
 import httpx
+import logging
+import time
 from typing import Dict, Any
+from utils.standalone_gps import process_image_location as _extract_gps
+
+logger = logging.getLogger(__name__)
+
+# Shared HTTP client, created on first use: keep-alive connections are reused
+# across lookups instead of a DNS + TCP + TLS handshake per call
+_client = None
+
+def _get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        _client = httpx.Client(
+            timeout=10,
+            headers={"User-Agent": "Hermes/1.0 (edu)"},
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        )
+        atexit.register(_client.close)
+    return _client
+
+# The server has one public IP, so its geolocation is a single value; reuse a
+# successful lookup for a few minutes instead of calling ip-api.com every time
+IP_LOCATION_TTL = 300
+_ip_location = None
+_ip_location_ts = 0.0
 
 def get_user_location_from_api() -> Dict[str, Any]:
     """Get user's current location from location API."""
+    global _ip_location, _ip_location_ts
+    if _ip_location is not None and time.time() - _ip_location_ts < IP_LOCATION_TTL:
+        return _ip_location
     try:
-        print("🌐 Getting user location from API...")
+        logger.debug("🌐 Getting user location from API...")
         
         # Call location API to get user's current location
         # Using a free IP geolocation API as an example
         # You can replace this with your preferred location API
-        response = httpx.get("http://ip-api.com/json/", timeout=10)
+        response = _get_client().get("http://ip-api.com/json/")
         
         if response.status_code == 200:
             location_data = response.json()
@@ -26,16 +56,17 @@ def get_user_location_from_api() -> Dict[str, Any]:
                 city = location_data.get("city", "Unknown")
                 country = location_data.get("country", "Unknown")
                 
-                print(f"✅ User location determined: {city}, {country}")
-                print(f"📍 Coordinates: {lat}, {lng}")
+                logger.info("✅ User location determined: %s, %s (%s, %s)", city, country, lat, lng)
                 
-                return {
+                _ip_location = {
                     "success": True,
                     "coordinates": {"lat": lat, "lng": lng},
                     "location": f"{city}, {country}",
                     "method": "location_api",
                     "error": None
                 }
+                _ip_location_ts = time.time()
+                return _ip_location
             else:
                 return {
                     "success": False,
@@ -50,7 +81,7 @@ def get_user_location_from_api() -> Dict[str, Any]:
             }
             
     except Exception as e:
-        print(f"❌ Location API error: {e}")
+        logger.error("❌ Location API error: %s", e)
         return {
             "success": False,
             "error": f"Location API call failed: {str(e)}",
@@ -60,22 +91,17 @@ def get_user_location_from_api() -> Dict[str, Any]:
 def process_image_location_with_api(image_data: str, image_format: str = "base64") -> Dict[str, Any]:
     """Process image location with fallback to location API."""
     try:
-        print("📍 Processing image location...")
+        logger.debug("📍 Processing image location...")
         
         # First try to extract GPS from EXIF data
-        import sys
-        import os
-        sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-        from utils.standalone_gps import process_image_location as extract_gps
-        
-        gps_result = extract_gps(image_data, image_format)
+        gps_result = _extract_gps(image_data, image_format)
         
         if gps_result["success"]:
             coordinates = gps_result["coordinates"]
             lat = coordinates["lat"]
             lng = coordinates["lng"]
             
-            print(f"✅ GPS coordinates extracted from EXIF: {lat}, {lng}")
+            logger.info("✅ GPS coordinates extracted from EXIF: %s, %s", lat, lng)
             
             return {
                 "success": True,
@@ -84,8 +110,7 @@ def process_image_location_with_api(image_data: str, image_format: str = "base64
                 "error": None
             }
         else:
-            print(f"⚠️ No GPS data in EXIF: {gps_result['error']}")
-            print("🌐 Falling back to user location API...")
+            logger.info("⚠️ No GPS data in EXIF (%s); falling back to user location API", gps_result["error"])
             
             # Fallback: Get user's current location from API
             location_result = get_user_location_from_api()
@@ -95,8 +120,7 @@ def process_image_location_with_api(image_data: str, image_format: str = "base64
                 lat = coordinates["lat"]
                 lng = coordinates["lng"]
                 
-                print(f"✅ User location determined from API: {location_result['location']}")
-                print(f"📍 Coordinates: {lat}, {lng}")
+                logger.info("✅ User location determined from API: %s (%s, %s)", location_result["location"], lat, lng)
                 
                 return {
                     "success": True,
@@ -114,7 +138,7 @@ def process_image_location_with_api(image_data: str, image_format: str = "base64
                 }
         
     except Exception as e:
-        print(f"❌ Image location processing error: {e}")
+        logger.error("❌ Image location processing error: %s", e)
         return {
             "success": False,
             "error": f"Image location processing failed: {str(e)}"
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+One-time migration of journal data into the `entries` sub-collection.
+
+Moves every element of the legacy arrays on journal/{uid} into sub-collection
+documents: the date-keyed conversation lists into journal/{uid}/entries/{timestamp}
+and the `conversation` journal array into journal/{uid}/journal_entries/{timestamp}.
+Journal entries written to `entries` before they had their own sub-collection are
+moved over too. Backfills each entry's has_location flag, rebuilds the per-day
+aggregates and the has_any_location marker, then deletes the migrated arrays.
+Safe to re-run.
+
+Usage: python utils/migrate_journal_entries.py [--dry-run]
+"""
+
+import os
+import sys
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import firestore  # pyright: ignore[reportMissingImports]
+from services.firebase import get_db
+from services.db_service import (
+    JOURNAL_ENTRY_KIND,
+    _day_aggregates_col,
+    _entries_col,
+    _journal_entries_col,
+    _entry_has_location,
+    _fold_into_day_aggregate,
+)
+
+# Firestore allows at most 500 writes per batch
+BATCH_LIMIT = 500
+
+
+def _write_all(refs_and_data):
+    """Set each (ref, data) pair, committing in batches of BATCH_LIMIT."""
+    batch = get_db().batch()
+    pending = 0
+    for ref, data in refs_and_data:
+        batch.set(ref, data)
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch = get_db().batch()
+            pending = 0
+    if pending:
+        batch.commit()
+
+
+def _delete_all(refs):
+    """Delete each ref, committing in batches of BATCH_LIMIT."""
+    batch = get_db().batch()
+    pending = 0
+    for ref in refs:
+        batch.delete(ref)
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch = get_db().batch()
+            pending = 0
+    if pending:
+        batch.commit()
+
+
+def migrate_user(doc, dry_run: bool = False) -> int:
+    """Migrate one journal document. Returns the number of entries moved."""
+    uid = doc.id
+    data = doc.to_dict() or {}
+
+    legacy_keys = []
+    migrated = []
+    journal_migrated = []
+    for key, value in data.items():
+        if not isinstance(value, list):
+            continue
+        legacy_keys.append(key)
+        for entry in value:
+            if not isinstance(entry, dict) or not entry.get("timestamp"):
+                continue
+            doc_entry = {**entry, "date": entry["timestamp"][:10], "has_location": _entry_has_location(entry)}
+            if key == "conversation":
+                journal_migrated.append(doc_entry)
+            else:
+                migrated.append(doc_entry)
+
+    if legacy_keys:
+        print(f"📦 {uid}: {len(migrated) + len(journal_migrated)} entries from {len(legacy_keys)} arrays")
+    if dry_run:
+        return len(migrated) + len(journal_migrated)
+
+    _write_all((_entries_col(uid).document(e["timestamp"]), e) for e in migrated)
+    _write_all((_journal_entries_col(uid).document(e["timestamp"]), e) for e in journal_migrated)
+
+    # Rebuild the day aggregates from everything now in the sub-collection, and
+    # backfill the has_location flag on entries written before it existed
+    aggregates = {}
+    backfill = []
+    moved = []
+    has_location = False
+    for d in _entries_col(uid).order_by("timestamp").stream():
+        entry = d.to_dict()
+        if "has_location" not in entry:
+            entry["has_location"] = _entry_has_location(entry)
+            backfill.append((d.reference, entry))
+        has_location = has_location or entry["has_location"]
+        if entry.get("kind") == JOURNAL_ENTRY_KIND:
+            # Journal entry from before the journal_entries sub-collection
+            entry.pop("kind")
+            moved.append((d.reference, entry))
+            continue
+        agg = aggregates.setdefault(entry["date"], {"date": entry["date"], "count": 0})
+        _fold_into_day_aggregate(agg, entry)
+    _write_all((_day_aggregates_col(uid).document(date_key), agg) for date_key, agg in aggregates.items())
+
+    for d in _journal_entries_col(uid).stream():
+        entry = d.to_dict()
+        if "has_location" not in entry:
+            entry["has_location"] = _entry_has_location(entry)
+            backfill.append((d.reference, entry))
+        has_location = has_location or entry["has_location"]
+
+    moved_refs = {ref.path for ref, _ in moved}
+    _write_all((ref, entry) for ref, entry in backfill if ref.path not in moved_refs)
+    _write_all((_journal_entries_col(uid).document(ref.id), entry) for ref, entry in moved)
+    _delete_all(ref for ref, _ in moved)
+
+    # Drop the migrated arrays from the parent document
+    update = {key: firestore.DELETE_FIELD for key in legacy_keys}
+    if has_location:
+        update["has_any_location"] = True
+    if update:
+        doc.reference.update(update)
+
+    return len(migrated) + len(journal_migrated)
+
+
+def main():
+    dry_run = "--dry-run" in sys.argv
+    total = 0
+    users = 0
+    for doc in get_db().collection("journal").stream():
+        moved = migrate_user(doc, dry_run=dry_run)
+        if moved:
+            users += 1
+            total += moved
+
+    action = "Would migrate" if dry_run else "Migrated"
+    print(f"✅ {action} {total} entries for {users} users")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,55 +2,82 @@
 Perception Agent Utilities
 Standalone functions for image analysis with translation priority
 """
+import asyncio
 import os
 import json
+import logging
 import base64
-from PIL import Image
+import copy
+import hashlib
+import re
+from collections import OrderedDict
+from PIL import Image, ImageOps
 from io import BytesIO
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
-async def analyze_image_with_translation(image_data: str, image_format: str = "base64") -> dict:
-    """Analyze image with priority on OCR and translation."""
-    try:
-        print("🔍 Analyzing image with OCR and translation priority...")
-        
-        # Use Gemini for image analysis with translation focus
-        from google.generativeai import GenerativeModel
-        import google.generativeai as genai
-        
-        # Configure API key
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            print("❌ GEMINI_API_KEY not found in environment variables")
-            return {
-                "success": False,
-                "error": "Google API key not configured",
-                "scene_summary": "Unable to analyze image - API key missing",
-                "translated_text": [],
-                "cultural_landmarks": [],
-                "architectural_style": "",
-                "cultural_elements": [],
-                "atmosphere": "",
-                "cultural_notes": []
-            }
-        
-        genai.configure(api_key=api_key)
-        model = GenerativeModel("gemini-2.5-flash")
-        
-        # Handle different image formats
-        if image_format == "base64":
-            image_bytes = base64.b64decode(image_data)
-        else:
-            image_bytes = image_data
-        
-        # Create image object
-        image = Image.open(BytesIO(image_bytes))
-        
-        # Prompt that prioritizes translation with emphasis
-        prompt = """Analyze this image with special focus on text translation and cultural context. 
+# orjson parses the model's JSON faster; its JSONDecodeError subclasses
+# json.JSONDecodeError, so the error handling is the same either way
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Without JSON mode Gemini often wraps its JSON in a ```json ... ``` fence;
+# stripped anyway in case a reply still comes back fenced
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.S)
+
+# Imported with the module rather than inside each analysis call. A missing
+# SDK only fails the analysis itself (see _configure_once), not the import
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+# Tesseract, when installed, gates the translation prompt: photos it finds no
+# text in get the shorter scene-only prompt. Optional; without it every image
+# gets the full translation pass
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+# Longest side sent to Gemini; its vision encoder downsamples larger images anyway
+VISION_MAX_SIDE = 1568
+VISION_JPEG_QUALITY = 85
+# EXIF Orientation; re-encoding drops it, so rotations are applied to the pixels
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+def _prepare_image_part(image_bytes: bytes) -> dict:
+    """
+    Return the image as an inline JPEG part for Gemini, upright and shrunk to
+    VISION_MAX_SIDE. Upright JPEGs that are already small enough are sent as-is,
+    without re-encoding.
+    """
+    image = Image.open(BytesIO(image_bytes))
+    if (
+        image.format == "JPEG"
+        and max(image.size) <= VISION_MAX_SIDE
+        and image.getexif().get(EXIF_ORIENTATION_TAG, 1) == 1
+    ):
+        return {"mime_type": "image/jpeg", "data": image_bytes}
+    
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((VISION_MAX_SIDE, VISION_MAX_SIDE), Image.LANCZOS)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    buf = BytesIO()
+    image.save(buf, "JPEG", quality=VISION_JPEG_QUALITY, optimize=True)
+    return {"mime_type": "image/jpeg", "data": buf.getvalue()}
+
+
+# Prompt that prioritizes translation with emphasis
+_TRANSLATION_PROMPT = """Analyze this image with special focus on text translation and cultural context. 
 
 CRITICAL PRIORITY - TRANSLATION FIRST:
 1. **MOST IMPORTANT**: Scan for and TRANSLATE every piece of foreign text you see (signs, menus, documents, building names, street signs, etc.)
@@ -83,24 +110,195 @@ Provide your analysis in this JSON format:
 }
 
 CRITICAL: Translate ANY foreign text you see - this is your TOP priority! Focus heavily on detecting and translating text in the image!"""
+
+# For images with no detected text: same JSON shape, nothing to translate
+_SCENE_PROMPT = """Analyze this image for its cultural context.
+
+1. Identify cultural landmarks, monuments, or significant buildings
+2. Analyze architectural styles and cultural elements
+3. Note any religious, historical, or cultural symbols
+4. Describe the scene and atmosphere
+
+STRICT FORMATTING RULES FOR YOUR OUTPUT:
+- NO asterisks (*) in any output text
+- NO bold formatting in responses
+- Plain text only in all fields
+- NEVER mention coordinates, latitude, or longitude
+
+Provide your analysis in this JSON format:
+{
+    "scene_summary": "Brief description of what you see",
+    "translated_text": [],
+    "cultural_landmarks": ["list of landmarks or cultural sites"],
+    "architectural_style": "description of building styles",
+    "cultural_elements": ["religious symbols", "cultural artifacts", "etc"],
+    "atmosphere": "description of the scene's cultural atmosphere",
+    "cultural_notes": ["interesting cultural observations"]
+}"""
+
+# Text gate: lay out a small grayscale copy, give up after OCR_GATE_TIMEOUT seconds
+OCR_GATE_MAX_SIDE = 1024
+OCR_GATE_TIMEOUT = 1
+
+
+def _has_text(image_bytes: bytes) -> bool:
+    """
+    Quick CPU check for visible text. False only when Tesseract finds no word at
+    all. Any word box counts, whatever it was read as: the default model still
+    boxes CJK, Arabic, Cyrillic or Devanagari text it can't read, so those signs
+    keep the translation prompt. True whenever it can't tell (no tesseract,
+    timeout, unreadable image), so a miss only ever costs the full prompt.
+    """
+    if pytesseract is None:
+        return True
+    try:
+        # Upright, or Tesseract finds no words on sideways signs
+        image = ImageOps.exif_transpose(Image.open(BytesIO(image_bytes)))
+        image.thumbnail((OCR_GATE_MAX_SIDE, OCR_GATE_MAX_SIDE))
+        data = pytesseract.image_to_data(
+            image.convert("L"), timeout=OCR_GATE_TIMEOUT, output_type=pytesseract.Output.DICT
+        )
+    except Exception:
+        return True
+    # Level 5 rows are words; pages, blocks and lines without words don't count
+    return 5 in data["level"]
+
+
+# Bump when _TRANSLATION_PROMPT, _SCENE_PROMPT (or the model, its config or the image preparation) change so cached results invalidate
+PROMPT_VERSION = "4"
+
+# Analysis results keyed by a digest of the image bytes + PROMPT_VERSION, in LRU
+# order. Retries and repeated pipeline runs on the same photo skip Gemini.
+VISION_CACHE_MAX = 256
+_vision_cache = OrderedDict()
+
+
+def _cache_key(image_bytes: bytes) -> bytes:
+    digest = hashlib.blake2b(image_bytes, digest_size=16)
+    digest.update(PROMPT_VERSION.encode())
+    return digest.digest()
+
+
+def _copy_analysis(result: dict) -> dict:
+    """Copy a cached analysis, lists included, so callers can't change the cache."""
+    return copy.deepcopy(result)
+
+
+def _get_cached_analysis(cache_key: bytes):
+    cached = _vision_cache.get(cache_key)
+    if cached is None:
+        return None
+    _vision_cache.move_to_end(cache_key)
+    return _copy_analysis(cached)
+
+
+def _cache_analysis(cache_key: bytes, result: dict):
+    _vision_cache[cache_key] = result
+    if len(_vision_cache) > VISION_CACHE_MAX:
+        _vision_cache.popitem(last=False)
+
+
+def _analysis_result(analysis_data: dict) -> dict:
+    """Shape one parsed analysis from Gemini into the perception result."""
+    return {
+        "success": True,
+        "scene_summary": analysis_data.get("scene_summary", ""),
+        "translated_text": analysis_data.get("translated_text", []),
+        "cultural_landmarks": analysis_data.get("cultural_landmarks", []),
+        "architectural_style": analysis_data.get("architectural_style", ""),
+        "cultural_elements": analysis_data.get("cultural_elements", []),
+        "atmosphere": analysis_data.get("atmosphere", ""),
+        "cultural_notes": analysis_data.get("cultural_notes", [])
+    }
+
+
+def _failed_analysis(error: str, scene_summary: str) -> dict:
+    return {
+        "success": False,
+        "error": error,
+        "scene_summary": scene_summary,
+        "translated_text": [],
+        "cultural_landmarks": [],
+        "architectural_style": "",
+        "cultural_elements": [],
+        "atmosphere": "",
+        "cultural_notes": []
+    }
+
+
+# JSON mode: Gemini returns bare JSON (no prose or fences around it), so replies
+# parse directly instead of dropping to the scene_summary-only fallback
+_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+# Built on first use: configure() runs once, not per request
+_model = None
+
+
+def _configure_once(api_key: str):
+    """Configure the Gemini SDK and build the analysis model, once per process."""
+    global _model
+    if _model is None:
+        if genai is None:
+            raise RuntimeError("google-generativeai is not installed")
+        genai.configure(api_key=api_key)
+        _model = genai.GenerativeModel("gemini-2.5-flash", generation_config=_GENERATION_CONFIG)
+
+
+def _get_model():
+    """Return the shared analysis model, or None if GEMINI_API_KEY is not set."""
+    if _model is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return None
+        _configure_once(api_key)
+    return _model
+
+
+async def analyze_image_with_translation(image_data: str, image_format: str = "base64") -> dict:
+    """Analyze image with priority on OCR and translation."""
+    try:
+        logger.debug("🔍 Analyzing image with OCR and translation priority...")
+        
+        # Use Gemini for image analysis with translation focus
+        model = _get_model()
+        if model is None:
+            logger.error("❌ GEMINI_API_KEY not found in environment variables")
+            return _failed_analysis("Google API key not configured", "Unable to analyze image - API key missing")
+        
+        # Handle different image formats
+        if image_format == "base64":
+            image_bytes = base64.b64decode(image_data)
+        else:
+            image_bytes = image_data
+        
+        cache_key = _cache_key(image_bytes)
+        cached = _get_cached_analysis(cache_key)
+        if cached is not None:
+            logger.debug("✅ Image analysis served from cache")
+            return cached
         
-        response = model.generate_content([prompt, image])
+        # Downscaled JPEG: a fraction of the upload bytes and vision tokens. Most
+        # travel photos have no text: those skip the translation instructions.
+        # Both are CPU-bound, so they run off the event loop, side by side
+        image, has_text = await asyncio.gather(
+            asyncio.to_thread(_prepare_image_part, image_bytes),
+            asyncio.to_thread(_has_text, image_bytes)
+        )
+        prompt = _TRANSLATION_PROMPT if has_text else _SCENE_PROMPT
+        
+        # The SDK's native async call: no worker thread is held for the 1-3 s Gemini
+        # takes, and concurrent work (e.g. the geo lookups) keeps progressing
+        response = await model.generate_content_async([prompt, image])
         response_text = response.text.strip()
         
         # Try to parse JSON response
         try:
-            analysis_data = json.loads(response_text)
-            print(f"✅ Image analysis complete with {len(analysis_data.get('translated_text', []))} translations")
-            return {
-                "success": True,
-                "scene_summary": analysis_data.get("scene_summary", ""),
-                "translated_text": analysis_data.get("translated_text", []),
-                "cultural_landmarks": analysis_data.get("cultural_landmarks", []),
-                "architectural_style": analysis_data.get("architectural_style", ""),
-                "cultural_elements": analysis_data.get("cultural_elements", []),
-                "atmosphere": analysis_data.get("atmosphere", ""),
-                "cultural_notes": analysis_data.get("cultural_notes", [])
-            }
+            analysis_data = _json_loads(_FENCE_RE.sub("", response_text))
+            logger.info("✅ Image analysis complete with %d translations", len(analysis_data.get("translated_text", [])))
+            result = _analysis_result(analysis_data)
+            # Only well-formed analyses are cached; a retry may parse next time
+            _cache_analysis(cache_key, result)
+            return _copy_analysis(result)
         except json.JSONDecodeError:
             # Fallback if JSON parsing fails
             return {
@@ -115,16 +313,71 @@ CRITICAL: Translate ANY foreign text you see - this is your TOP priority! Focus
             }
         
     except Exception as e:
-        print(f"❌ Image analysis error: {e}")
-        return {
-            "success": False,
-            "error": f"Image analysis failed: {str(e)}",
-            "scene_summary": "Unable to analyze image",
-            "translated_text": [],
-            "cultural_landmarks": [],
-            "architectural_style": "",
-            "cultural_elements": [],
-            "atmosphere": "",
-            "cultural_notes": []
-        }
+        logger.error("❌ Image analysis error: %s", e)
+        return _failed_analysis(f"Image analysis failed: {str(e)}", "Unable to analyze image")
+
+
+
+# Images per batched request; more risks the context limit and very long replies
+BATCH_MAX_IMAGES = 6
+
+_BATCH_PROMPT = _TRANSLATION_PROMPT + """
+
+You are given several images, in order. Analyze EACH image separately with the rules above and respond with one JSON object of the form:
+{"results": [<analysis of image 1>, <analysis of image 2>, ...]}
+with exactly one entry per image, in the same order as the images."""
+
 
+async def _analyze_batch(model, images: list) -> list:
+    """One Gemini call for up to BATCH_MAX_IMAGES images; results by position."""
+    try:
+        parts = await asyncio.to_thread(lambda: [_prepare_image_part(b) for b in images])
+        response = await model.generate_content_async([_BATCH_PROMPT] + parts)
+        analyses = _json_loads(_FENCE_RE.sub("", response.text.strip())).get("results", [])
+    except Exception as e:
+        logger.error("❌ Batch image analysis error: %s", e)
+        return [_failed_analysis(f"Image analysis failed: {str(e)}", "Unable to analyze image") for _ in images]
+    
+    results = []
+    for i in range(len(images)):
+        if i < len(analyses) and isinstance(analyses[i], dict):
+            results.append(_analysis_result(analyses[i]))
+        else:
+            results.append(_failed_analysis("No analysis returned for image", "Unable to analyze image"))
+    return results
+
+
+async def analyze_images_batch(images: list) -> list:
+    """
+    Analyze several images (raw bytes) with as few Gemini calls as possible:
+    uncached images are packed BATCH_MAX_IMAGES per request and the requests run
+    concurrently. Returns one result per image, in order, shaped like
+    analyze_image_with_translation's.
+    """
+    try:
+        model = _get_model()
+    except RuntimeError as e:
+        logger.error("❌ Batch image analysis error: %s", e)
+        return [_failed_analysis(f"Image analysis failed: {str(e)}", "Unable to analyze image") for _ in images]
+    if model is None:
+        logger.error("❌ GEMINI_API_KEY not found in environment variables")
+        return [_failed_analysis("Google API key not configured", "Unable to analyze image - API key missing") for _ in images]
+    
+    results = [None] * len(images)
+    pending = []
+    for i, image_bytes in enumerate(images):
+        cache_key = _cache_key(image_bytes)
+        results[i] = _get_cached_analysis(cache_key)
+        if results[i] is None:
+            pending.append((i, cache_key, image_bytes))
+    
+    chunks = [pending[j:j + BATCH_MAX_IMAGES] for j in range(0, len(pending), BATCH_MAX_IMAGES)]
+    batches = await asyncio.gather(*(_analyze_batch(model, [b for _, _, b in chunk]) for chunk in chunks))
+    for chunk, batch_results in zip(chunks, batches):
+        for (i, cache_key, _), result in zip(chunk, batch_results):
+            if result["success"]:
+                _cache_analysis(cache_key, result)
+            results[i] = _copy_analysis(result)
+    
+    logger.info("✅ Analyzed %d images in %d requests", len(images), len(chunks))
+    return results
@@ -2,198 +2,442 @@
 Response Agent Utilities
 Standalone functions for generating cultural responses
 """
+import asyncio
+import functools
+import hashlib
+import logging
 import os
 import re
+import time
+from collections import OrderedDict
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
-async def generate_cultural_response_with_context(user_message: str, context_data: dict, user_id: str, session_id: str) -> dict:
-    """Generate cultural response using context data."""
+# Imported with the module rather than inside each response call. A missing
+# SDK only fails the response itself (see _get_model), not the import
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+
+# Prompts are built once; only the per-request fields are filled in per call.
+# Follow-up chat: ULTRA CONCISE - 2-3 sentences, MAX 20 words
+_FOLLOWUP_PROMPT = """You are Hermes. Answer in 2-3 sentences MAX, under 20 words.
+
+CONTEXT: {summary}
+QUESTION: {question}
+
+RULES:
+- MAX 20 words total - COUNT YOUR WORDS
+- 2-3 sentences ONLY
+- NO asterisks, NO formatting, NO coordinates
+- Be extremely brief and helpful"""
+
+# Initial photo analysis, with the full geo context including nearby spots
+_INITIAL_PROMPT = """You are Hermes, an AI cultural companion. The user is physically at "{location}". Nearby attractions: {nearby}. Entity in photo: {entity}.
+Cultural context: {summary}{history}
+
+Answer in these plain-text sections, 1-2 sentences each, specific to {location}:
+1. What You're Seeing: identify the main subject
+2. Cultural Context: its historical/cultural significance at {location}
+3. Key Facts: interesting details about this site/location
+4. Nearby Recommendations: mention specific attractions ({nearby}) if they exist
+
+RULES: NO asterisks or markdown. NEVER mention coordinates, latitude, longitude, or GPS data. Always name {location}. Reference nearby attractions by name. Be professional and informative."""
+
+# Reply clean-up: asterisks (bold/italic markers) are plain deletions, done in
+# one C-level pass with str.translate; headers also drop the whitespace after
+# the #s, so they keep a regex, as does sentence-ending punctuation
+_STRIP_TABLE = str.maketrans('', '', '*')
+_RE_HEADER = re.compile(r'#+\s*')
+_RE_SENT = re.compile(r'[.!?]+')
+_TERMINATOR_TABLE = str.maketrans('', '', '.!?')
+
+# The cultural summary goes into prompts cut to a token budget. tiktoken is
+# optional: its cl100k_base encoding is not Gemini's tokenizer but is close
+# enough for budgeting; without it, ~4 characters per token is assumed
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+FOLLOWUP_SUMMARY_TOKENS = 25
+INITIAL_SUMMARY_TOKENS = 50
+
+
+@functools.lru_cache(maxsize=1)
+def _get_encoding():
+    if tiktoken is None:
+        return None
     try:
-        print("💬 Generating cultural response...")
-        
-        # Use Gemini to generate response
-        from google.generativeai import GenerativeModel
-        import google.generativeai as genai
-        
-        # Configure API key
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The encoding's data file is fetched on first use; offline it can't be
+        logger.warning("⚠️ tiktoken encoding unavailable, estimating tokens: %s", e)
+        return None
+
+
+@functools.lru_cache(maxsize=2048)
+def _trim_to_tokens(text: str, n: int) -> str:
+    """
+    Cut text to about n tokens. Cached: a session sends the same summary with
+    every message, so it is only tokenized once.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        limit = n * 4
+        if len(text) <= limit:
+            return text
+        cut = text[:limit]
+        space = cut.rfind(' ')
+        return cut[:space] if space > 0 else cut
+    ids = encoding.encode(text)
+    return encoding.decode(ids[:n]) if len(ids) > n else text
+
+
+# Dynamic prompt parts are capped: the cultural summary to its token budget,
+# and of the last HISTORY_TURNS turns only the newest HISTORY_VERBATIM_TURNS go
+# in as written (trimmed to a few lines); older ones shrink to their first
+# sentence. COMPRESS_HISTORY=false sends every turn trimmed but otherwise whole
+HISTORY_TURNS = 5
+HISTORY_VERBATIM_TURNS = 2
+HISTORY_MESSAGE_CHARS = 300
+HISTORY_SUMMARY_CHARS = 120
+COMPRESS_HISTORY = os.getenv("COMPRESS_HISTORY", "true").lower() != "false"
+
+_RE_FIRST_SENTENCE = re.compile(r'\s*(.*?[.!?])(?=\s|$)', re.S)
+
+
+def _summarize_turn(message: str) -> str:
+    """One-line stand-in for an older turn: its first sentence, capped."""
+    match = _RE_FIRST_SENTENCE.match(message)
+    first = match.group(1) if match else message.strip()
+    first = " ".join(first.split())
+    if len(first) > HISTORY_SUMMARY_CHARS:
+        first = first[:HISTORY_SUMMARY_CHARS].rstrip() + "..."
+    return first
+
+
+def _format_history(conversation_history: list) -> str:
+    turns = conversation_history[-HISTORY_TURNS:]
+    split = len(turns) - HISTORY_VERBATIM_TURNS if COMPRESS_HISTORY else 0
+    lines = []
+    for i, turn in enumerate(turns):
+        message = turn.get('message', '')
+        message = _summarize_turn(message) if i < split else message[:HISTORY_MESSAGE_CHARS]
+        lines.append(f"{turn.get('role', 'unknown')}: {message}\n")
+    return "\n\nPrevious Conversation:\n" + "".join(lines)
+
+
+# Follow-up answers keyed by a digest of the inputs of the follow-up prompt
+# (the trimmed summary and the normalized question):
+# key -> (timestamp, response text), in LRU order. Only successful answers are
+# cached; _inflight holds the pending calls (see generate_cultural_response_with_context)
+RESPONSE_CACHE_TTL = 3600
+RESPONSE_CACHE_MAX = 4096
+_response_cache = OrderedDict()
+_inflight = {}
+
+
+def _followup_key(summary: str, user_message: str) -> bytes:
+    text = f"{summary}|{user_message.lower().strip()}"
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _get_cached_response(key):
+    hit = _response_cache.get(key)
+    if hit is None:
+        return None
+    if time.time() - hit[0] >= RESPONSE_CACHE_TTL:
+        _response_cache.pop(key, None)
+        return None
+    _response_cache.move_to_end(key)
+    return hit[1]
+
+
+def _cache_response(key, response_text):
+    _response_cache[key] = (time.time(), response_text)
+    _response_cache.move_to_end(key)
+    if len(_response_cache) > RESPONSE_CACHE_MAX:
+        _response_cache.popitem(last=False)
+
+
+_model = None
+
+
+def _get_model():
+    """
+    Configure the Gemini SDK and build the response model on first call, once
+    per process. None if GEMINI_API_KEY is not set (not remembered, so a key
+    set later is picked up).
+    """
+    global _model
+    if _model is None:
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
-            print("❌ GEMINI_API_KEY not found in environment variables")
-            return {
-                "success": False,
-                "error": "Google API key not configured",
-                "response": "I apologize, but I couldn't generate a response at this time due to missing API configuration.",
-                "user_message": user_message,
-                "metadata": {
-                    "user_id": user_id,
-                    "session_id": session_id,
-                    "generated_at": datetime.utcnow().isoformat()
-                }
-            }
-        
+            return None
+        if genai is None:
+            raise RuntimeError("google-generativeai is not installed")
         genai.configure(api_key=api_key)
-        model = GenerativeModel("gemini-2.5-flash")
-        
-        # Build context for the prompt
-        cultural_summary = context_data.get("cultural_summary", "")
-        entity = context_data.get("entity", "Unknown Entity")
-        coordinates = context_data.get("coordinates", {})
-        conversation_history = context_data.get("conversation_history", [])
+        _model = genai.GenerativeModel("gemini-2.5-flash")
+    return _model
+
+
+def _clean_text(response_text: str) -> str:
+    """Remove all asterisks and markdown formatting."""
+    response_text = response_text.translate(_STRIP_TABLE)  # Remove bold markers and any other asterisks
+    return _RE_HEADER.sub('', response_text)  # Remove headers
+
+
+def _enforce_chat_limits(response_text: str) -> str:
+    """ENFORCE ULTRA-STRICT LIMITS: 20 words max, 2-3 sentences max (follow-up chat only)."""
+    # maxsplit stops splitting after the 21st word: enough to tell whether
+    # the reply is over the limit without tokenizing all of it
+    words = response_text.split(maxsplit=20)
+    if len(words) > 20:
+        response_text = ' '.join(words[:20])
+        # Try to end on a complete sentence
+        if not response_text.endswith(('.', '!', '?')):
+            # Find the last sentence boundary
+            last_sentence = max(map(response_text.rfind, '.!?'))
+            if last_sentence > 0:
+                response_text = response_text[:last_sentence+1]
+            else:
+                response_text += '.'
+    
+    # ENFORCE SENTENCE LIMIT: 2-3 sentences max for chat messages. With at
+    # most two terminators there are at most three sentences, so the common,
+    # already compliant reply skips the split and rejoin
+    terminators = response_text.count('.') + response_text.count('!') + response_text.count('?')
+    if terminators <= 2 and response_text.translate(_TERMINATOR_TABLE).strip():
+        return response_text
+    sentences = _RE_SENT.split(response_text)
+    sentences = [s.strip() for s in sentences if s.strip()]
+    if len(sentences) > 3:
+        response_text = '. '.join(sentences[:3]) + '.'
+    elif len(sentences) == 0:
+        # If somehow no sentences, just return a truncated version
+        response_text = ' '.join(response_text.split()[:20])
+    return response_text
+
+
+async def _generate_response_text(model, prompt: str, is_followup: bool) -> str:
+    """Run the prompt through Gemini and clean the reply up for display."""
+    # The SDK's native async call keeps the event loop serving other
+    # requests for the 1-3 s Gemini takes
+    response = await model.generate_content_async(prompt)
+    response_text = _clean_text(response.text.strip())
+    
+    # ONLY enforce strict limits for follow-up chat messages
+    if is_followup:
+        response_text = _enforce_chat_limits(response_text)
+    return response_text
+
+
+async def _followup_response_text(model, prompt: str, key: bytes) -> str:
+    response_text = await _generate_response_text(model, prompt, True)
+    _cache_response(key, response_text)
+    return response_text
+
+
+async def _followup_text(model, prompt: str, summary: str, user_message: str) -> str:
+    # The same question about the same place gets the same answer: serve
+    # repeats from the cache, and let concurrent repeats share one call
+    key = _followup_key(summary, user_message)
+    response_text = _get_cached_response(key)
+    if response_text is None:
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(_followup_response_text(model, prompt, key))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        response_text = await asyncio.shield(task)
+    return response_text
+
+
+def _build_prompt(user_message: str, context_data: dict):
+    """
+    Build the Gemini prompt for a message. Returns (prompt, summary): summary is
+    the trimmed cultural summary for a follow-up chat message, None for the
+    initial photo analysis.
+    """
+    # Build context for the prompt
+    cultural_summary = context_data.get("cultural_summary", "")
+    entity = context_data.get("entity", "Unknown Entity")
+    coordinates = context_data.get("coordinates", {})
+    conversation_history = context_data.get("conversation_history", [])
+    
+    # Extract geo context from context_data - "geo" is the canonical key; the
+    # others are only set by older producers
+    geo_context = (
+        context_data.get("geo", {}) or 
+        context_data.get("geo_context", {}) or 
+        context_data.get("location_api", {})
+    )
+    
+    # Debug: log which context data is available (not the data itself: its
+    # repr includes the whole summary and history on every request)
+    logger.debug("🔍 context_data keys = %s", list(context_data))
+    if geo_context:
+        logger.debug("📍 Geo context extracted: address=%s, city=%s", geo_context.get('address'), geo_context.get('city'))
+        logger.debug("🗺️ Nearby landmarks count: %d", len(geo_context.get('landmarks', [])))
+    else:
+        logger.warning("⚠️ No geo context found in context_data")
+    
+    # Extract location info even if geo_context is empty - try coordinates
+    if not geo_context and coordinates:
+        logger.debug("📍 Using raw coordinates: lat=%s, lng=%s", coordinates.get('lat'), coordinates.get('lng'))
+    
+    # Build conversation history context
+    conversation_context = ""
+    if conversation_history:
+        conversation_context = _format_history(conversation_history)
+    
+    # Check if this is an initial photo analysis or a follow-up chat message
+    # A follow-up is any message that's not the initial photo analysis prompt
+    is_followup = user_message != "Tell me about what I'm seeing in this photo"
+    
+    if is_followup:
+        summary = _trim_to_tokens(cultural_summary, FOLLOWUP_SUMMARY_TOKENS)
+        return _FOLLOWUP_PROMPT.format(summary=summary, question=user_message), summary
+    
+    # For initial photo analysis: Use full geo context including nearby spots
+    # Extract location and nearby attractions from geo_context
+    if geo_context:
+        # Handle different geo context formats
+        location_name = geo_context.get('address') or geo_context.get('city') or 'this location'
+        nearby_spots = geo_context.get('landmarks', [])[:3]
+        # Handle different landmark formats (title vs name, with distance_m)
+        nearby_text = ", ".join([spot.get('title', spot.get('name', str(spot))) for spot in nearby_spots if isinstance(spot, dict)]) if nearby_spots else "none nearby"
+    else:
+        # Fallback: use entity or generic location
+        location_name = entity if entity != "Unknown Entity" else 'this location'
+        nearby_text = "checking location for nearby attractions"
+    
+    prompt = _INITIAL_PROMPT.format(
+        location=location_name,
+        nearby=nearby_text,
+        entity=entity,
+        summary=_trim_to_tokens(cultural_summary, INITIAL_SUMMARY_TOKENS),
+        history=conversation_context,
+    )
+    return prompt, None
+
+
+def _response_result(response_text: str, user_message: str, context_data: dict, user_id: str, session_id: str) -> dict:
+    return {
+        "success": True,
+        "response": response_text,
+        "user_message": user_message,
+        "context_used": {
+            "entity": context_data.get("entity", "Unknown Entity"),
+            "coordinates": context_data.get("coordinates", {}),
+            "cultural_summary_length": len(context_data.get("cultural_summary", ""))
+        },
+        "metadata": {
+            "user_id": user_id,
+            "session_id": session_id,
+            "response_length": len(response_text),
+            "generated_at": datetime.utcnow().isoformat()
+        }
+    }
+
+
+def _error_result(error: str, response_text: str, user_message: str, user_id: str, session_id: str) -> dict:
+    return {
+        "success": False,
+        "error": error,
+        "response": response_text,
+        "user_message": user_message,
+        "metadata": {
+            "user_id": user_id,
+            "session_id": session_id,
+            "generated_at": datetime.utcnow().isoformat()
+        }
+    }
+
+
+_MISSING_KEY_RESPONSE = "I apologize, but I couldn't generate a response at this time due to missing API configuration."
+_FAILED_RESPONSE = "I apologize, but I couldn't generate a response at this time."
+
+
+async def generate_cultural_response_with_context(user_message: str, context_data: dict, user_id: str, session_id: str) -> dict:
+    """Generate cultural response using context data."""
+    try:
+        logger.debug("💬 Generating cultural response...")
         
-        # Extract geo context from context_data - check multiple possible keys
-        geo_context = (
-            context_data.get("geo_context", {}) or 
-            context_data.get("geo", {}) or 
-            context_data.get("location_api", {})
-        )
+        # Use Gemini to generate response
+        model = _get_model()
+        if model is None:
+            logger.error("❌ GEMINI_API_KEY not found in environment variables")
+            return _error_result("Google API key not configured", _MISSING_KEY_RESPONSE, user_message, user_id, session_id)
         
-        # Debug: print ALL context data to see what's available
-        print(f"🔍 DEBUG: context_data keys = {list(context_data.keys())}")
-        print(f"🔍 DEBUG: Full context_data = {context_data}")
-        if geo_context:
-            print(f"📍 Geo context extracted: address={geo_context.get('address')}, city={geo_context.get('city')}")
-            print(f"🗺️ Nearby landmarks count: {len(geo_context.get('landmarks', []))}")
-            print(f"🗺️ Full geo_context = {geo_context}")
+        prompt, summary = _build_prompt(user_message, context_data)
+        if summary is not None:
+            response_text = await _followup_text(model, prompt, summary, user_message)
         else:
-            print("⚠️ No geo context found in context_data")
-        
-        # Extract location info even if geo_context is empty - try coordinates
-        if not geo_context and coordinates:
-            print(f"📍 Using raw coordinates: lat={coordinates.get('lat')}, lng={coordinates.get('lng')}")
-        
-        # Build conversation history context
-        conversation_context = ""
-        if conversation_history:
-            conversation_context = "\n\nPrevious Conversation:\n"
-            for turn in conversation_history[-5:]:  # Last 5 messages
-                role = turn.get("role", "unknown")
-                message = turn.get("message", "")
-                conversation_context += f"{role}: {message}\n"
+            response_text = await _generate_response_text(model, prompt, False)
         
-        # Check if this is an initial photo analysis or a follow-up chat message
-        # A follow-up is any message that's not the initial photo analysis prompt
-        is_followup = user_message != "Tell me about what I'm seeing in this photo"
+        return _response_result(response_text, user_message, context_data, user_id, session_id)
         
-        if is_followup:
-            # For follow-up messages: ULTRA CONCISE - 2-3 sentences, MAX 20 words
-            prompt = f"""You are Hermes. Answer in 2-3 sentences MAX, under 20 words.
+    except Exception as e:
+        logger.error("❌ Response generation error: %s", e)
+        return _error_result(str(e), _FAILED_RESPONSE, user_message, user_id, session_id)
 
-CONTEXT: {cultural_summary[:100]}
-QUESTION: {user_message}
 
-RULES:
-- MAX 20 words total - COUNT YOUR WORDS
-- 2-3 sentences ONLY
-- NO asterisks, NO formatting, NO coordinates
-- Be extremely brief and helpful"""
-        else:
-            # For initial photo analysis: Use full geo context including nearby spots
-            # Extract location and nearby attractions from geo_context
-            if geo_context:
-                # Handle different geo context formats
-                location_name = geo_context.get('address') or geo_context.get('city') or 'this location'
-                nearby_spots = geo_context.get('landmarks', [])[:3]
-                # Handle different landmark formats (title vs name, with distance_m)
-                nearby_text = ", ".join([spot.get('title', spot.get('name', str(spot))) for spot in nearby_spots if isinstance(spot, dict)]) if nearby_spots else "none nearby"
-            else:
-                # Fallback: use entity or generic location
-                location_name = entity if entity != "Unknown Entity" else 'this location'
-                nearby_text = "checking location for nearby attractions"
-            
-            prompt = f"""You are Hermes, an AI cultural companion. Analyze this photo with full geographic context.
-
-CRITICAL - USER'S LOCATION:
-- User is at: {location_name}
-- Nearby attractions in area: {nearby_text}
-- Entity in photo: {entity}
-- Cultural context: {cultural_summary[:200]}{conversation_context}
-
-IMPORTANT: The user is physically located at "{location_name}". Use this location context to:
-1. Provide location-specific cultural information
-2. Recommend nearby attractions ({nearby_text})
-3. Make relevant historical/cultural connections to this area
-
-Provide your analysis in these sections:
-1. What You're Seeing: (1-2 sentences - identify the main subject)
-2. Cultural Context: (1-2 sentences - historical/cultural significance at {location_name})
-3. Key Facts: (1-2 sentences - interesting details about this site/location)
-4. Nearby Recommendations: (1-2 sentences - mention specific attractions: {nearby_text} if they exist)
-
-CRITICAL OUTPUT RULES:
-- NO asterisks in your output - use plain text sections
-- NEVER mention coordinates, latitude, longitude, or GPS data
-- Always mention the city/location name: {location_name}
-- Reference nearby attractions by name
-- Be professional and informative
-- Keep each section to 1-2 sentences"""
-        
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Remove all asterisks and markdown formatting
-        response_text = re.sub(r'\*\*', '', response_text)  # Remove bold markers
-        response_text = re.sub(r'\*', '', response_text)  # Remove any other asterisks
-        response_text = re.sub(r'#+\s*', '', response_text)  # Remove headers
+# A streamed reply is forwarded up to the last sentence end seen so far, so
+# each piece can be cleaned on its own (no markdown marker spans two pieces)
+_RE_SENTENCE_END = re.compile(r'[.!?]\s+')
+
+
+async def generate_cultural_response_stream(user_message: str, context_data: dict, user_id: str, session_id: str):
+    """
+    Streaming variant of generate_cultural_response_with_context. Yields
+    {"delta": text} pieces of the initial photo analysis as whole sentences
+    arrive from Gemini, then a final {"done": True, "result": ...} with the same
+    dict the non-streaming call returns. Follow-up chat answers are capped at 20
+    words and cached, so they arrive as a single delta.
+    """
+    try:
+        model = _get_model()
+        if model is None:
+            logger.error("❌ GEMINI_API_KEY not found in environment variables")
+            yield {"done": True, "result": _error_result("Google API key not configured", _MISSING_KEY_RESPONSE, user_message, user_id, session_id)}
+            return
         
-        # ONLY enforce strict limits for follow-up chat messages
-        if is_followup:
-            # ENFORCE ULTRA-STRICT LIMITS: 20 words max, 2-3 sentences max
-            words = response_text.split()
-            if len(words) > 20:
-                response_text = ' '.join(words[:20])
-                # Try to end on a complete sentence
-                if not response_text.endswith(('.', '!', '?')):
-                    # Find the last sentence boundary
-                    last_period = response_text.rfind('.')
-                    last_exclamation = response_text.rfind('!')
-                    last_question = response_text.rfind('?')
-                    last_sentence = max(last_period, last_exclamation, last_question)
-                    if last_sentence > 0:
-                        response_text = response_text[:last_sentence+1]
-                    else:
-                        response_text += '.'
-            
-            # ENFORCE SENTENCE LIMIT: 2-3 sentences max for chat messages
-            sentences = re.split(r'[.!?]+', response_text)
-            sentences = [s.strip() for s in sentences if s.strip()]
-            if len(sentences) > 3:
-                response_text = '. '.join(sentences[:3]) + '.'
-            elif len(sentences) == 0:
-                # If somehow no sentences, just return a truncated version
-                response_text = ' '.join(response_text.split()[:20])
+        prompt, summary = _build_prompt(user_message, context_data)
+        if summary is not None:
+            response_text = await _followup_text(model, prompt, summary, user_message)
+            yield {"delta": response_text}
+        else:
+            pieces = []
+            pending = ""
+            stream = await model.generate_content_async(prompt, stream=True)
+            async for chunk in stream:
+                pending += chunk.text
+                ends = [m.end() for m in _RE_SENTENCE_END.finditer(pending)]
+                if ends:
+                    piece = _clean_text(pending[:ends[-1]])
+                    pending = pending[ends[-1]:]
+                    if not pieces:
+                        piece = piece.lstrip()
+                    pieces.append(piece)
+                    yield {"delta": piece}
+            piece = _clean_text(pending).rstrip()
+            if not pieces:
+                piece = piece.lstrip()
+            if piece:
+                pieces.append(piece)
+                yield {"delta": piece}
+            response_text = "".join(pieces).rstrip()
         
-        return {
-            "success": True,
-            "response": response_text,
-            "user_message": user_message,
-            "context_used": {
-                "entity": entity,
-                "coordinates": coordinates,
-                "cultural_summary_length": len(cultural_summary)
-            },
-            "metadata": {
-                "user_id": user_id,
-                "session_id": session_id,
-                "response_length": len(response_text),
-                "generated_at": datetime.utcnow().isoformat()
-            }
-        }
+        yield {"done": True, "result": _response_result(response_text, user_message, context_data, user_id, session_id)}
         
     except Exception as e:
-        print(f"❌ Response generation error: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "response": "I apologize, but I couldn't generate a response at this time.",
-            "user_message": user_message,
-            "metadata": {
-                "user_id": user_id,
-                "session_id": session_id,
-                "generated_at": datetime.utcnow().isoformat()
-            }
-        }
-
+        logger.error("❌ Response generation error: %s", e)
+        yield {"done": True, "result": _error_result(str(e), _FAILED_RESPONSE, user_message, user_id, session_id)}
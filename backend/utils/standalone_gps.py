@@ -5,49 +5,59 @@ This is a simplified version that only extracts GPS coordinates.
 """
 
 import base64
+import logging
+import math
 from PIL import Image
-from PIL.ExifTags import TAGS
 from io import BytesIO
 from typing import Dict, Any
+from utils.gps_extractor import GPS_IFD_TAG, convert_to_decimal, read_exif_gps, read_exif_gps_head
+
+logger = logging.getLogger(__name__)
 
 def extract_gps_from_image(image_data: str, image_format: str = "base64") -> Dict[str, Any]:
     """
     Extract GPS coordinates from image EXIF data.
     
     Args:
-        image_data: Image data as base64 string or raw bytes
-        image_format: Format of image_data ("base64" or "bytes")
+        image_data: Image data as base64 string, raw bytes or a BytesIO
+        image_format: Format of image_data ("base64", "bytes" or "bytesio")
         
     Returns:
         Dictionary with success status, coordinates, and error info
     """
     try:
-        # Handle different image formats
+        # Read just the GPS tags from the EXIF segment (for base64 input, from
+        # the decoded head of the image); fall back to a full PIL parse for
+        # non-JPEG or unusual files
         if image_format == "base64":
-            image_bytes = base64.b64decode(image_data)
+            gps_info = read_exif_gps_head(image_data)
+            if gps_info is None:
+                image_bytes = base64.b64decode(image_data)
+                gps_info = read_exif_gps(image_bytes)
+        elif image_format == "bytesio":
+            # Scan the buffer in place instead of copying it out with getvalue()
+            image_bytes = image_data.getbuffer()
+            gps_info = read_exif_gps(image_bytes)
         else:
             # Assume it's raw bytes
             image_bytes = image_data
-        
-        # Open image and extract EXIF
-        image = Image.open(BytesIO(image_bytes))
-        exif_data = image._getexif()
-        
-        if exif_data is None:
-            return {
-                "success": False,
-                "error": "No EXIF data found in image",
-                "coordinates": None
-            }
-        
-        # Parse EXIF data
-        exif = {}
-        for tag_id, value in exif_data.items():
-            tag = TAGS.get(tag_id, tag_id)
-            exif[tag] = value
+            gps_info = read_exif_gps(image_bytes)
+        if gps_info is None:
+            # Open image and extract EXIF
+            image = Image.open(BytesIO(image_bytes))
+            # getexif() parses IFD0 only; get_ifd() then reads just the GPS IFD
+            exif_data = image.getexif()
+            
+            if not exif_data:
+                return {
+                    "success": False,
+                    "error": "No EXIF data found in image",
+                    "coordinates": None
+                }
+            
+            gps_info = exif_data.get_ifd(GPS_IFD_TAG)
         
         # Extract GPS information
-        gps_info = exif.get('GPSInfo')
         if not gps_info:
             return {
                 "success": False,
@@ -63,18 +73,17 @@ def extract_gps_from_image(image_data: str, image_format: str = "base64") -> Dic
         
         if lat and lng:
             # Convert to decimal degrees
-            def convert_to_decimal(coord, ref):
-                degrees = float(coord[0])
-                minutes = float(coord[1])
-                seconds = float(coord[2])
-                decimal = degrees + (minutes / 60.0) + (seconds / 3600.0)
-                if ref in ['S', 'W']:
-                    decimal = -decimal
-                return decimal
-            
             lat_decimal = convert_to_decimal(lat, lat_ref)
             lng_decimal = convert_to_decimal(lng, lng_ref)
             
+            # A rational with a zero denominator converts to NaN (in both EXIF parsers)
+            if not (math.isfinite(lat_decimal) and math.isfinite(lng_decimal)):
+                return {
+                    "success": False,
+                    "error": "Invalid GPS coordinates in EXIF data",
+                    "coordinates": None
+                }
+            
             return {
                 "success": True,
                 "coordinates": {
@@ -103,14 +112,14 @@ def process_image_location(image_data: str, image_format: str = "base64") -> Dic
     This is a standalone version that doesn't depend on ADK.
     
     Args:
-        image_data: Image data as base64 string or raw bytes
-        image_format: Format of image_data ("base64" or "bytes")
+        image_data: Image data as base64 string, raw bytes or a BytesIO
+        image_format: Format of image_data ("base64", "bytes" or "bytesio")
         
     Returns:
         Dictionary with success status, coordinates, and error info
     """
     try:
-        print("📍 Extracting GPS coordinates from image...")
+        logger.debug("📍 Extracting GPS coordinates from image...")
         
         # Extract GPS coordinates from image
         gps_result = extract_gps_from_image(image_data, image_format)
@@ -126,7 +135,7 @@ def process_image_location(image_data: str, image_format: str = "base64") -> Dic
         lat = coordinates["lat"]
         lng = coordinates["lng"]
         
-        print(f"✅ GPS coordinates extracted: {lat}, {lng}")
+        logger.info("✅ GPS coordinates extracted: %s, %s", lat, lng)
         
         return {
             "success": True,
@@ -135,7 +144,7 @@ def process_image_location(image_data: str, image_format: str = "base64") -> Dic
         }
         
     except Exception as e:
-        print(f"❌ GPS extraction error: {e}")
+        logger.error("❌ GPS extraction error: %s", e)
         return {
             "success": False,
             "error": f"GPS extraction failed: {str(e)}",
@@ -3,24 +3,207 @@ Firebase Storage client for handling image uploads and retrieval.
 Provides blob storage functionality for user-uploaded images.
 """
 
+import asyncio
+import functools
+import hashlib
 import uuid
 import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+from urllib.parse import unquote, urlparse
 import io
+import multiprocessing
 from PIL import Image
-import base64
+from binascii import a2b_base64
 
 from firebase_admin import storage
+from google.api_core.exceptions import BadRequest
+from services.firebase import get_app
 from config.logger import get_logger
 
 logger = get_logger(__name__)
 
+# libvips, when installed, resizes uploads in one streamed pass (shrink-on-load,
+# resize and JPEG encode) without holding the full decoded image; optional, the
+# PIL path below is used without it
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
+# File extension stored for each accepted upload MIME type (anything else: jpg)
+_EXTENSION_MAP = {
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp"
+}
+
+def _process_image(
+    image_data: bytes,
+    content_type: str = "image/jpeg",
+    max_size: tuple = (1920, 1080),
+    quality: int = 80
+) -> Tuple[bytes, str]:
+    """
+    Process and optimize image for storage.
+    Module-level so it can be pickled and run in the image process pool.
+
+    WebP uploads stay WebP (kept as uploaded when already within max_size);
+    everything else is re-encoded as JPEG.
+
+    Args:
+        image_data: Raw image bytes
+        content_type: MIME type the image was uploaded with
+        max_size: Maximum dimensions (width, height)
+        quality: JPEG/WebP quality (1-95)
+        
+    Returns:
+        Processed image bytes and their MIME type
+    """
+    webp = image_data[:4] == b"RIFF" and image_data[8:12] == b"WEBP"
+    if webp:
+        try:
+            # Header only; pixels are never decoded here
+            with Image.open(io.BytesIO(image_data)) as image:
+                if "exif" not in image.info and image.size[0] <= max_size[0] and image.size[1] <= max_size[1]:
+                    logger.info("⏭️ WebP image already small enough, keeping as uploaded")
+                    return image_data, "image/webp"
+        except Exception:
+            pass
+
+    if pyvips is not None:
+        try:
+            image = pyvips.Image.thumbnail_buffer(image_data, max_size[0], height=max_size[1], size="down")
+            if webp:
+                processed_data = image.webpsave_buffer(Q=quality, effort=4, strip=True)
+            else:
+                if image.hasalpha():
+                    image = image.flatten()
+                processed_data = image.jpegsave_buffer(Q=quality, optimize_coding=True, interlace=True, strip=True)
+            logger.info(f"📸 Image processed with libvips: {len(image_data)} bytes → {len(processed_data)} bytes")
+            return processed_data, "image/webp" if webp else "image/jpeg"
+        except pyvips.Error as e:
+            logger.warning(f"⚠️ libvips processing failed, retrying with PIL: {str(e)}")
+
+    try:
+        # Open image with PIL
+        image = Image.open(io.BytesIO(image_data))
+        webp = image.format == "WEBP"
+        
+        # JPEG shrink-on-load: libjpeg decodes straight at 1/2, 1/4 or 1/8
+        # scale, as long as the result still covers max_size; thumbnail()
+        # below does the exact fit. No-op for other formats
+        image.draft("RGB", max_size)
+        
+        # Convert to RGB if necessary (for JPEG compatibility; WebP keeps alpha)
+        if image.mode in ("RGBA", "LA", "P") and not (webp and image.mode == "RGBA"):
+            image = image.convert("RGB")
+        
+        # Resize if image is too large
+        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+            logger.info(f"📏 Resized image to {image.size}")
+        
+        output = io.BytesIO()
+        if webp:
+            image.save(output, format="WEBP", quality=quality, method=4)
+        else:
+            # Save as optimized progressive JPEG with 4:2:0 chroma subsampling
+            image.save(output, format="JPEG", quality=quality, optimize=True, progressive=True, subsampling=2)
+        processed_data = output.getvalue()
+        
+        logger.info(f"📸 Image processed: {len(image_data)} bytes → {len(processed_data)} bytes")
+        return processed_data, "image/webp" if webp else "image/jpeg"
+        
+    except Exception as e:
+        logger.error(f"❌ Image processing failed: {str(e)}")
+        return image_data, content_type  # Return original if processing fails
+
+# JPEGs already within the size limits and under this many bytes are stored as
+# uploaded: re-encoding them costs a full decode/encode and only loses quality
+SKIP_PROCESSING_BYTES = 512 * 1024
+
+def _is_small_jpeg(image_data: bytes, content_type: str, max_size: tuple = (1920, 1080)) -> bool:
+    """True if the upload is a JPEG that _process_image would leave the same size."""
+    if content_type not in ("image/jpeg", "image/jpg") or len(image_data) >= SKIP_PROCESSING_BYTES:
+        return False
+    try:
+        # Image.open only parses the header; pixels are never decoded here
+        with Image.open(io.BytesIO(image_data)) as image:
+            # EXIF (GPS position included) is stripped by re-encoding, so keep
+            # processing those rather than publish the metadata
+            return (
+                image.format == "JPEG"
+                and "exif" not in image.info
+                and image.size[0] <= max_size[0]
+                and image.size[1] <= max_size[1]
+            )
+    except Exception:
+        return False
+
+# Decode/resize/encode is CPU-bound and PIL holds the GIL for much of it, so uploads
+# are processed in worker processes: concurrent uploads use separate cores instead
+# of queueing on one. Created on first use; shut down with the app. Workers are
+# spawned rather than forked: forking the threaded server can copy held locks
+# (logging, gRPC) into the child and deadlock it
+IMAGE_WORKERS_MAX = 4
+_image_pool = None
+
+def _get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(
+            max_workers=min(os.cpu_count() or 1, IMAGE_WORKERS_MAX),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _image_pool
+
+def shutdown_image_pool():
+    """Stop the image worker processes (app shutdown)."""
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
+
+# Retries and double taps re-send the same bytes: uploads are remembered by content
+# hash so a repeat returns the stored URL with no processing or network. Chat
+# uploads: (user_id, content_type, process_image, digest) -> URL (each upload has
+# its own path, so the URL stays valid). Profile images are overwritten in place,
+# so only each user's latest is kept: user_id -> (digest, URL). Both in LRU order
+UPLOAD_CACHE_MAX = 512
+_upload_cache = OrderedDict()
+_profile_uploads = OrderedDict()
+
+def _digest(image_data: bytes) -> bytes:
+    return hashlib.blake2b(image_data, digest_size=16).digest()
+
+def _get_cached(cache: OrderedDict, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+def _cache(cache: OrderedDict, key, value):
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > UPLOAD_CACHE_MAX:
+        cache.popitem(last=False)
+
 class StorageClient:
     """Firebase Storage client for image handling with local fallback."""
     
     def __init__(self):
         """Initialize storage client."""
+        # Buckets resolve against the default Firebase app; if it can't be set up,
+        # the bucket lookups below fail and we fall back to local storage
+        try:
+            get_app()
+        except Exception as e:
+            logger.warning(f"⚠️ Firebase app unavailable: {str(e)}")
+        
         # Try different bucket name formats
         possible_bucket_names = [
             "hermes-521f9.appspot.com",  # Standard format
@@ -31,10 +214,13 @@ class StorageClient:
         self.bucket = None
         self.bucket_name = None
         self.use_local_storage = False
+        # Cleared once the bucket rejects per-object ACLs (see _upload_blob)
+        self.object_acls = True
         
         # Setup local storage directory as fallback
         self.local_storage_dir = os.path.join(os.getcwd(), "uploads")
-        os.makedirs(self.local_storage_dir, exist_ok=True)
+        self.profile_storage_dir = os.path.join(self.local_storage_dir, "profile")
+        os.makedirs(self.profile_storage_dir, exist_ok=True)
         
         for bucket_name in possible_bucket_names:
             try:
@@ -86,49 +272,50 @@ class StorageClient:
             logger.error(f"❌ Local image save failed: {str(e)}")
             return None
     
+    async def _upload_blob(self, blob, image_data: bytes, content_type: str) -> bool:
+        """
+        Upload image bytes to a blob, publicly readable where the bucket allows it.
+        
+        The public-read ACL is set by the upload request itself (predefined_acl)
+        rather than by a second make_public() round trip. A bucket with uniform
+        bucket-level access rejects object ACLs outright: it gets a plain upload,
+        and the ACL isn't requested again. Any other error (permissions included)
+        is raised to the caller.
+        
+        Returns:
+            True if the public-read ACL was applied
+        """
+        # The storage SDK is blocking: its HTTPS requests run in a worker
+        # thread so the event loop keeps serving other requests
+        if self.object_acls:
+            try:
+                await asyncio.to_thread(
+                    blob.upload_from_file,
+                    io.BytesIO(image_data),
+                    size=len(image_data),
+                    content_type=content_type,
+                    predefined_acl="publicRead"
+                )
+                return True
+            except BadRequest as e:
+                if "uniform bucket-level access" not in str(e).lower():
+                    raise
+                logger.warning(f"⚠️ Bucket has uniform bucket-level access, uploading without public ACL: {str(e)}")
+                self.object_acls = False
+        await asyncio.to_thread(
+            blob.upload_from_file,
+            io.BytesIO(image_data),
+            size=len(image_data),
+            content_type=content_type
+        )
+        return False
+    
     def _generate_image_path(self, user_id: str, file_extension: str) -> str:
         """Generate unique path for image storage."""
         timestamp = datetime.utcnow().strftime("%Y/%m/%d")
         unique_id = str(uuid.uuid4())
         return f"user_images/{user_id}/{timestamp}/{unique_id}.{file_extension}"
     
-    def _process_image(self, image_data: bytes, max_size: tuple = (1920, 1080), quality: int = 85) -> bytes:
-        """
-        Process and optimize image for storage.
-        
-        Args:
-            image_data: Raw image bytes
-            max_size: Maximum dimensions (width, height)
-            quality: JPEG quality (1-95)
-            
-        Returns:
-            Processed image bytes
-        """
-        try:
-            # Open image with PIL
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Convert to RGB if necessary (for JPEG compatibility)
-            if image.mode in ("RGBA", "LA", "P"):
-                image = image.convert("RGB")
-            
-            # Resize if image is too large
-            if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-                image.thumbnail(max_size, Image.Resampling.LANCZOS)
-                logger.info(f"📏 Resized image to {image.size}")
-            
-            # Save as optimized JPEG
-            output = io.BytesIO()
-            image.save(output, format="JPEG", quality=quality, optimize=True)
-            processed_data = output.getvalue()
-            
-            logger.info(f"📸 Image processed: {len(image_data)} bytes → {len(processed_data)} bytes")
-            return processed_data
-            
-        except Exception as e:
-            logger.error(f"❌ Image processing failed: {str(e)}")
-            return image_data  # Return original if processing fails
-    
     async def upload_image(
         self, 
         image_data: bytes, 
@@ -148,30 +335,38 @@ class StorageClient:
         Returns:
             Public URL of uploaded image or None if failed
         """
+        key = (user_id, content_type, process_image, _digest(image_data))
+        url = _get_cached(_upload_cache, key)
+        if url is not None:
+            logger.info(f"♻️ Duplicate upload for user {user_id}, reusing {url}")
+            return url
+        url = await self._upload_image(image_data, user_id, content_type, process_image)
+        if url:
+            _cache(_upload_cache, key, url)
+        return url
+    
+    async def _upload_image(
+        self, 
+        image_data: bytes, 
+        user_id: str, 
+        content_type: str,
+        process_image: bool
+    ) -> Optional[str]:
         try:
             logger.info(f"📸 Starting image upload for user {user_id}, size: {len(image_data)} bytes")
             
             # Process image if requested
-            if process_image and content_type.startswith("image/"):
+            if process_image and content_type.startswith("image/") and _is_small_jpeg(image_data, content_type):
+                logger.info("⏭️ Image already small enough, skipping processing")
+            elif process_image and content_type.startswith("image/"):
                 logger.info("🔄 Processing image before upload")
-                image_data = self._process_image(image_data)
+                image_data, content_type = await asyncio.get_running_loop().run_in_executor(
+                    _get_image_pool(), _process_image, image_data, content_type
+                )
                 logger.info(f"✅ Image processed, new size: {len(image_data)} bytes")
             
             # Determine file extension
-            # Determine file extension
-            extension_map = {
-                "image/jpeg": "jpg",
-                "image/jpg": "jpg", 
-                "image/png": "png",
-                "image/webp": "webp"
-            }
-            file_extension = extension_map.get(content_type, "jpg")
-
-            # Use a deterministic uploads path for chat images: uploads/{user_id}/{timestamp}_{uuid}.{ext}
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S%f")
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"{timestamp}_{unique_id}.{file_extension}"
-            storage_path = f"uploads/{user_id}/{filename}"
+            file_extension = _EXTENSION_MAP.get(content_type, "jpg")
 
             # Try Firebase Storage first
             if self.bucket and not self.use_local_storage:
@@ -183,19 +378,11 @@ class StorageClient:
                     # Upload to Firebase Storage at the deterministic path
                     blob = self.bucket.blob(storage_path)
                     logger.info(f"🔄 Uploading to Firebase Storage...")
-                    blob.upload_from_string(
-                        image_data,
-                        content_type=content_type
-                    )
+                    public = await self._upload_blob(blob, image_data, content_type)
                     logger.info(f"✅ File uploaded successfully to {storage_path}")
 
-                    # Make the blob publicly accessible if possible
-                    try:
-                        blob.make_public()
-                    except Exception:
-                        logger.warning("Could not make blob public; it may require signed URLs or bucket rules")
-
-                    public_url = getattr(blob, 'public_url', None)
+                    # The public URL only resolves when the public-read ACL was applied
+                    public_url = getattr(blob, 'public_url', None) if public else None
                     if public_url:
                         logger.info(f"✅ Firebase upload successful: {public_url}")
                         return public_url
@@ -216,7 +403,7 @@ class StorageClient:
             
             # Use local storage as fallback
             logger.info("💾 Using local storage for image upload")
-            local_url = self._save_image_locally(image_data, user_id, file_extension)
+            local_url = await asyncio.to_thread(self._save_image_locally, image_data, user_id, file_extension)
             
             if local_url:
                 logger.info(f"✅ Local storage upload successful: {local_url}")
@@ -249,16 +436,19 @@ class StorageClient:
             Public URL of uploaded image or None if failed
         """
         try:
-            # Remove data URL prefix if present
+            # Skip the data URL prefix if present; the payload is sliced as a view
+            # below rather than split off into another copy of the string
+            start = 0
             if base64_data.startswith("data:"):
-                # Extract content type and base64 data
-                header, base64_data = base64_data.split(",", 1)
-                content_type = header.split(":")[1].split(";")[0]
+                # Extract content type
+                comma = base64_data.index(",")
+                content_type = base64_data[:comma].split(":")[1].split(";")[0]
+                start = comma + 1
             else:
                 content_type = "image/jpeg"  # Default
             
             # Decode base64
-            image_data = base64.b64decode(base64_data)
+            image_data = a2b_base64(memoryview(base64_data.encode("ascii"))[start:])
             
             # Upload using bytes method
             return await self.upload_image(
@@ -283,17 +473,16 @@ class StorageClient:
             Image metadata or None if not found
         """
         try:
-            # Extract storage path from public URL
-            if self.bucket_name not in public_url:
+            # Extract storage path from public URL: Firebase download URLs
+            # (.../b/{bucket}/o/{path}?alt=media) or GCS public URLs ({bucket}/{path})
+            url_path = urlparse(public_url).path
+            _, sep, object_path = url_path.partition(f"{self.bucket_name}/o/")
+            if not sep:
+                _, sep, object_path = url_path.partition(f"/{self.bucket_name}/")
+            if not sep or not object_path:
                 return None
             
-            # Parse the storage path from URL
-            path_start = public_url.find(f"{self.bucket_name}/o/") + len(f"{self.bucket_name}/o/")
-            path_end = public_url.find("?")
-            if path_end == -1:
-                path_end = len(public_url)
-            
-            storage_path = public_url[path_start:path_end].replace("%2F", "/")
+            storage_path = unquote(object_path)
             
             # Get blob metadata
             blob = self.bucket.blob(storage_path)
@@ -320,11 +509,8 @@ class StorageClient:
     def _save_profile_image_locally(self, image_data: bytes, user_id: str, file_extension: str = 'jpg') -> Optional[str]:
         """Save profile image deterministically to uploads/profile/{uid}.jpg and return URL."""
         try:
-            profile_dir = os.path.join(self.local_storage_dir, 'profile')
-            os.makedirs(profile_dir, exist_ok=True)
-
             filename = f"{user_id}.{file_extension}"
-            file_path = os.path.join(profile_dir, filename)
+            file_path = os.path.join(self.profile_storage_dir, filename)
             with open(file_path, 'wb') as f:
                 f.write(image_data)
 
@@ -338,41 +524,45 @@ class StorageClient:
 
     async def upload_profile_image(self, image_data: bytes, user_id: str, content_type: str = 'image/jpeg') -> Optional[str]:
         """Upload/replace profile image to Firebase Storage or local filesystem at uploads/profile/{uid}.jpg."""
+        fingerprint = (content_type, _digest(image_data))
+        last = _get_cached(_profile_uploads, user_id)
+        if last is not None and last[0] == fingerprint:
+            logger.info(f"♻️ Profile image for {user_id} unchanged, reusing {last[1]}")
+            return last[1]
+        url = await self._upload_profile_image(image_data, user_id, content_type)
+        if url:
+            _cache(_profile_uploads, user_id, (fingerprint, url))
+        else:
+            # The stored image may be half-replaced; don't vouch for the old one
+            _profile_uploads.pop(user_id, None)
+        return url
+
+    async def _upload_profile_image(self, image_data: bytes, user_id: str, content_type: str) -> Optional[str]:
         try:
-            # Process and determine extension
-            extension_map = {
-                'image/jpeg': 'jpg',
-                'image/jpg': 'jpg',
-                'image/png': 'png',
-                'image/webp': 'webp'
-            }
-            file_extension = extension_map.get(content_type, 'jpg')
+            # Determine extension
+            file_extension = _EXTENSION_MAP.get(content_type, 'jpg')
 
             # Try Firebase Storage first
             if self.bucket and not self.use_local_storage:
                 try:
                     storage_path = f"uploads/profile/{user_id}.{file_extension}"
                     blob = self.bucket.blob(storage_path)
-                    blob.upload_from_string(image_data, content_type=content_type)
-                    # Make public and return URL
-                    try:
-                        blob.make_public()
-                    except Exception:
-                        # Some buckets don't allow make_public; still return signed url behavior if needed
-                        pass
-                    public_url = blob.public_url
+                    public = await self._upload_blob(blob, image_data, content_type)
                     logger.info(f"✅ Uploaded profile image to Firebase: {storage_path}")
-                    return public_url
+                    # The public URL only resolves when the public-read ACL was applied
+                    return blob.public_url if public else storage_path
                 except Exception as e:
                     logger.error(f"❌ Firebase profile upload failed: {str(e)}")
                     logger.warning("🔄 Falling back to local profile storage")
 
             # Local fallback: save deterministically
-            return self._save_profile_image_locally(image_data, user_id, file_extension)
+            return await asyncio.to_thread(self._save_profile_image_locally, image_data, user_id, file_extension)
 
         except Exception as e:
             logger.error(f"❌ upload_profile_image failed: {str(e)}")
             return None
 
-# Global storage client instance
-storage_client = StorageClient()
+@functools.lru_cache(maxsize=None)
+def get_storage_client() -> StorageClient:
+    """Return the shared StorageClient, creating it (and the Firebase app) on first call."""
+    return StorageClient()
@@ -5,11 +5,15 @@ Functions for storing data in Firebase
 from datetime import datetime
 import asyncio
 
+from config.logger import get_logger
+
+logger = get_logger(__name__)
+
 
 async def store_cultural_summary(context_result: dict, user_id: str, session_id: str) -> dict:
     """Store cultural summary in database."""
     try:
-        print("💾 Storing cultural summary in database...")
+        logger.debug("💾 Storing cultural summary in database...")
         
         # Prepare data for database
         cultural_data = {
@@ -23,16 +27,16 @@ async def store_cultural_summary(context_result: dict, user_id: str, session_id:
             "certainty": context_result.get("certainty", 0.0),
             "timestamp": context_result.get("timestamp", datetime.utcnow().isoformat()),
             "perception_data": context_result.get("perception_data", {}),
-            "geo_context": context_result.get("geo_context", {})
+            "geo_context": context_result.get("geo", {})
         }
         
         # Store in Firebase Firestore
         from services.db_service import save_cultural_summary
         
-        # Save to Firestore
-        save_cultural_summary(user_id, session_id, cultural_data)
+        # Save to Firestore (blocking client call, run off the event loop)
+        await asyncio.to_thread(save_cultural_summary, user_id, session_id, cultural_data)
         
-        print(f"✅ Cultural summary stored in Firebase for user {user_id}, session {session_id}")
+        logger.info("✅ Cultural summary stored in Firebase for user %s, session %s", user_id, session_id)
         
         return {
             "success": True,
@@ -41,7 +45,7 @@ async def store_cultural_summary(context_result: dict, user_id: str, session_id:
         }
         
     except Exception as e:
-        print(f"❌ Database storage error: {e}")
+        logger.error("❌ Database storage error: %s", e)
         return {
             "success": False,
             "error": str(e),
@@ -52,10 +56,7 @@ async def store_cultural_summary(context_result: dict, user_id: str, session_id:
 async def create_journal_entry(context_result: dict, user_id: str, session_id: str) -> dict:
     """Create journal entry using the journal route after context agent completes."""
     try:
-        print("📖 Creating journal entry via journal route...")
-        
-        # Wait a few seconds as requested
-        await asyncio.sleep(2)
+        logger.debug("📖 Creating journal entry via journal route...")
         
         # Prepare journal entry data
         cultural_summary = context_result.get("cultural_summary", "")
@@ -102,10 +103,10 @@ async def create_journal_entry(context_result: dict, user_id: str, session_id: s
             # Import journal service
             from services.db_service import save_journal_entry
             
-            # Save journal entry
-            save_journal_entry(user_id, journal_entry)
+            # Save journal entry (blocking client call, run off the event loop)
+            await asyncio.to_thread(save_journal_entry, user_id, journal_entry)
             
-            print(f"✅ Journal entry created successfully for {entity}")
+            logger.info("✅ Journal entry created successfully for %s", entity)
             
             return {
                 "success": True,
@@ -114,7 +115,7 @@ async def create_journal_entry(context_result: dict, user_id: str, session_id: s
             }
             
         except Exception as journal_error:
-            print(f"⚠️ Journal route error: {journal_error}")
+            logger.warning("⚠️ Journal route error: %s", journal_error)
             # Don't fail the entire process if journal creation fails
             return {
                 "success": False,
@@ -123,7 +124,7 @@ async def create_journal_entry(context_result: dict, user_id: str, session_id: s
             }
         
     except Exception as e:
-        print(f"❌ Journal creation error: {e}")
+        logger.error("❌ Journal creation error: %s", e)
         return {
             "success": False,
             "error": str(e),